@@ -0,0 +1,76 @@
+"""Compare fidel-order sort keys against naive per-character key functions"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEMINI = os.path.join(ROOT, "gemini")
+sys.path.insert(0, GEMINI)
+sys.path.insert(0, ROOT)
+
+from collation import Collator, _weight_order  # noqa: E402
+from shared.phrase_trie import read_table  # noqa: E402
+
+
+def make_names(count, seed):
+    rng = random.Random(seed)
+    letters = [chr(code) for code in range(0x1200, 0x1358)]
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(2, 12))) for _ in range(count)]
+
+
+def naive_tuple_key(ranks):
+    """Python key building a tuple of ranks, one dict lookup per character"""
+    def key(text):
+        return tuple(ranks.get(ch, 0x10000 + ord(ch)) for ch in text)
+    return key
+
+
+def naive_list_key(ranks):
+    """Python key building a list of ints through a comprehension"""
+    def key(text):
+        return [ranks[ch] if ch in ranks else 0x10000 + ord(ch) for ch in text]
+    return key
+
+
+def timed(label, func, names, expected=None):
+    start = time.perf_counter()
+    result = func(names)
+    elapsed = time.perf_counter() - start
+    status = "" if expected is None else ("  ok" if result == expected else "  MISMATCH")
+    print(f"{label:<28} {elapsed:8.3f} s  {len(names) / elapsed / 1e6:6.2f} M strings/s{status}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1000000, help="number of random names")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--config", default=os.path.join(GEMINI, "config.csv"))
+    args = parser.parse_args()
+
+    table = read_table(args.config)
+    ranks = {chr(code): rank for rank, code in enumerate(_weight_order(table))}
+    collator = Collator(table)
+    names = make_names(args.count, args.seed)
+    print(f"{len(names)} names")
+
+    print("-- key building only")
+    timed("naive tuple key", lambda n: list(map(naive_tuple_key(ranks), n)), names)
+    timed("Collator.sort_keys", collator.sort_keys, names)
+    print("-- full sort")
+    timed("code point (wrong order)", sorted, names)
+    expected = timed("naive tuple key", lambda n: sorted(n, key=naive_tuple_key(ranks)), names)
+    timed("naive list key", lambda n: sorted(n, key=naive_list_key(ranks)), names, expected)
+    timed("Collator.sort_key", lambda n: sorted(n, key=collator.sort_key), names, expected)
+    # Repeated values (surnames, place names) are where the cache pays off
+    repeated = names[:collator.cache_size // 2] * 2
+    timed("naive tuple key, repeated", lambda n: sorted(n, key=naive_tuple_key(ranks)), repeated)
+    timed("Collator.sort_key, repeated", lambda n: sorted(n, key=collator.sort_key), repeated)
+    timed("Collator.sort (batched)", collator.sort, names, expected)
+    timed("Collator.bytes_key", lambda n: sorted(n, key=collator.bytes_key), names, expected)
+
+
+if __name__ == "__main__":
+    main()
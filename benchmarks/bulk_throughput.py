@@ -0,0 +1,271 @@
+"""Offline conversion throughput over synthetic corpora from 1 MB upwards
+
+Ethiopic text is synthesized from the table's syllables (a Zipf-shaped
+vocabulary, so words repeat as in real prose, or taken from --source)
+and reverse-mapped through config.csv to the Latin a user would type.
+Every bulk mode then converts each corpus in a fresh process, so peak
+RSS belongs to that run alone (pool workers report their own):
+
+  scalar       Layout.transliterate over the whole text
+  cached       FieldConverter over whitespace-split words (repeats are free)
+  regex        one compiled longest-first alternation of the keys, re.sub;
+               the stand-in for a vectorized mode, as there is no array
+               library in the tree and this keeps the scan in C
+  multiprocess dataset_converter.convert_stream with --workers processes
+  streaming    dataset_converter.convert_stream, one process, file to file
+
+In-memory modes time the conversion only; the two file modes time the
+whole file-to-file run. Results (MB/s, peak RSS, output hash and whether
+it matches scalar) go to a JSON file, along with each mode's throughput
+relative to its smallest corpus.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEMINI = os.path.join(ROOT, "gemini")
+sys.path.insert(0, GEMINI)
+sys.path.insert(0, ROOT)
+
+from shared.phrase_trie import read_table  # noqa: E402
+from transliterator import load_layout  # noqa: E402
+from dataset_converter import FieldConverter, convert_stream  # noqa: E402
+
+MODES = ("scalar", "cached", "regex", "multiprocess", "streaming")
+MB = 1 << 20
+# Lines are drawn from a pool of this much text, so large corpora stay quick to build
+POOL_BYTES = 8 * MB
+
+
+class LineJob:
+    """convert_stream job for plain text: every record is one line"""
+
+    def run(self, converter, records):
+        return "".join(converter.layout.transliterate(record) for record in records)
+
+
+class MeasuredLineJob(LineJob):
+    """LineJob whose batches come back with the worker's pid and peak RSS"""
+
+    def run(self, converter, records):
+        return super().run(converter, records), os.getpid(), peak_rss()
+
+
+class MeasuredOutput:
+    """dst for convert_stream with MeasuredLineJob: writes the text, keeps each worker's peak"""
+
+    def __init__(self, dst):
+        self.dst = dst
+        self.peaks = {}
+
+    def write(self, result):
+        text, pid, rss = result
+        self.dst.write(text)
+        self.peaks[pid] = max(rss, self.peaks.get(pid, 0))
+
+
+def reverse_table(table):
+    """Ethiopic output -> shortest Latin key producing it"""
+    reverse = {}
+    for key, value in table.items():
+        if value not in reverse or len(key) < len(reverse[value]):
+            reverse[value] = key
+    return reverse
+
+
+def ethiopic_lines(table, rng, vocabulary=20000):
+    """Endless synthetic Ethiopic lines, word frequencies roughly Zipf"""
+    syllables = sorted(value for value in set(table.values()) if len(value) == 1 and 0x1200 <= ord(value) < 0x1360)
+    words = ["".join(rng.choice(syllables) for _ in range(rng.randint(1, 5))) for _ in range(vocabulary)]
+    cumulative = list(itertools.accumulate(1.0 / rank for rank in range(1, vocabulary + 1)))
+    while True:
+        sentence = rng.choices(words, cum_weights=cumulative, k=rng.randint(4, 18))
+        yield " ".join(sentence) + rng.choice(("።", "።", "፣", "፧")) + "\n"
+
+
+def source_lines(path):
+    while True:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line if line.endswith("\n") else line + "\n"
+
+
+def latin(line, reverse):
+    return "".join(reverse.get(ch, ch) for ch in line)
+
+
+def build_corpus(path, size, config, seed, source=None):
+    """Write about size bytes of Latin text to path"""
+    table = read_table(config)
+    reverse = reverse_table(table)
+    rng = random.Random(seed)
+    lines = source_lines(source) if source else ethiopic_lines(table, rng)
+    pool = []
+    pooled = 0
+    while pooled < min(size, POOL_BYTES):
+        line = latin(next(lines), reverse)
+        pool.append(line)
+        pooled += len(line.encode("utf-8"))
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for line in pool:
+            f.write(line)
+            written += len(line.encode("utf-8"))
+            if written >= size:
+                return
+        while written < size:
+            block = "".join(rng.choices(pool, k=1000))
+            f.write(block)
+            written += len(block.encode("utf-8"))
+
+
+def corpus_path(workdir, size, seed, config, source):
+    tag = hashlib.sha1(f"{size}:{seed}:{os.path.abspath(config)}:{source}".encode()).hexdigest()[:10]
+    return os.path.join(workdir, f"corpus-{size // MB}mb-{tag}.txt")
+
+
+def regex_converter(config):
+    table = read_table(config)
+    keys = sorted(table, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(key) for key in keys))
+    return lambda text: pattern.sub(lambda match: table[match.group()], text)
+
+
+def peak_rss():
+    """Peak resident set of the calling process, bytes
+
+    Pool workers are terminated rather than waited for, so RUSAGE_CHILDREN
+    never sees them; each worker measures itself instead.
+    """
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def run_mode(mode, corpus, config, workers):
+    """Child process: one mode over one corpus, returns the result dict"""
+    size = os.path.getsize(corpus)
+    output_hash = hashlib.sha1()
+    workers = workers if mode == "multiprocess" else 1
+    peaks = {}
+    if mode in ("multiprocess", "streaming"):
+        target = corpus + f".{mode}.out"
+        start = time.perf_counter()
+        with open(corpus, encoding="utf-8", newline="") as src, \
+                open(target, "w", encoding="utf-8", newline="") as dst:
+            if workers > 1:
+                output = MeasuredOutput(dst)
+                convert_stream(src, output, MeasuredLineJob(), config, workers=workers)
+                peaks = output.peaks
+            else:
+                convert_stream(src, dst, LineJob(), config)
+        seconds = time.perf_counter() - start
+        with open(target, "rb") as f:
+            for block in iter(lambda: f.read(MB), b""):
+                output_hash.update(block)
+        os.remove(target)
+    else:
+        with open(corpus, encoding="utf-8", newline="") as f:
+            text = f.read()
+        if mode == "scalar":
+            convert = load_layout(config).transliterate
+        elif mode == "cached":
+            converter = FieldConverter(load_layout(config))
+            convert = lambda text: "".join(converter.convert_column(re.split(r"(\s+)", text)))  # noqa: E731
+        else:
+            convert = regex_converter(config)
+        start = time.perf_counter()
+        output = convert(text)
+        seconds = time.perf_counter() - start
+        output_hash.update(output.encode("utf-8"))
+    return {"mode": mode, "bytes": size, "size_mb": round(size / MB, 2), "seconds": round(seconds, 4),
+            "mb_per_s": round(size / MB / seconds, 3), "peak_rss_mb": round(peak_rss() / MB, 1),
+            "children_peak_rss_mb": round(max(peaks.values(), default=0) / MB, 1),
+            "children_total_rss_mb": round(sum(peaks.values()) / MB, 1), "workers": workers,
+            "output_sha1": output_hash.hexdigest()}
+
+
+def scaling(results):
+    """Throughput of each mode relative to its smallest corpus"""
+    curves = {}
+    for result in sorted(results, key=lambda result: result["bytes"]):
+        curves.setdefault(result["mode"], []).append(result)
+    return {mode: [{"size_mb": point["size_mb"], "relative": round(point["mb_per_s"] / points[0]["mb_per_s"], 3)}
+                   for point in points]
+            for mode, points in curves.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,10,100", help="corpus sizes in MB, comma separated (up to 1000)")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated, from: " + ", ".join(MODES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--config", default=os.path.join(GEMINI, "config.csv"), help="layout table")
+    parser.add_argument("--source", help="Ethiopic text to reverse-map instead of synthetic prose")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "senay_geez_bench"),
+                        help="where corpora are built and kept between runs")
+    parser.add_argument("--output", default="bulk_throughput.json", help="results file")
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "CORPUS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run[0], args.run[1], args.config, args.workers)))
+        return
+
+    modes = args.modes.split(",")
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = []
+    print(f"{'mode':<13} {'MB':>7} {'seconds':>9} {'MB/s':>8} {'RSS MB':>8} {'worker MB':>9}  output")
+    for size in sorted(int(float(value) * MB) for value in args.sizes.split(",")):
+        corpus = corpus_path(args.workdir, size, args.seed, args.config, args.source)
+        if not os.path.exists(corpus):
+            build_corpus(corpus + ".tmp", size, args.config, args.seed, args.source)
+            os.replace(corpus + ".tmp", corpus)
+        reference = None
+        for mode in modes:
+            command = [sys.executable, os.path.abspath(__file__), "--run", mode, corpus,
+                       "--config", args.config, "--workers", str(args.workers)]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"{mode:<13} failed:\n{completed.stderr}")
+                continue
+            result = json.loads(completed.stdout)
+            if mode == "scalar":
+                reference = result["output_sha1"]
+            result["matches_scalar"] = None if reference is None else result["output_sha1"] == reference
+            results.append(result)
+            match = {None: "", True: "same as scalar", False: "DIFFERS from scalar"}[result["matches_scalar"]]
+            print(f"{mode:<13} {result['size_mb']:7.1f} {result['seconds']:9.3f} {result['mb_per_s']:8.2f} "
+                  f"{result['peak_rss_mb']:8.1f} {result['children_peak_rss_mb']:9.1f}  {match}")
+
+    report = {
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor(), "cpus": os.cpu_count()},
+        "settings": {"config": os.path.abspath(args.config), "seed": args.seed, "source": args.source,
+                     "workers": args.workers},
+        "results": results,
+        "scaling": scaling(results),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
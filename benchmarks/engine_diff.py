@@ -0,0 +1,343 @@
+"""Run every engine over the same key streams, diff their output, time them
+
+Engines are registered in ENGINES with the folder their modules live in;
+each folder runs in its own process (the folders share module names) and
+reports back as JSON. Keys are fed one at a time with no sleeps and the
+engines' edits rebuild the text the application would show. Output that
+differs from the reference engine is flagged, and --baseline saves or
+checks the outputs so an optimization can be shown not to change them.
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+import fakes
+
+RELAY = fakes.install()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEMINI = os.path.join(ROOT, "gemini")
+DEEPSEEK = os.path.join(ROOT, "deepseek")
+
+KEY_NAMES = {" ": "space", "\n": "enter", "\b": "backspace"}
+
+
+class Harness:
+    """Feeds keys to an engine and rebuilds the document from its edits
+
+    A typed key reaches the document just before the engine's first edit
+    for it, or after the handler returns, unless the engine suppressed it.
+    Injected keys the hook would see again are fed back afterwards.
+    """
+
+    def __init__(self):
+        self.document = []
+        self.pending = None
+        self.echoes = deque()
+
+    def apply(self, char):
+        if char == "\b":
+            if self.document:
+                self.document.pop()
+        else:
+            self.document.append(char)
+
+    def deliver(self):
+        if self.pending is not None:
+            self.apply(self.pending)
+            self.pending = None
+
+    def suppress(self):
+        self.pending = None
+
+    def inject_key(self, name):
+        self.deliver()
+        char = {"backspace": "\b", "space": " ", "enter": "\n"}.get(name, name)
+        self.apply(char)
+        self.echoes.append(char)
+
+    def inject_text(self, text, echoed):
+        self.deliver()
+        self.document.extend(text)
+        for char in text:
+            if echoed or ord(char) < 128:
+                self.echoes.append(char)
+
+    def run(self, keys, handle):
+        for char in keys:
+            self.pending = char
+            handle(char, False)
+            self.deliver()
+            while self.echoes:
+                handle(self.echoes.popleft(), True)
+        return "".join(self.document)
+
+
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def keyboard_engine(module_name, config):
+    """A deepseek TextSubstituter: key-down and key-up events, no sleeping"""
+    if DEEPSEEK not in sys.path:
+        sys.path.insert(0, DEEPSEEK)
+    module = __import__(module_name)
+    from shared.hook_watchdog import HookWatchdog
+
+    cwd = os.getcwd()
+    os.chdir(DEEPSEEK)
+    try:
+        with quiet():
+            substituter = module.TextSubstituter()
+            substituter.config_file = config
+            substituter.load_config()
+    finally:
+        os.chdir(cwd)
+    substituter.check_config_updates = lambda: None
+    substituter.watchdog = HookWatchdog(sleeper=lambda seconds: None, log=lambda message: None)
+    clock = [0.0]
+
+    def handle(char, injected):
+        clock[0] += 0.1
+        name = KEY_NAMES.get(char, char)
+        substituter.on_key_press(fakes.KeyboardEvent(name, "down", clock[0]))
+        substituter.on_key_press(fakes.KeyboardEvent(name, "up", clock[0]))
+    return handle
+
+
+def ime_engine(config):
+    """gemini SenayGeezIME.on_key_press through the pynput fakes"""
+    if GEMINI not in sys.path:
+        sys.path.insert(0, GEMINI)
+    import ethiopic_ime
+
+    with quiet():
+        ime = ethiopic_ime.SenayGeezIME(fakes.Anything())
+        ime.config_path = config
+        ime.load_config()
+    ime.usage.path = os.path.join(tempfile.mkdtemp(), "usage.bin")
+    ime.composition = False
+    ime.watchdog = ethiopic_ime.HookWatchdog(sleeper=lambda seconds: None, log=lambda message: None)
+    special = {" ": fakes.Key.space, "\n": fakes.Key.enter, "\b": fakes.Key.backspace}
+
+    def handle(char, injected):
+        ime.on_key_press(special.get(char) or fakes.KeyCode.from_char(char))
+    return handle
+
+
+def layout_engine(config):
+    """The compiled gemini transducer on its own, editing the document directly"""
+    if GEMINI not in sys.path:
+        sys.path.insert(0, GEMINI)
+    from transliterator import load_layout, ROOT as START
+
+    layout = load_layout(config)
+    current = {"state": START, "previous": ""}
+
+    def handle(char, injected):
+        if injected:
+            return
+        harness = RELAY.target
+        harness.deliver()
+        if char in KEY_NAMES:
+            current["state"] = START
+            current["previous"] = ""
+            return
+        state, back, text = layout.step(current["state"], char)
+        current["state"] = state
+        if text != char or back:
+            # The typed key, plus the previous unit when it is replaced
+            for _ in range(1 + (len(current["previous"]) if back else 0)):
+                harness.apply("\b")
+            harness.document.extend(text)
+        current["previous"] = text
+    return handle
+
+
+# name: (folder, factory(config) -> handle(char, injected))
+ENGINES = {
+    "ime": ("gemini", ime_engine),
+    "layout": ("gemini", layout_engine),
+    "substituter": ("deepseek", lambda config: keyboard_engine("text_substituter", config)),
+    "senay_geez": ("deepseek", lambda config: keyboard_engine("senay_geez", config)),
+}
+
+
+def table_keys(config):
+    keys = []
+    with open(config, encoding="utf-8") as f:
+        for line in f:
+            key = line.split(",", 1)[0].strip()
+            if key and key.isascii() and key.isalpha() and key not in keys:
+                keys.append(key)
+    return keys
+
+
+def make_streams(config, size, seed):
+    """Named key streams of about size keys each"""
+    rng = random.Random(seed)
+    keys = table_keys(config)
+
+    def words(count):
+        return " ".join("".join(rng.choice(keys) for _ in range(rng.randint(2, 4))) for _ in range(count))
+
+    streams = {}
+    streams["table"] = " ".join(keys)  # Every key once, on its own
+    text = words(size // 8)
+    streams["words"] = text[:size]
+    streams["runs"] = "".join(rng.choice(keys) for _ in range(size // 2))[:size]
+    edited = []
+    for char in words(size // 8)[:size]:
+        edited.append(char)
+        if rng.random() < 0.1:
+            edited.append("\b")
+    streams["edits"] = "".join(edited)
+    return streams
+
+
+def measure(factory, config, keys):
+    """Output, seconds and allocation figures for one engine over one stream
+
+    The traced peak includes the rebuilt document, the same for every engine.
+    """
+    RELAY.target = Harness()
+    handle = factory(config)
+    start = time.perf_counter()
+    output = RELAY.target.run(keys, handle)
+    seconds = time.perf_counter() - start
+
+    # Allocations on a second, fresh run so tracing does not skew the timing
+    RELAY.target = Harness()
+    handle = factory(config)
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    RELAY.target.run(keys, handle)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"output": output, "seconds": seconds, "keys": len(keys),
+            "peak_bytes": peak, "blocks": sys.getallocatedblocks() - blocks}
+
+
+def run_folder(args):
+    """Child process: every selected engine of one folder, JSON on stdout"""
+    streams = make_streams(args.config, args.size, args.seed)
+    results = {}
+    for name in args.engines:
+        folder, factory = ENGINES[name]
+        if folder != args.folder:
+            continue
+        with quiet():
+            results[name] = {stream: measure(factory, args.config, keys) for stream, keys in streams.items()}
+    json.dump(results, sys.stdout)
+
+
+def first_difference(expected, actual):
+    for index, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            return index
+    return min(len(expected), len(actual))
+
+
+def differing(expected, actual):
+    matcher = difflib.SequenceMatcher(None, expected, actual, autojunk=False)
+    return sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+
+
+def report(results, streams, reference):
+    print(f"{'engine':<12} {'stream':<7} {'keys':>6} {'us/key':>8} {'peak KB':>8} {'blocks':>7}  vs {reference}")
+    for name, runs in results.items():
+        for stream, run in runs.items():
+            expected = results.get(reference, {}).get(stream, {}).get("output")
+            if expected is None or name == reference:
+                status = ""
+            elif run["output"] == expected:
+                status = "same"
+            else:
+                status = f"DIFFERS ({differing(expected, run['output'])} chars)"
+            print(f"{name:<12} {stream:<7} {run['keys']:6d} {run['seconds'] / run['keys'] * 1e6:8.1f} "
+                  f"{run['peak_bytes'] / 1024:8.1f} {run['blocks']:7d}  {status}")
+
+    if reference not in results:
+        return
+    for stream, keys in streams.items():
+        expected = results[reference][stream]["output"]
+        for name, runs in results.items():
+            actual = runs[stream]["output"]
+            if name == reference or actual == expected:
+                continue
+            index = first_difference(expected, actual)
+            print(f"\n{name} vs {reference}, stream {stream}, first difference at character {index}:")
+            print(f"  {reference:<12} {expected[max(0, index - 12):index + 12]!r}")
+            print(f"  {name:<12} {actual[max(0, index - 12):index + 12]!r}")
+
+
+def check_baseline(path, results, args):
+    """Write the outputs the first time, compare against them afterwards"""
+    outputs = {name: {stream: run["output"] for stream, run in runs.items()} for name, runs in results.items()}
+    settings = {"config": os.path.abspath(args.config), "size": args.size, "seed": args.seed}
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "outputs": outputs}, f, ensure_ascii=False, indent=1)
+        print(f"\nBaseline written to {path}")
+        return True
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["settings"] != settings:
+        print(f"\nBaseline {path} was made with other settings: {baseline['settings']}")
+        return False
+    changed = [(name, stream) for name, runs in outputs.items() for stream, output in runs.items()
+               if name in baseline["outputs"] and baseline["outputs"][name].get(stream) != output]
+    for name, stream in changed:
+        print(f"\nChanged since baseline: {name} on {stream}")
+    if not changed:
+        print(f"\nAll outputs match {path}")
+    return not changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=os.path.join(DEEPSEEK, "config.csv"))
+    parser.add_argument("--engines", type=lambda value: value.split(","), default=list(ENGINES),
+                        help="comma separated, from: " + ", ".join(ENGINES))
+    parser.add_argument("--reference", default="ime", help="engine the others are diffed against")
+    parser.add_argument("--size", type=int, default=4000, help="keys per generated stream")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="JSON file of outputs to create or check against")
+    parser.add_argument("--folder", choices=("gemini", "deepseek"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    unknown = [name for name in args.engines if name not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+    if args.folder:
+        run_folder(args)
+        return
+
+    results = {}
+    for folder in sorted({ENGINES[name][0] for name in args.engines}):
+        command = [sys.executable, os.path.abspath(__file__), "--folder", folder, "--config", args.config,
+                   "--engines", ",".join(args.engines), "--size", str(args.size), "--seed", str(args.seed)]
+        completed = subprocess.run(command, capture_output=True, text=True, encoding="utf-8")
+        if completed.returncode != 0:
+            print(f"Error running the {folder} engines:\n{completed.stderr}")
+            sys.exit(1)
+        results.update(json.loads(completed.stdout))
+    results = {name: results[name] for name in args.engines if name in results}
+
+    report(results, make_streams(args.config, args.size, args.seed), args.reference)
+    if args.baseline and not check_baseline(args.baseline, results, args):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+"""Stand-in keyboard, pynput and GUI modules so the engines run headless
+
+install() puts the fakes into sys.modules before an engine module is
+imported. Keys the engines send go to an output backend, any object
+with inject_key(name), inject_text(text, echoed) and suppress() methods
+(the last for keyboard._suppress_key on the current key), through
+the Relay install() returns: engine modules keep the fake module they
+imported, so a new backend is plugged in by setting relay.target.
+
+tkinter widgets, Tk and PIL images and keyboard hooks are tracked well
+enough to show leaks: live widgets, PhotoImages, PIL images and their
+open files are counted, and after() callbacks run on a virtual clock
+when SCHEDULER.run() is called. Everything else absorbs every call.
+"""
+import enum
+import heapq
+import itertools
+import sys
+import threading
+import types
+
+
+class Anything:
+    """Accepts any attribute, call, item or context use and returns itself"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __getitem__(self, key):
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def __int__(self):
+        return 0
+
+    __index__ = __int__
+
+    def __str__(self):
+        return ""
+
+
+def stub_module(name, **attrs):
+    """Module whose unknown attributes are all Anything"""
+    module = types.ModuleType(name)
+    module.__getattr__ = lambda attr: Anything()
+    module.__dict__.update(attrs)
+    return module
+
+
+class NullBackend:
+    """Output backend that drops everything"""
+
+    def inject_key(self, name):
+        pass
+
+    def inject_text(self, text, echoed):
+        pass
+
+    def suppress(self):
+        pass
+
+
+class Relay:
+    """Forwards engine output to whichever backend is current"""
+
+    def __init__(self, target=None):
+        self.target = target or NullBackend()
+
+    def inject_key(self, name):
+        self.target.inject_key(name)
+
+    def inject_text(self, text, echoed):
+        self.target.inject_text(text, echoed)
+
+    def suppress(self):
+        self.target.suppress()
+
+
+# --- keyboard (deepseek) ---
+
+class KeyboardEvent:
+    def __init__(self, name, event_type, time, scan_code=0):
+        self.name = name
+        self.event_type = event_type
+        self.time = time
+        self.scan_code = scan_code
+
+
+def keyboard_module(backend):
+    """The parts of the keyboard library the substituters use
+
+    Like the real library on Windows, text written as unicode packets is
+    never reported to hooks, only ASCII characters are. Registered hooks
+    and hotkeys are kept in module.hooks and module.hotkeys, and wait()
+    never returns.
+    """
+    module = stub_module("keyboard", KEY_DOWN="down", KEY_UP="up", hooks=[], hotkeys=[])
+
+    def hook(callback, *args, **kwargs):
+        module.hooks.append(callback)
+        return callback
+
+    def unhook(handle):
+        if handle in module.hooks:
+            module.hooks.remove(handle)
+
+    def add_hotkey(hotkey, callback, *args, **kwargs):
+        handle = (hotkey, callback)
+        module.hotkeys.append(handle)
+        return handle
+
+    def remove_hotkey(handle):
+        if handle in module.hotkeys:
+            module.hotkeys.remove(handle)
+
+    def unhook_all():
+        module.hooks.clear()
+        module.hotkeys.clear()
+
+    module.press_and_release = lambda name: backend.inject_key(name)
+    module.write = lambda text, *args, **kwargs: backend.inject_text(text, False)
+    module.is_pressed = lambda name: False
+    module.hook = hook
+    module.unhook = unhook
+    module.add_hotkey = add_hotkey
+    module.remove_hotkey = remove_hotkey
+    module.unhook_all = unhook_all
+    module.wait = lambda *args, **kwargs: threading.Event().wait()
+    module._suppress_key = lambda scan_code: backend.suppress()
+    return module
+
+
+# --- pynput (gemini) ---
+
+class Key(enum.Enum):
+    alt = 1
+    alt_gr = 2
+    backspace = 3
+    caps_lock = 4
+    cmd = 5
+    ctrl = 6
+    delete = 7
+    down = 8
+    end = 9
+    enter = 10
+    esc = 11
+    f1 = 12
+    home = 13
+    insert = 14
+    left = 15
+    menu = 16
+    page_down = 17
+    page_up = 18
+    right = 19
+    shift = 20
+    space = 21
+    tab = 22
+    up = 23
+    pause = 24
+
+
+class KeyCode:
+    def __init__(self, vk=None, char=None):
+        self.vk = vk
+        self.char = char
+
+    @classmethod
+    def from_char(cls, char):
+        return cls(char=char)
+
+    @classmethod
+    def from_vk(cls, vk):
+        return cls(vk=vk)
+
+    def __eq__(self, other):
+        if not isinstance(other, KeyCode):
+            return NotImplemented
+        return (self.vk, self.char) == (other.vk, other.char)
+
+    def __hash__(self):
+        return hash((self.vk, self.char))
+
+
+class Listener:
+    def __init__(self, on_press=None, on_release=None, **kwargs):
+        self.on_press = on_press
+        self.on_release = on_release
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def suppress_event(self):
+        raise RuntimeError("suppress_event is only used by the win32 filter")
+
+
+def pynput_modules(backend):
+    """pynput and pynput.keyboard; the controller types into the backend
+
+    pynput types text as key events the listener does see again, so
+    injected text is reported as echoed.
+    """
+    def key_name(key):
+        return key.name if isinstance(key, Key) else key.char
+
+    class Controller:
+        def tap(self, key):
+            backend.inject_key(key_name(key))
+
+        def press(self, key):
+            backend.inject_key(key_name(key))
+
+        def release(self, key):
+            pass
+
+        def type(self, text):
+            backend.inject_text(text, True)
+
+    keyboard = stub_module("pynput.keyboard", Key=Key, KeyCode=KeyCode,
+                           Controller=Controller, Listener=Listener)
+    package = stub_module("pynput", keyboard=keyboard)
+    package.__path__ = []
+    return {"pynput": package, "pynput.keyboard": keyboard}
+
+
+# --- GUI and Windows-only modules ---
+
+class Scheduler:
+    """Virtual clock behind every fake widget's after()"""
+
+    def __init__(self):
+        self.now = 0
+        self.queue = []
+        self.ids = itertools.count(1)
+        self.cancelled = set()
+
+    def add(self, ms, func, args):
+        timer = next(self.ids)
+        heapq.heappush(self.queue, (self.now + int(ms), timer, func, args))
+        return timer
+
+    def cancel(self, timer):
+        self.cancelled.add(timer)
+
+    def run(self, ms):
+        """Advance the clock by ms, running callbacks as they fall due"""
+        until = self.now + ms
+        while self.queue and self.queue[0][0] <= until:
+            due, timer, func, args = heapq.heappop(self.queue)
+            self.now = due
+            if timer in self.cancelled:
+                self.cancelled.discard(timer)
+                continue
+            try:
+                func(*args)
+            except TclError:
+                pass  # Tk reports these on stderr and carries on
+        self.now = until
+
+
+SCHEDULER = Scheduler()
+
+
+class TclError(Exception):
+    pass
+
+
+class FakeWidget:
+    """Any tkinter widget; FakeWidget.live counts those not destroyed"""
+
+    live = 0
+    ids = itertools.count(1)
+
+    def __init__(self, master=None, *args, **kwargs):
+        self.master = master if isinstance(master, FakeWidget) else None
+        self.name = f"w{next(FakeWidget.ids)}"
+        self.children = {}
+        self.attrs = {"-alpha": 1.0}
+        self.destroyed = False
+        if self.master:
+            self.master.children[self.name] = self
+        FakeWidget.live += 1
+
+    def destroy(self):
+        if self.destroyed:
+            return
+        for child in list(self.children.values()):
+            child.destroy()
+        self.destroyed = True
+        FakeWidget.live -= 1
+        if self.master:
+            self.master.children.pop(self.name, None)
+
+    def _check(self):
+        if self.destroyed:
+            raise TclError(f'invalid command name ".{self.name}"')
+
+    def after(self, ms, func=None, *args):
+        self._check()
+        if func is not None:
+            return SCHEDULER.add(ms, func, args)
+
+    def after_cancel(self, timer):
+        SCHEDULER.cancel(timer)
+
+    def attributes(self, *args):
+        self._check()
+        if len(args) == 1:
+            return self.attrs.get(args[0], 0)
+        for name, value in zip(args[::2], args[1::2]):
+            self.attrs[name] = value
+
+    def winfo_screenwidth(self):
+        return 1920
+
+    def winfo_screenheight(self):
+        return 1080
+
+    def winfo_pointerxy(self):
+        return 0, 0
+
+    def __getattr__(self, name):
+        # pack, geometry, config, withdraw, ... : image= options are not
+        # kept, like Tk, which only stores the image name
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+
+class FakePhotoImage:
+    """Tk image; like Tk's, it is deleted when the Python object goes"""
+
+    live = 0
+
+    def __init__(self, image=None, *args, **kwargs):
+        FakePhotoImage.live += 1
+
+    def width(self):
+        return 64
+
+    def height(self):
+        return 64
+
+    def __del__(self):
+        FakePhotoImage.live -= 1
+
+
+class FakeImage:
+    """PIL image with a size
+
+    FakeImage.live counts images neither closed nor collected, and
+    FakeImage.files those opened from a file that is still open: PIL
+    keeps the file until load() or close().
+    """
+
+    live = 0
+    opened = 0
+    files = 0
+
+    def __init__(self, size=(64, 64), mode="RGBA", path=None):
+        self.size = size
+        self.width, self.height = size
+        self.mode = mode
+        self.closed = False
+        self.has_file = path is not None
+        FakeImage.live += 1
+        FakeImage.opened += 1
+        if self.has_file:
+            FakeImage.files += 1
+
+    def _release_file(self):
+        if self.has_file:
+            self.has_file = False
+            FakeImage.files -= 1
+
+    def resize(self, size, *args, **kwargs):
+        return FakeImage(tuple(size), self.mode)
+
+    def convert(self, mode):
+        return FakeImage(self.size, mode)
+
+    def copy(self):
+        return FakeImage(self.size, self.mode)
+
+    def load(self):
+        self._release_file()
+
+    def save(self, *args, **kwargs):
+        pass
+
+    def close(self):
+        self._release_file()
+        if not self.closed:
+            self.closed = True
+            FakeImage.live -= 1
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def gui_modules():
+    widgets = {name: FakeWidget for name in ("Tk", "Toplevel", "Label", "Frame", "Canvas", "Button")}
+    tkinter = stub_module("tkinter", messagebox=stub_module("tkinter.messagebox"), PhotoImage=FakePhotoImage,
+                          TclError=TclError, BOTH="both", X="x", Y="y", LEFT="left", RIGHT="right", **widgets)
+    tkinter.__path__ = []
+    image = stub_module("PIL.Image", Image=FakeImage,
+                        open=lambda path, *args, **kwargs: FakeImage(path=path),
+                        new=lambda mode, size, *args, **kwargs: FakeImage(tuple(size), mode))
+    pil = stub_module("PIL", Image=image, ImageTk=stub_module("PIL.ImageTk", PhotoImage=FakePhotoImage),
+                      ImageDraw=stub_module("PIL.ImageDraw"))
+    pil.__path__ = []
+    modules = {"tkinter": tkinter, "tkinter.messagebox": tkinter.messagebox, "PIL": pil}
+    for name in ("Image", "ImageTk", "ImageDraw"):
+        modules["PIL." + name] = getattr(pil, name)
+    for name in ("pystray", "psutil", "win32con"):
+        modules[name] = stub_module(name)
+    modules["win32gui"] = stub_module("win32gui", FindWindow=lambda *args: 0)
+    modules["win32api"] = stub_module("win32api", GetSystemMetrics=lambda index: (1920, 1080)[index] if index < 2 else 0)
+    return modules
+
+
+def install(gui=True):
+    """Replace keyboard, pynput (and the GUI modules) in sys.modules, returns the Relay"""
+    relay = Relay()
+    sys.modules["keyboard"] = keyboard_module(relay)
+    sys.modules.update(pynput_modules(relay))
+    if gui:
+        sys.modules.update(gui_modules())
+    return relay
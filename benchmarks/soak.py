@@ -0,0 +1,331 @@
+"""Days of simulated use in minutes, watching for anything that keeps growing
+
+Each app runs headless on the fakes in fakes.py, in its own process (the
+folders share module names), through three paths kept apart so a leak
+points at one of them:
+
+  toggles  page up on and off, each showing the overlay until it has
+           faded; for deepseek this also starts and stops the substituter
+  typing   words from the table, key by key
+  reload   the config file changes and is loaded again
+
+After every simulated hour the process is sampled: resident memory,
+threads, open file descriptors, live Tk widgets and images, PIL images
+and the files they hold open, keyboard hooks and hotkeys, and
+tracemalloc's current total. Growth from the end of the warm-up to the
+last hour beyond the limits fails the run (exit status 1), and the
+allocation sites that grew most are listed.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import fakes
+
+RELAY = fakes.install()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEMINI = os.path.join(ROOT, "gemini")
+DEEPSEEK = os.path.join(ROOT, "deepseek")
+
+APPS = ("gemini", "deepseek")
+PATHS = ("toggles", "typing", "reload")
+KEY_NAMES = {" ": "space", "\b": "backspace", "\n": "enter"}
+# Long enough for an overlay to show, fade and be destroyed
+OVERLAY_MS = 4000
+# Counted resources that may wobble by this much without failing
+COUNTERS = ("threads", "fds", "widgets", "photos", "images", "image_files", "hooks", "hotkeys")
+
+
+class Echoes:
+    """Output backend that hands injected keys back, as the hook reports them
+
+    Without them the substituter's injection tracker would hold every
+    announcement until it expires, which looks like growth.
+    """
+
+    def __init__(self):
+        self.names = []
+
+    def inject_key(self, name):
+        self.names.append(name)
+
+    def inject_text(self, text, echoed):
+        self.names.extend(KEY_NAMES.get(char, char) for char in text if echoed or ord(char) < 128)
+
+    def suppress(self):
+        pass
+
+    def drain(self):
+        names, self.names = self.names, []
+        return names
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Peak only, where there is no /proc
+
+
+def open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return 0
+
+
+def sample(hour):
+    gc.collect()
+    keyboard = sys.modules["keyboard"]
+    return {"hour": hour, "rss_mb": round(rss_mb(), 2), "threads": threading.active_count(), "fds": open_fds(),
+            "widgets": fakes.FakeWidget.live, "photos": fakes.FakePhotoImage.live,
+            "images": fakes.FakeImage.live, "image_files": fakes.FakeImage.files,
+            "hooks": len(keyboard.hooks), "hotkeys": len(keyboard.hotkeys),
+            "traced_mb": round(tracemalloc.get_traced_memory()[0] / (1 << 20), 3)}
+
+
+def table_words(config, seed):
+    """Endless words built from the table's keys, with the odd backspace"""
+    keys = []
+    with open(config, encoding="utf-8") as f:
+        for line in f:
+            key = line.split(",", 1)[0].strip()
+            if key and key.isascii() and key.isalpha():
+                keys.append(key)
+    rng = random.Random(seed)
+    while True:
+        word = "".join(rng.choice(keys) for _ in range(rng.randint(2, 4)))
+        if rng.random() < 0.1:
+            word += "\b"
+        yield word + " "
+
+
+def keys_for(words, count):
+    text = ""
+    while len(text) < count:
+        text += next(words)
+    return text[:count]
+
+
+def bump(path, hour):
+    """Rewrite path and move its mtime forward, as an editor saving it would"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    stamp = time.time() + hour * 3600
+    os.utime(path, (stamp, stamp))
+
+
+def gemini_paths(args, workdir):
+    """name -> step(hour, errors) for SenayGeezIME"""
+    sys.path.insert(0, GEMINI)
+    import ethiopic_ime
+    import tkinter
+
+    config = os.path.join(workdir, "config.csv")
+    shutil.copy(os.path.join(GEMINI, "config.csv"), config)
+    ime = ethiopic_ime.SenayGeezIME(tkinter.Tk())
+    ime.usage.path = os.path.join(workdir, "usage.bin")  # Never touch the real counters
+    ime.config_path = config
+    ime.composition = False
+    ime.watchdog = ethiopic_ime.HookWatchdog(sleeper=lambda seconds: None, log=lambda message: None)
+    special = {" ": fakes.Key.space, "\b": fakes.Key.backspace}
+    words = table_words(config, args.seed)
+
+    def toggles(hour, errors):
+        for _ in range(args.toggles_per_hour):
+            ime.on_key_press(fakes.Key.page_up)
+            fakes.SCHEDULER.run(OVERLAY_MS)
+
+    def typing(hour, errors):
+        for char in keys_for(words, args.keys_per_hour):
+            ime.on_key_press(special.get(char) or fakes.KeyCode.from_char(char))
+        fakes.SCHEDULER.run(OVERLAY_MS)
+
+    def reload(hour, errors):
+        for _ in range(args.reloads_per_hour):
+            bump(config, hour)
+            ime.load_config()
+    return {"toggles": toggles, "typing": typing, "reload": reload}
+
+
+def deepseek_paths(args, workdir):
+    """name -> step(hour, errors) for the senay_geez controller and substituter"""
+    sys.path.insert(0, DEEPSEEK)
+    for name in ("config.csv", "blue.png", "white.png"):
+        shutil.copy(os.path.join(DEEPSEEK, name), workdir)
+    os.chdir(workdir)  # config.csv and the overlay images are read from here
+    import senay_geez
+
+    controller = senay_geez.TaskbarOverlay()
+    substituter = senay_geez.TextSubstituter()
+    substituter.watchdog = senay_geez.HookWatchdog(sleeper=lambda seconds: None, log=lambda message: None)
+    words = table_words("config.csv", args.seed)
+    clock = [0.0]
+    echoes = RELAY.target = Echoes()
+
+    def press(name):
+        clock[0] += 0.2
+        substituter.on_key_press(fakes.KeyboardEvent(name, "down", clock[0]))
+        substituter.on_key_press(fakes.KeyboardEvent(name, "up", clock[0]))
+
+    def toggles(hour, errors):
+        for _ in range(args.toggles_per_hour):
+            try:
+                controller.toggle_script()
+            except SystemExit:
+                # The substituter's stop() exits the process
+                errors.append("toggle_script raised SystemExit")
+                controller.is_running = False
+            fakes.SCHEDULER.run(OVERLAY_MS)
+
+    def typing(hour, errors):
+        for char in keys_for(words, args.keys_per_hour):
+            press(KEY_NAMES.get(char, char))
+            for name in echoes.drain():
+                press(name)
+
+    def reload(hour, errors):
+        for _ in range(args.reloads_per_hour):
+            bump(substituter.config_file, hour)
+            substituter.check_config_updates()
+    return {"toggles": toggles, "typing": typing, "reload": reload}
+
+
+def soak(step, args):
+    """Samples, error messages and top growing allocation sites for one path"""
+    hours = int(args.days * 24)
+    errors = []
+    tracemalloc.start(args.frames)
+    samples = [sample(0)]
+    baseline = None
+    for hour in range(1, hours + 1):
+        step(hour, errors)
+        samples.append(sample(hour))
+        if hour == args.warmup:
+            baseline = tracemalloc.take_snapshot()
+    top = []
+    if baseline is not None:
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, fakes.__file__),
+                  tracemalloc.Filter(False, __file__)]
+        stats = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(baseline.filter_traces(ignore), "lineno")
+        top = [{"site": str(stat.traceback[0]), "size_kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+               for stat in stats[:args.top] if stat.size_diff > 0]
+    tracemalloc.stop()
+    return {"samples": samples, "errors": sorted(set(errors)), "error_count": len(errors), "top": top}
+
+
+def run_app(args):
+    """Child process: every selected path of one app, JSON on stdout"""
+    out = sys.stdout
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")  # The apps print on every toggle, from threads too
+    workdir = tempfile.mkdtemp(prefix="senay_geez_soak_")
+    try:
+        paths = (gemini_paths if args.app == "gemini" else deepseek_paths)(args, workdir)
+        results = {name: soak(paths[name], args) for name in args.paths}
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    json.dump(results, out)
+
+
+def growth(samples, warmup):
+    start = samples[min(warmup, len(samples) - 1)]
+    end = samples[-1]
+    return {key: round(end[key] - start[key], 3) for key in end if key != "hour"}
+
+
+def check(app, name, result, args):
+    """Report one path, returns the list of failures"""
+    grown = growth(result["samples"], args.warmup)
+    last = result["samples"][-1]
+    failures = []
+    if grown["rss_mb"] > args.max_rss_growth:
+        failures.append(f"rss grew {grown['rss_mb']} MB")
+    if grown["traced_mb"] > args.max_traced_growth:
+        failures.append(f"traced memory grew {grown['traced_mb']} MB")
+    for counter in COUNTERS:
+        if grown[counter] > args.max_count_growth:
+            failures.append(f"{counter} grew by {grown[counter]:g}")
+    if result["error_count"]:
+        failures.append(f"{result['error_count']} errors: {'; '.join(result['errors'])}")
+
+    print(f"{app:<9} {name:<8} {last['rss_mb']:8.1f} {grown['rss_mb']:+7.2f} {grown['traced_mb']:+8.3f} "
+          + " ".join(f"{last[counter]:>4}{grown[counter]:+4g}" for counter in COUNTERS)
+          + ("  FAIL" if failures else "  ok"))
+    for failure in failures:
+        print(f"    {failure}")
+    if failures:
+        for site in result["top"]:
+            print(f"    {site['size_kb']:+9.1f} KB {site['count']:+7d} blocks  {site['site']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=APPS, help="app to soak; by default each runs in its own process")
+    parser.add_argument("--paths", type=lambda value: value.split(","), default=list(PATHS),
+                        help="comma separated, from: " + ", ".join(PATHS))
+    parser.add_argument("--days", type=float, default=2.0, help="simulated days per path")
+    parser.add_argument("--warmup", type=int, default=2, help="hours before growth is measured")
+    parser.add_argument("--keys-per-hour", type=int, default=2000)
+    parser.add_argument("--toggles-per-hour", type=int, default=30)
+    parser.add_argument("--reloads-per-hour", type=int, default=2)
+    parser.add_argument("--max-rss-growth", type=float, default=8.0, help="MB")
+    parser.add_argument("--max-traced-growth", type=float, default=1.0, help="MB")
+    parser.add_argument("--max-count-growth", type=int, default=2, help="threads, files, widgets, ...")
+    parser.add_argument("--frames", type=int, default=1, help="tracemalloc traceback depth")
+    parser.add_argument("--top", type=int, default=10, help="allocation sites listed for a failing path")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON file for every sample")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    unknown = [name for name in args.paths if name not in PATHS]
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(unknown)}")
+    if args.child:
+        run_app(args)
+        return
+
+    results = {}
+    for app in [args.app] if args.app else APPS:
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--app", app, "--paths", ",".join(args.paths),
+                   "--days", str(args.days), "--warmup", str(args.warmup), "--keys-per-hour", str(args.keys_per_hour),
+                   "--toggles-per-hour", str(args.toggles_per_hour), "--reloads-per-hour", str(args.reloads_per_hour),
+                   "--frames", str(args.frames), "--top", str(args.top), "--seed", str(args.seed)]
+        completed = subprocess.run(command, capture_output=True, text=True, encoding="utf-8")
+        if completed.returncode != 0:
+            print(f"Error soaking {app}:\n{completed.stderr}")
+            sys.exit(1)
+        results[app] = json.loads(completed.stdout)
+
+    print(f"{int(args.days * 24)} simulated hours per path, growth from hour {args.warmup}")
+    print(f"{'app':<9} {'path':<8} {'RSS MB':>8} {'grown':>7} {'traced':>8} "
+          + " ".join(f"{counter[:9]:>8}" for counter in COUNTERS))
+    failed = False
+    for app, paths in results.items():
+        for name, result in paths.items():
+            failed |= bool(check(app, name, result, args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Samples written to {args.output}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
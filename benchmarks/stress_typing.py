@@ -0,0 +1,341 @@
+"""Burst typing through the engines on a virtual clock: lost keys, wrong text, latency
+
+Key events are generated at a given rate, with key-up overlapping the
+next key-down and optional auto-repeat, and fed to an engine through
+the fakes in fakes.py. The document the keys and the engine's edits
+end up in is compared with a run of the same events one second apart.
+
+Two delivery models are simulated:
+
+- keyboard library (TextSubstituter): the hook only queues events, so
+  a typed key reaches the application at once while the handler works
+  through the queue, sleeping for the typing delay and 10 ms per
+  backspace. Edits sent late land after newer keys.
+- pynput hook (SenayGeezIME): the callback runs inside the hook, so the
+  next key waits until it returns and edits always follow their key.
+
+Sleeps advance the virtual clock; the handlers' own CPU time is added
+to it as measured. With --recording the keys come at the pace of a
+keystroke recording (SENAY_GEEZ_RECORD) instead of at fixed rates.
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import itertools
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+
+import fakes
+
+RELAY = fakes.install()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from shared.keystroke_recorder import read_recording, replay_keys  # noqa: E402
+
+GEMINI = os.path.join(ROOT, "gemini")
+DEEPSEEK = os.path.join(ROOT, "deepseek")
+
+ENGINES = ("substituter", "substituter-fixed", "ime")
+KEY_NAMES = {" ": "space", "\n": "enter", "\b": "backspace"}
+# A gap long enough for every engine to finish, for the reference run
+SLOW_GAP = 1.0
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Document:
+    """Text of the focused application"""
+
+    def __init__(self):
+        self.chars = []
+        self.edits = 0
+
+    def type(self, text):
+        self.chars.extend(text)
+        self.edits += 1
+
+    def backspace(self):
+        if self.chars:
+            self.chars.pop()
+        self.edits += 1
+
+    def text(self):
+        return "".join(self.chars)
+
+
+class Simulation:
+    """Event queue between the physical keys, the engine and the document
+
+    Also the output backend of the fakes: injected keys change the
+    document at the current virtual time and come back through the hook.
+    """
+
+    def __init__(self, deliver_on_arrival):
+        self.deliver_on_arrival = deliver_on_arrival
+        self.clock = VirtualClock()
+        self.document = Document()
+        self.queue = deque()  # (arrival, kind, char, injected)
+        self.incoming = deque()
+        self.handler = None
+        self.max_depth = 0
+        self.latencies = []
+
+    def arrive_until(self, now):
+        """Physical events up to now reach the hook (and maybe the application)"""
+        while self.incoming and self.incoming[0][0] <= now:
+            arrival, kind, char = self.incoming.popleft()
+            if self.deliver_on_arrival and kind == "down":
+                self.deliver(char)
+            self.queue.append((arrival, kind, char, False))
+
+    def deliver(self, char):
+        if char == "\b":
+            self.document.backspace()
+        else:
+            self.document.type(char)
+
+    def inject_key(self, name):
+        self.arrive_until(self.clock.now)
+        char = {"backspace": "\b", "space": " ", "enter": "\n"}.get(name, name)
+        self.deliver(char)
+        self.queue.append((self.clock.now, "down", char, True))
+        self.queue.append((self.clock.now, "up", char, True))
+
+    def inject_text(self, text, echoed):
+        self.arrive_until(self.clock.now)
+        self.document.type(text)
+        for char in text:
+            if echoed or ord(char) < 128:
+                self.queue.append((self.clock.now, "down", char, True))
+                self.queue.append((self.clock.now, "up", char, True))
+
+    def suppress(self):
+        pass  # Only the suppressing senay_geez variant uses it
+
+    def run(self, events):
+        self.incoming = deque(events)
+        clock = self.clock
+        while self.incoming or self.queue:
+            if not self.queue:
+                clock.now = max(clock.now, self.incoming[0][0])
+            self.arrive_until(clock.now)
+            self.max_depth = max(self.max_depth, len(self.queue))
+            arrival, kind, char, injected = self.queue.popleft()
+            if not self.deliver_on_arrival and kind == "down" and not injected:
+                self.deliver(char)
+            start = time.perf_counter()
+            self.handler(kind, char, arrival, injected)
+            clock.now += time.perf_counter() - start
+            if kind == "down" and not injected:
+                self.latencies.append(clock.now - arrival)
+        return self.document.text()
+
+
+def substituter_engine(sim, adaptive):
+    """TextSubstituter wired to the simulation; adaptive=False pins the old 50 ms delay"""
+    if DEEPSEEK not in sys.path:
+        sys.path.insert(0, DEEPSEEK)
+    from text_substituter import TextSubstituter
+    from shared.hook_watchdog import HookWatchdog
+
+    cwd = os.getcwd()
+    os.chdir(DEEPSEEK)  # config.csv is read from the working directory
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            substituter = TextSubstituter()
+    finally:
+        os.chdir(cwd)
+    substituter.config_file = os.path.join(DEEPSEEK, "config.csv")
+    substituter.check_config_updates = lambda: None
+    substituter.watchdog = HookWatchdog(clock=sim.clock.time, sleeper=sim.clock.sleep, log=lambda message: None)
+    substituter.rhythm.clock = sim.clock.time
+    if not adaptive:
+        substituter.rhythm.record = lambda when: None
+
+    def handle(kind, char, arrival, injected):
+        name = KEY_NAMES.get(char, char)
+        substituter.on_key_press(fakes.KeyboardEvent(name, kind, arrival))
+    return handle
+
+
+def ime_engine(sim, scratch):
+    """SenayGeezIME on the pynput fakes; only key-down reaches on_press"""
+    if GEMINI not in sys.path:
+        sys.path.insert(0, GEMINI)
+    import ethiopic_ime
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ime = ethiopic_ime.SenayGeezIME(fakes.Anything())
+    ime.usage.path = os.path.join(scratch, "usage.bin")  # Never touch the real counters
+    ime.composition = False
+    ime.watchdog = ethiopic_ime.HookWatchdog(clock=sim.clock.time, sleeper=sim.clock.sleep,
+                                             log=lambda message: None)
+    special = {" ": fakes.Key.space, "\n": fakes.Key.enter, "\b": fakes.Key.backspace}
+
+    def handle(kind, char, arrival, injected):
+        if kind == "down":
+            key = special.get(char) or fakes.KeyCode.from_char(char)
+            ime.on_key_press(key)
+    return handle
+
+
+def make_text(config, words, seed):
+    """Random words built from the table's own keys"""
+    rng = random.Random(seed)
+    keys = []
+    with open(config, encoding="utf-8") as f:
+        for line in f:
+            key = line.split(",", 1)[0].strip()
+            if key and key.isascii() and key.isalpha():
+                keys.append(key)
+    return " ".join("".join(rng.choice(keys) for _ in range(rng.randint(2, 4))) for _ in range(words))
+
+
+def make_events(text, rate, overlap, repeat, seed):
+    """(time, kind, char) physical events for typing text at rate keys/second
+
+    Each key is held for overlap times the mean interval, so with
+    overlap above 1 key-up comes after the next key-down. With
+    probability repeat a key is held into auto-repeat (250 ms, 30/s).
+    """
+    rng = random.Random(seed)
+    events = []
+    now = 0.0
+    interval = 1.0 / rate
+    for char in text:
+        events.append((now, "down", char))
+        gap = interval * rng.uniform(0.6, 1.4)
+        hold = overlap * interval
+        if char != " " and rng.random() < repeat:
+            repeats = rng.randint(1, 3)
+            for count in range(repeats):
+                events.append((now + 0.25 + count / 30.0, "down", char))
+            # The next key only goes down once this one is released
+            hold = 0.25 + repeats / 30.0
+            gap += hold
+        events.append((now + hold, "up", char))
+        now += gap
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def recorded_events(keys, text, overlap):
+    """(time, kind, char) events at the pace of a recording's replay_keys()
+
+    Keys a private recording only kept as hashes are typed from text
+    instead. Keys are held for overlap times the mean interval.
+    """
+    fill = itertools.cycle(text)
+    interval = sum(delay for delay, _ in keys) / max(1, len(keys) - 1)
+    events = []
+    now = 0.0
+    for delay, char in keys:
+        now += delay
+        if char is None:
+            char = next(fill)
+        events.append((now, "down", char))
+        events.append((now + overlap * interval, "up", char))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def spaced(events):
+    """The same events one SLOW_GAP apart"""
+    return [(index * SLOW_GAP, kind, char) for index, (_, kind, char) in enumerate(events)]
+
+
+def simulate(engine, events, scratch):
+    sim = Simulation(deliver_on_arrival=engine != "ime")
+    RELAY.target = sim
+    if engine == "ime":
+        sim.handler = ime_engine(sim, scratch)
+    else:
+        sim.handler = substituter_engine(sim, adaptive=engine == "substituter")
+    return sim, sim.run(events)
+
+
+def compare(expected, actual):
+    """Dropped, extra and wrong characters of actual against expected"""
+    dropped = extra = wrong = 0
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, expected, actual, autojunk=False).get_opcodes():
+        if tag == "delete":
+            dropped += i2 - i1
+        elif tag == "insert":
+            extra += j2 - j1
+        elif tag == "replace":
+            wrong += max(i2 - i1, j2 - j1)
+    return dropped, extra, wrong
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def run_engine(args):
+    config = os.path.join(GEMINI if args.engine == "ime" else DEEPSEEK, "config.csv")
+    text = make_text(config, args.words, args.seed)
+    print(f"== {args.engine}: {len(text)} characters, overlap {args.overlap}, repeat {args.repeat}")
+    print(f"{'keys/s':>6} {'out':>5} {'dropped':>7} {'extra':>6} {'wrong':>6} {'queue':>6} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    scratch = tempfile.mkdtemp()
+    runs = [(rate, make_events(text, rate, args.overlap, args.repeat, args.seed)) for rate in args.rates]
+    if args.recording:
+        _, records = read_recording(args.recording)
+        keys = replay_keys(records)
+        duration = sum(delay for delay, _ in keys)
+        runs = [(len(keys) / duration if duration else 0.0, recorded_events(keys, text, args.overlap))]
+    for rate, events in runs:
+        _, expected = simulate(args.engine, spaced(events), scratch)
+        sim, actual = simulate(args.engine, events, scratch)
+        dropped, extra, wrong = compare(expected, actual)
+        latencies = sim.latencies
+        print(f"{rate:6.3g} {len(actual):5d} {dropped:7d} {extra:6d} {wrong:6d} {sim.max_depth:6d} "
+              f"{percentile(latencies, 0.5) * 1000:7.1f} {percentile(latencies, 0.99) * 1000:7.1f} "
+              f"{max(latencies) * 1000:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=ENGINES,
+                        help="engine to drive; by default each runs in its own process")
+    parser.add_argument("--rates", type=lambda value: [float(rate) for rate in value.split(",")],
+                        default=[2, 5, 8, 10, 12, 15, 20, 25], help="keys per second, comma separated")
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--overlap", type=float, default=1.5, help="key hold time in mean intervals")
+    parser.add_argument("--repeat", type=float, default=0.0, help="share of keys held into auto-repeat")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--recording", help="type at the pace of a keystroke recording (.sgkr) instead of --rates")
+    args = parser.parse_args()
+
+    if args.engine:
+        run_engine(args)
+        return
+    # Both engines use the same module names, so one process each
+    for engine in ENGINES:
+        command = [sys.executable, os.path.abspath(__file__), "--engine", engine,
+                   "--rates", ",".join(f"{rate:g}" for rate in args.rates), "--words", str(args.words),
+                   "--overlap", str(args.overlap), "--repeat", str(args.repeat), "--seed", str(args.seed)]
+        if args.recording:
+            command += ["--recording", args.recording]
+        subprocess.run(command, check=False)
+
+
+if __name__ == "__main__":
+    main()
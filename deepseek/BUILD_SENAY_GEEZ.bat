@@ -16,6 +16,7 @@ pyinstaller ^
   --onefile ^
   --windowed ^
   --name "Senay Geez" ^
+  --paths .. ^
   --add-data "blue.png;." ^
   --add-data "white.png;." ^
   --add-data "config.csv;." ^
@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['senay_geez.py'],
-    pathex=[],
+    pathex=['..'],
     binaries=[],
     datas=[('blue.png', '.'), ('white.png', '.'), ('config.csv', '.')],
     hiddenimports=[],
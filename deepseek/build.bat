@@ -40,7 +40,7 @@ REM Build the main text substituter
 echo ===============================================
 echo Building Text Substituter Main...
 echo ===============================================
-pyinstaller --onefile --noconsole --name "TextSubstituter" ^
+pyinstaller --onefile --noconsole --name "TextSubstituter" --paths .. ^
 --hidden-import=keyboard._winkeyboard ^
 --hidden-import=win32timezone ^
 --add-data "config.csv;." ^
@@ -51,7 +51,7 @@ if errorlevel 1 (
     echo Trying alternative build method...
     
     REM Try simpler build command
-    pyinstaller --onefile --noconsole --name "TextSubstituter" text_substituter.py
+    pyinstaller --onefile --noconsole --name "TextSubstituter" --paths .. text_substituter.py
     
     if errorlevel 1 (
         echo.
@@ -10,6 +10,7 @@ def build_exe():
         '--onefile',
         '--noconsole',
         '--name=TextSubstituterTray',
+        '--paths=..',
         '--add-data=blue.png;.',
         '--add-data=white.png;.',
         '--hidden-import=pystray._win32',
@@ -27,6 +28,7 @@ def build_exe():
         '--onefile',
         '--noconsole',
         '--name=TextSubstituter',
+        '--paths=..',
         '--hidden-import=keyboard._winkeyboard',
     ])
     
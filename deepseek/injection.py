@@ -0,0 +1,161 @@
+import ctypes
+import sys
+import time
+from collections import deque
+from threading import Lock
+
+import keyboard
+
+# Announced events the hook has not seen by then are dropped
+CLAIM_TIMEOUT = 1.0
+
+# Scan code of every key we inject. SendInput hands wScan to the hooks
+# unchanged and keyboard passes it on as event.scan_code, while no
+# keyboard sends it: our own keys are known by one comparison. The low
+# byte, all a window message keeps, is 0 as for any VK-only input
+INJECTION_SCAN_CODE = 0x5300
+
+# dwExtraInfo of our input, as the gemini IME stamps it, so its hook
+# leaves this output alone as well
+INJECTION_MARKER = 0x53470001
+
+INPUT_KEYBOARD = 1
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+VK_BACK = 0x08
+
+# keyboard event names for the ASCII characters keyboard.write types as keys
+_KEY_NAMES = {" ": "space", "\n": "enter", "\t": "tab"}
+
+
+class InjectionTracker:
+    """Recognises the untagged fallback's own key events when they reach the hook
+
+    The keyboard library hook does not pass on the injected flag, so each
+    event is announced here with a sequence number before it is sent, and
+    the hook claims announced events in order: one deque head check per
+    key. Unclaimed announcements expire, so a lost event cannot leave the
+    tracker out of step for good. Matching by name is a guess, which is
+    why Windows uses the tagged Win32Injector instead.
+    """
+
+    def __init__(self, timeout=CLAIM_TIMEOUT):
+        self.timeout = timeout
+        self.pending = deque()
+        self.lock = Lock()
+        self.sent = 0
+        self.claimed = 0
+
+    def expect(self, name, count=1):
+        """Announce count key-down events about to be injected"""
+        deadline = time.monotonic() + self.timeout
+        with self.lock:
+            for _ in range(count):
+                self.sent += 1
+                self.pending.append((self.sent, name, deadline))
+
+    def expect_text(self, text):
+        """Announce the key events keyboard.write will send for text
+
+        Non-ASCII characters go out as unicode packets, which the hook
+        never reports, so only ASCII characters are announced.
+        """
+        for ch in text:
+            if ord(ch) < 128:
+                self.expect(_KEY_NAMES.get(ch, ch))
+
+    def claim(self, name):
+        """True when a key-down event with this name is one we sent"""
+        if not self.pending:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            while self.pending and self.pending[0][2] < now:
+                self.pending.popleft()
+            if self.pending and self.pending[0][1] == name:
+                self.claimed = self.pending.popleft()[0]
+                return True
+        return False
+
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", ctypes.c_ushort), ("wScan", ctypes.c_ushort), ("dwFlags", ctypes.c_ulong),
+                ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long), ("dy", ctypes.c_long), ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong), ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _INPUTUNION(ctypes.Union):
+    # The mouse member only gives the union its real size
+    _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+
+class INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong), ("union", _INPUTUNION)]
+
+
+class Win32Injector:
+    """Sends tagged input: backspaces carry INJECTION_SCAN_CODE, and text
+    goes out as unicode packets, which the keyboard hook never reports
+    """
+
+    tagged = True
+
+    def __init__(self):
+        self._send_input = ctypes.windll.user32.SendInput
+
+    def _send(self, events):
+        inputs = (INPUT * len(events))()
+        for item, (vk, scan, flags) in zip(inputs, events):
+            item.type = INPUT_KEYBOARD
+            item.union.ki = KEYBDINPUT(vk, scan, flags, 0, INJECTION_MARKER)
+        self._send_input(len(events), inputs, ctypes.sizeof(INPUT))
+
+    def backspace(self):
+        self._send([(VK_BACK, INJECTION_SCAN_CODE, 0), (VK_BACK, INJECTION_SCAN_CODE, KEYEVENTF_KEYUP)])
+
+    def write(self, text):
+        events = []
+        data = text.encode("utf-16-le")
+        for i in range(0, len(data), 2):
+            unit = data[i] | data[i + 1] << 8
+            events.append((0, unit, KEYEVENTF_UNICODE))
+            events.append((0, unit, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP))
+        if events:
+            self._send(events)
+
+    def is_own(self, event):
+        """True when the hook event is one of ours, by its tag alone"""
+        return event.scan_code == INJECTION_SCAN_CODE
+
+
+class KeyboardInjector:
+    """keyboard library fallback for other platforms; its events carry no
+    tag, so they are announced to an InjectionTracker and claimed by name
+    """
+
+    tagged = False
+
+    def __init__(self, tracker=None):
+        self.tracker = tracker or InjectionTracker()
+
+    def backspace(self):
+        self.tracker.expect('backspace')
+        keyboard.press_and_release('backspace')
+
+    def write(self, text):
+        self.tracker.expect_text(text)
+        keyboard.write(text)
+
+    def is_own(self, event):
+        return self.tracker.claim(event.name)
+
+
+def create_injector():
+    """Tagged SendInput on Windows, the keyboard library elsewhere"""
+    if sys.platform == "win32":
+        return Win32Injector()
+    return KeyboardInjector()
@@ -2,28 +2,64 @@ import sys
 import os
 import keyboard
 import time
-import csv
 import psutil
 import subprocess
 from collections import deque
-from threading import Lock, Thread, Timer
+from injection import create_injector
+from typing_rhythm import TypingRhythm
+from threading import Event, Lock, Thread, Timer
 import tkinter as tk
 from PIL import Image, ImageTk, ImageDraw
 import win32gui
 import win32con
 import win32api
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.phrase_trie import extension_lookup, patch_extension_lookup  # noqa: E402
+from shared.hook_watchdog import HookWatchdog  # noqa: E402
+from shared.focus_context import FocusContexts  # noqa: E402
+from shared.config_layers import LayeredLoader  # noqa: E402
+from shared.layout_profiles import LayoutProfiles, DEFAULT  # noqa: E402
+from shared.keystroke_recorder import (from_environment, KEY_DOWN, KEY_UP, PASS, REPLACE, CONSUME,  # noqa: E402
+                                       EDIT, INJECTED, PASSTHROUGH, DISABLED)
+
+# Config files are polled this often, from a thread of their own rather
+# than the hook
+CONFIG_CHECK_INTERVAL = 1.0
+
+def compile_substitutions(table):
+    """One layout as the substituter uses it: the table and its prefix check"""
+    return table, extension_lookup(table)
+
+def patch_substitutions(compiled, table, changed):
+    """compile_substitutions(table) for a table differing from compiled's in the changed keys"""
+    base, extendable = compiled
+    added = [key for key in changed if key in table and key not in base]
+    removed = [key for key in changed if key not in table]
+    return table, patch_extension_lookup(extendable, added, removed)
 
 class TextSubstituter:
     def __init__(self):
         self.substitutions = {}
         self.buffer = deque(maxlen=20)
         self.lock = Lock()
+        self.injector = create_injector()  # Tagged output on Windows
+        self.watchdog = HookWatchdog()
         self.enabled = True
         self.config_file = "config.csv"
-        self.last_modified = 0
-        self.typing_delay = 0.05
+        self.layers = LayeredLoader(compile_substitutions, patch_substitutions)  # config.user.csv on top
+        self.typing_delay = 0.05  # Until the typing rhythm has been learned
+        self.rhythm = TypingRhythm(self.typing_delay)
+        self.extendable = extension_lookup({})
+        self.profiles = None
+        self.layout_name = DEFAULT
+        self.recorder = from_environment(os.getcwd())  # Opt-in via SENAY_GEEZ_RECORD
         self.suppress_keys = False
         self.pending_chars = []
+        self.hook = None
+        self.hotkeys = []
+        self.stopped = Event()
+        self.focus = FocusContexts(self)  # Buffer and held back keys per focused window
         
         # Special key mappings
         self.special_keys = {
@@ -44,7 +80,7 @@ class TextSubstituter:
         self.load_config()
         
     def load_config(self):
-        """Load substitutions from config.csv file only"""
+        """Load substitutions from config.csv, with the changes in config.user.csv"""
         self.substitutions = {}
         
         if not os.path.exists(self.config_file):
@@ -57,27 +93,66 @@ class TextSubstituter:
             return
         
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    if len(row) >= 2:
-                        key = row[0].strip()
-                        value = row[1].strip()
-                        self.substitutions[key] = value
-                
-                print(f"Loaded {len(self.substitutions)} substitutions from {self.config_file}")
-                self.last_modified = os.path.getmtime(self.config_file)
+            # Large phrase tables are compiled once and memory-mapped; the
+            # layouts/ folder is compiled in the background. Each file is
+            # merged with its user file, only the user's changes are redone
+            profiles = LayoutProfiles(self.config_file, self.layers)
+            profiles.load(self.layout_name)
+            self.profiles = profiles
+            if not self.activate_layout(self.layout_name):
+                self.activate_layout(DEFAULT)
+            print(f"Loaded {len(self.substitutions)} substitutions from {self.config_file}")
                 
         except Exception as e:
             print(f"Error loading config: {e}")
     
+    def activate_layout(self, name):
+        """Point the substituter at a compiled layout: no file is read, nothing waits"""
+        compiled = self.profiles.get(name) if self.profiles else None
+        if compiled is None:
+            return False
+        with self.lock:
+            self.substitutions, self.extendable = compiled
+            self.layout_name = name
+        return True
+    
+    def switch_layout(self, name):
+        """Change the layout of the focused window from the hotkey; held back keys are typed"""
+        if not self.activate_layout(name):
+            print(f"Layout {name} is not available yet")
+            return False
+        with self.lock:
+            for char in self.pending_chars:
+                self.injector.write(char)
+            self.pending_chars.clear()
+            self.buffer.clear()
+        print(f"\nLayout: {name}")
+        return True
+    
+    def next_layout(self):
+        if self.profiles:
+            self.switch_layout(self.profiles.next_name(self.layout_name))
+    
+    def watch_config(self, interval=CONFIG_CHECK_INTERVAL):
+        """Poll the config files until shutdown(), off the hook thread"""
+        while not self.stopped.wait(interval):
+            try:
+                self.check_config_updates()
+            except Exception as e:
+                print(f"Error checking config: {e}")
+    
     def check_config_updates(self):
-        """Check if config file has been modified and reload if necessary"""
-        if os.path.exists(self.config_file):
-            current_modified = os.path.getmtime(self.config_file)
-            if current_modified > self.last_modified:
-                print("Config file updated. Reloading substitutions...")
-                self.load_config()
+        """Check if config file, its user file or a layout has been modified and reload if necessary"""
+        profiles = self.profiles
+        if profiles is None:
+            paths = [self.config_file]
+        elif profiles.ready.is_set():
+            paths = profiles.paths.values()
+        else:
+            return  # Layouts still compiling in the background
+        if any(map(self.layers.stale, paths)):
+            print("Config file updated. Reloading substitutions...")
+            self.load_config()
     
     def get_character_from_event(self, event):
         """Get the actual character from keyboard event, handling all special keys"""
@@ -122,27 +197,39 @@ class TextSubstituter:
                 
             buffer_str = ''.join(self.buffer)
             
-            # Sort by length (longest first) to prioritize longer matches
-            sorted_subs = sorted(self.substitutions.items(), key=lambda x: len(x[0]), reverse=True)
-            
-            for key, value in sorted_subs:
-                if buffer_str.endswith(key):
+            # Try suffixes longest first to prioritize longer matches
+            for start in range(len(buffer_str)):
+                key = buffer_str[start:]
+                value = self.substitutions.get(key)
+                if value is not None:
                     return key, value
             return None, None
     
+    def is_ambiguous(self):
+        """True when the end of the buffer is a prefix of a longer key"""
+        with self.lock:
+            buffer_str = ''.join(self.buffer)
+        return any(self.extendable(buffer_str[start:]) for start in range(len(buffer_str)))
+
+    def stats(self):
+        """Typing rhythm and watchdog figures"""
+        stats = self.rhythm.stats()
+        stats["watchdog_trips"] = self.watchdog.trips
+        return stats
+
     def process_substitution(self, original, replacement):
         """Process the substitution by deleting original and typing replacement"""
         # Delete the original characters that were typed
         delete_count = len(self.pending_chars)
         for i in range(delete_count):
-            keyboard.press_and_release('backspace')
-            time.sleep(0.01)
+            self.injector.backspace()
+            self.watchdog.sleep(0.01)
         
         # Clear pending characters
         self.pending_chars.clear()
         
         # Type the replacement
-        keyboard.write(replacement)
+        self.injector.write(replacement)
     
     def should_suppress_character(self, char):
         """Check if this character should be suppressed (Latin characters that could form Ethiopic)"""
@@ -154,24 +241,63 @@ class TextSubstituter:
         return char in latin_chars
     
     def on_key_press(self, event):
-        """Handle key press events"""
+        """Handle key press events, timed by the hook watchdog"""
+        started = time.monotonic_ns()
+        decision = self.dispatch_key(event)
+        if self.recorder:
+            key = self.special_keys.get(event.name, event.name or "")
+            self.recorder.record(key, decision, started,
+                                 KEY_UP if event.event_type == keyboard.KEY_UP else KEY_DOWN)
+
+    def dispatch_key(self, event):
+        """Returns what was done with the event, for the keystroke recorder"""
         if not self.enabled:
+            return DISABLED
+
+        # Too slow lately: let keys through untouched until it recovers
+        if not self.watchdog.active():
+            self.flush_pending()
+            return PASSTHROUGH
+        self.watchdog.begin()
+        try:
+            return self.handle_key(event)
+        finally:
+            self.watchdog.end()
+            # Tripped just now: type the held back keys before the next key
+            # passes, pass-through never suppresses or substitutes them
+            if not self.watchdog.active():
+                self.flush_pending()
+
+    def flush_pending(self):
+        """Type the suppressed Latin keys as they are"""
+        if not self.pending_chars:
             return
-        
-        # Check for config updates periodically
-        if len(self.buffer) % 10 == 0:
-            self.check_config_updates()
-        
+        with self.lock:
+            for char in self.pending_chars:
+                self.injector.write(char)
+            self.pending_chars.clear()
+            self.buffer.clear()
+
+    def handle_key(self, event):
         # Handle regular characters
         if event.event_type == keyboard.KEY_DOWN:
+            # Our own injected keys come back through the hook
+            if self.injector.is_own(event):
+                return INJECTED
+
+            # Held back keys belong to the window they were typed in, and
+            # are backspaced over (or flushed) there only
+            if self.focus.check():
+                self.watchdog.mark("focus")
+
             # Skip modifier and special keys that shouldn't go in buffer
-            skip_keys = ['shift', 'ctrl', 'alt', 'caps lock', 'tab', 'enter', 'backspace', 'space', 
+            skip_keys = ['shift', 'ctrl', 'alt', 'caps lock', 'tab', 'enter', 'space', 
                         'f1', 'f2', 'f3', 'f4', 'f5', 'f6', 'f7', 'f8', 'f9', 'f10', 'f11', 'f12',
                         'print screen', 'scroll lock', 'pause', 'insert', 'home', 'page up',
                         'delete', 'end', 'page down', 'up', 'down', 'left', 'right', 'esc']
             
             if event.name in skip_keys:
-                return
+                return PASS
             
             # Handle backspace
             if event.name == 'backspace':
@@ -180,7 +306,7 @@ class TextSubstituter:
                         self.buffer.pop()
                     if self.pending_chars:
                         self.pending_chars.pop()
-                return
+                return EDIT
             
             # Get the actual character
             char = self.get_character_from_event(event)
@@ -194,19 +320,41 @@ class TextSubstituter:
                         self.buffer.append(char)
                         self.pending_chars.append(char)
                     
-                    # Wait a bit to allow multi-character sequences to be completed
-                    time.sleep(self.typing_delay)
+                    # Only a prefix a longer key could still extend has to wait,
+                    # for as long as this user's own pauses between keys suggest
+                    self.rhythm.record(event.time)
+                    wait = self.rhythm.wait(event.time)
+                    if wait > 0 and self.is_ambiguous():
+                        self.watchdog.sleep(wait)
                     
                     # Check for substitution after the delay
                     original, replacement = self.check_substitution()
+                    self.watchdog.mark("lookup")
                     if original and replacement:
                         # Process the substitution - this will type the Ethiopic character
                         self.process_substitution(original, replacement)
+                        self.watchdog.mark("inject")
+                        return REPLACE
                     # If no substitution found, characters remain in memory but not displayed
+                    return CONSUME
                 else:
                     # For non-Latin characters, allow normal typing but still track in buffer
                     with self.lock:
                         self.buffer.append(char)
+        return PASS
+    
+    def save_context(self):
+        return self.buffer, self.pending_chars, self.layout_name
+    
+    def restore_context(self, context):
+        """A new window gets its application's layout (layouts/apps.csv), else the current one"""
+        if context is None:
+            app_layout = self.profiles.for_application(self.focus.provider.application()) if self.profiles else None
+            context = deque(maxlen=20), [], app_layout or self.layout_name
+        buffer, pending_chars, layout_name = context
+        with self.lock:
+            self.buffer, self.pending_chars = buffer, pending_chars
+        self.activate_layout(layout_name)
     
     def start_monitoring(self):
         """Start monitoring keyboard input"""
@@ -222,16 +370,22 @@ class TextSubstituter:
         print("\nReady to use substitutions...")
         print("Mode: Ethiopic (ENABLED) - Latin characters suppressed")
         
-        # Register hotkeys
-        keyboard.add_hotkey('page up', self.toggle_enabled)
-        keyboard.add_hotkey('esc', self.stop)
-        
-        # Start monitoring all keys
-        keyboard.hook(self.on_key_press)
+        with self.lock:
+            # shutdown() may already have run, before this thread got here
+            if self.stopped.is_set():
+                return
+            # Register hotkeys, kept so shutdown() removes only ours
+            self.hotkeys = [keyboard.add_hotkey('page up', self.toggle_enabled),
+                            keyboard.add_hotkey('esc', self.stop),
+                            keyboard.add_hotkey('pause', self.next_layout)]
+            
+            # Start monitoring all keys
+            self.hook = keyboard.hook(self.on_key_press)
+            Thread(target=self.watch_config, daemon=True).start()
         
-        # Keep the program running
+        # Keep the program running until shutdown(); keyboard.wait() never returns
         try:
-            keyboard.wait()
+            self.stopped.wait()
         except KeyboardInterrupt:
             self.stop()
     
@@ -244,21 +398,36 @@ class TextSubstituter:
             with self.lock:
                 # Type all pending characters
                 for char in self.pending_chars:
-                    keyboard.write(char)
+                    self.injector.write(char)
                 self.pending_chars.clear()
         
         mode = "Ethiopic (ENABLED - Latin suppressed)" if self.enabled else "Latin (DISABLED - normal typing)"
         print(f"\nMode: {mode}")
+        print(f"Stats: {self.stats()}")
+    
+    def shutdown(self):
+        """Stop this substituter, leaving other hooks and hotkeys in place"""
+        with self.lock:
+            # Flush any pending characters before stopping
+            for char in self.pending_chars:
+                self.injector.write(char)
+            self.pending_chars.clear()
+            
+            if self.hook is not None:
+                keyboard.unhook(self.hook)
+                self.hook = None
+            for hotkey in self.hotkeys:
+                keyboard.remove_hotkey(hotkey)
+            self.hotkeys = []
+            # Lets start_monitoring return, ending its thread
+            self.stopped.set()
+        if self.recorder:
+            self.recorder.stop()
+            self.recorder = None
     
     def stop(self):
         """Stop the application"""
-        # Flush any pending characters before exiting
-        if self.pending_chars:
-            with self.lock:
-                for char in self.pending_chars:
-                    keyboard.write(char)
-                self.pending_chars.clear()
-        
+        self.shutdown()
         print("\nStopping Senay Geez...")
         keyboard.unhook_all()
         exit(0)
@@ -305,9 +474,15 @@ class TaskbarOverlay:
             white_draw.ellipse([8, 8, 56, 56], fill=(200, 200, 200, 255))
             white_image.save("white.png")
         
-        # Load images
-        self.blue_image = Image.open("blue.png")
-        self.white_image = Image.open("white.png")
+        # Load images, read in full so the files are not held open
+        self.blue_image = self.load_image("blue.png")
+        self.white_image = self.load_image("white.png")
+        self.photos = {}  # Resized overlay image per state, made once
+    
+    def load_image(self, path):
+        with Image.open(path) as image:
+            image.load()
+            return image.copy()
     
     def check_script_running(self):
         """Check if the text substituter script is running"""
@@ -347,9 +522,10 @@ class TaskbarOverlay:
     def stop_script(self):
         """Stop the text substituter functionality"""
         try:
-            # Stop the substituter if it's running
+            # Stop the substituter if it's running; stop() would exit the controller
             if self.substituter:
-                self.substituter.stop()
+                self.substituter.shutdown()
+                self.substituter = None
             
             self.is_running = False
             print("✓ Senay Geez STOPPED")
@@ -417,9 +593,11 @@ class TaskbarOverlay:
                 status_text = "Senay Geez"
                 text_color = "#ff4444"
             
-            # Resize image
-            image = image.resize((72, 72), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(image)
+            # Resize image; Tk keeps every PhotoImage until it is deleted, so one per state
+            photo = self.photos.get(self.is_running)
+            if photo is None:
+                image = image.resize((72, 72), Image.Resampling.LANCZOS)
+                photo = self.photos[self.is_running] = ImageTk.PhotoImage(image)
             
             # Create frame with background
             frame = tk.Frame(overlay, bg='#2b2b2b', relief='raised', bd=1)
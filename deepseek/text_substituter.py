@@ -1,19 +1,52 @@
 import keyboard
-import time
-import csv
 import os
+import sys
 from collections import deque
-from threading import Lock
+from injection import create_injector
+from typing_rhythm import TypingRhythm
+from threading import Event, Lock, Thread
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.phrase_trie import extension_lookup, patch_extension_lookup  # noqa: E402
+from shared.hook_watchdog import HookWatchdog  # noqa: E402
+from shared.cpu_profiler import SamplingProfiler, take_request  # noqa: E402
+from shared.focus_context import FocusContexts  # noqa: E402
+from shared.config_layers import LayeredLoader  # noqa: E402
+from shared.layout_profiles import LayoutProfiles, DEFAULT, take_request as take_layout_request  # noqa: E402
+
+# Config files and the tray controller's requests are polled this often,
+# from a thread of their own rather than the hook
+CONFIG_CHECK_INTERVAL = 1.0
+
+def compile_substitutions(table):
+    """One layout as the substituter uses it: the table and its prefix check"""
+    return table, extension_lookup(table)
+
+def patch_substitutions(compiled, table, changed):
+    """compile_substitutions(table) for a table differing from compiled's in the changed keys"""
+    base, extendable = compiled
+    added = [key for key in changed if key in table and key not in base]
+    removed = [key for key in changed if key not in table]
+    return table, patch_extension_lookup(extendable, added, removed)
 
 class TextSubstituter:
     def __init__(self):
         self.substitutions = {}
         self.buffer = deque(maxlen=20)
         self.lock = Lock()
+        self.injector = create_injector()  # Tagged output on Windows
+        self.watchdog = HookWatchdog()
         self.enabled = True
         self.config_file = "config.csv"
-        self.last_modified = 0
-        self.typing_delay = 0.05
+        self.layers = LayeredLoader(compile_substitutions, patch_substitutions)  # config.user.csv on top
+        self.typing_delay = 0.05  # Until the typing rhythm has been learned
+        self.rhythm = TypingRhythm(self.typing_delay)
+        self.extendable = extension_lookup({})
+        self.profiles = None
+        self.layout_name = DEFAULT
+        self.profiler = None  # Only exists while a capture runs
+        self.focus = FocusContexts(self)  # Buffer per focused window
+        self.stopped = Event()
         
         # Special key mappings
         self.special_keys = {
@@ -34,7 +67,7 @@ class TextSubstituter:
         self.load_config()
         
     def load_config(self):
-        """Load substitutions from config.csv file only"""
+        """Load substitutions from config.csv, with the changes in config.user.csv"""
         self.substitutions = {}
         
         if not os.path.exists(self.config_file):
@@ -47,27 +80,82 @@ class TextSubstituter:
             return
         
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    if len(row) >= 2:
-                        key = row[0].strip()
-                        value = row[1].strip()
-                        self.substitutions[key] = value
-                
-                print(f"Loaded {len(self.substitutions)} substitutions from {self.config_file}")
-                self.last_modified = os.path.getmtime(self.config_file)
+            # Large phrase tables are compiled once and memory-mapped; the
+            # layouts/ folder is compiled in the background. Each file is
+            # merged with its user file, only the user's changes are redone
+            profiles = LayoutProfiles(self.config_file, self.layers)
+            profiles.load(self.layout_name)
+            self.profiles = profiles
+            if not self.activate_layout(self.layout_name):
+                self.activate_layout(DEFAULT)
+            print(f"Loaded {len(self.substitutions)} substitutions from {self.config_file}")
                 
         except Exception as e:
             print(f"Error loading config: {e}")
     
+    def activate_layout(self, name):
+        """Point the substituter at a compiled layout: no file is read, nothing waits"""
+        compiled = self.profiles.get(name) if self.profiles else None
+        if compiled is None:
+            return False
+        with self.lock:
+            self.substitutions, self.extendable = compiled
+            self.layout_name = name
+        return True
+    
+    def switch_layout(self, name):
+        """Change the layout of the focused window, from the hotkey or the tray"""
+        if not self.activate_layout(name):
+            print(f"Layout {name} is not available yet")
+            return False
+        with self.lock:
+            self.buffer.clear()
+        print(f"\nLayout: {name}")
+        return True
+    
+    def next_layout(self):
+        if self.profiles:
+            self.switch_layout(self.profiles.next_name(self.layout_name))
+    
+    def check_layout_request(self):
+        """Switch layout when the tray controller asked for it"""
+        name = take_layout_request(os.path.dirname(os.path.abspath(self.config_file)))
+        if name:
+            self.switch_layout(name)
+    
+    def watch_config(self, interval=CONFIG_CHECK_INTERVAL):
+        """Poll the config files and the tray controller's requests until stopped"""
+        while not self.stopped.wait(interval):
+            try:
+                self.check_config_updates()
+                self.check_profile_request()
+                self.check_layout_request()
+            except Exception as e:
+                print(f"Error checking config: {e}")
+    
     def check_config_updates(self):
-        """Check if config file has been modified and reload if necessary"""
-        if os.path.exists(self.config_file):
-            current_modified = os.path.getmtime(self.config_file)
-            if current_modified > self.last_modified:
-                print("Config file updated. Reloading substitutions...")
-                self.load_config()
+        """Check if config file, its user file or a layout has been modified and reload if necessary"""
+        profiles = self.profiles
+        if profiles is None:
+            paths = [self.config_file]
+        elif profiles.ready.is_set():
+            paths = profiles.paths.values()
+        else:
+            return  # Layouts still compiling in the background
+        if any(map(self.layers.stale, paths)):
+            print("Config file updated. Reloading substitutions...")
+            self.load_config()
+    
+    def check_profile_request(self):
+        """Start a wall-clock profile when the tray controller asked for one"""
+        if self.profiler and self.profiler.running:
+            return
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        duration = take_request(directory)
+        if duration is not None:
+            self.profiler = SamplingProfiler(directory, duration)
+            self.profiler.start()
+            print(f"Wall-clock profile for {duration:g} s")
     
     def get_character_from_event(self, event):
         """Get the actual character from keyboard event, handling all special keys"""
@@ -112,38 +200,64 @@ class TextSubstituter:
                 
             buffer_str = ''.join(self.buffer)
             
-            # Sort by length (longest first) to prioritize longer matches
-            sorted_subs = sorted(self.substitutions.items(), key=lambda x: len(x[0]), reverse=True)
-            
-            for key, value in sorted_subs:
-                if buffer_str.endswith(key):
+            # Try suffixes longest first to prioritize longer matches
+            for start in range(len(buffer_str)):
+                key = buffer_str[start:]
+                value = self.substitutions.get(key)
+                if value is not None:
                     return key, value
             return None, None
     
+    def is_ambiguous(self):
+        """True when the end of the buffer is a prefix of a longer key"""
+        with self.lock:
+            buffer_str = ''.join(self.buffer)
+        return any(self.extendable(buffer_str[start:]) for start in range(len(buffer_str)))
+
+    def stats(self):
+        """Typing rhythm and watchdog figures"""
+        stats = self.rhythm.stats()
+        stats["watchdog_trips"] = self.watchdog.trips
+        return stats
+
     def process_substitution(self, original, replacement):
         """Process the substitution by deleting original and typing replacement"""
         # Delete the original characters
         delete_count = len(original)
         for i in range(delete_count):
-            keyboard.press_and_release('backspace')
-            time.sleep(0.01)
+            self.injector.backspace()
+            self.watchdog.sleep(0.01)
         
         # Type the replacement
-        keyboard.write(replacement)
+        self.injector.write(replacement)
     
     def on_key_press(self, event):
-        """Handle key press events"""
+        """Handle key press events, timed by the hook watchdog"""
         if not self.enabled:
             return
-        
-        # Check for config updates periodically
-        if len(self.buffer) % 10 == 0:
-            self.check_config_updates()
-        
+
+        # Too slow lately: let keys through untouched until it recovers
+        if not self.watchdog.active():
+            return
+        self.watchdog.begin()
+        try:
+            self.handle_key(event)
+        finally:
+            self.watchdog.end()
+
+    def handle_key(self, event):
         # Handle regular characters
         if event.event_type == keyboard.KEY_DOWN:
+            # Our own injected keys come back through the hook
+            if self.injector.is_own(event):
+                return
+
+            # Switching windows mid-syllable must not carry the buffer along
+            if self.focus.check():
+                self.watchdog.mark("focus")
+
             # Skip modifier and special keys that shouldn't go in buffer
-            skip_keys = ['shift', 'ctrl', 'alt', 'caps lock', 'tab', 'enter', 'backspace', 'space', 
+            skip_keys = ['shift', 'ctrl', 'alt', 'caps lock', 'tab', 'enter', 'space', 
                         'f1', 'f2', 'f3', 'f4', 'f5', 'f6', 'f7', 'f8', 'f9', 'f10', 'f11', 'f12',
                         'print screen', 'scroll lock', 'pause', 'insert', 'home', 'page up',
                         'delete', 'end', 'page down', 'up', 'down', 'left', 'right', 'esc']
@@ -164,14 +278,33 @@ class TextSubstituter:
                 with self.lock:
                     self.buffer.append(char)
                 
-                # Wait a bit to allow multi-character sequences to be completed
-                time.sleep(self.typing_delay)
+                # Only a prefix a longer key could still extend has to wait,
+                # for as long as this user's own pauses between keys suggest
+                self.rhythm.record(event.time)
+                wait = self.rhythm.wait(event.time)
+                if wait > 0 and self.is_ambiguous():
+                    self.watchdog.sleep(wait)
                 
                 # Check for substitution after the delay
                 original, replacement = self.check_substitution()
+                self.watchdog.mark("lookup")
                 if original and replacement:
                     # Process the substitution
                     self.process_substitution(original, replacement)
+                    self.watchdog.mark("inject")
+    
+    def save_context(self):
+        return self.buffer, self.layout_name
+    
+    def restore_context(self, context):
+        """A new window gets its application's layout (layouts/apps.csv), else the current one"""
+        if context is None:
+            app_layout = self.profiles.for_application(self.focus.provider.application()) if self.profiles else None
+            context = deque(maxlen=20), app_layout or self.layout_name
+        buffer, layout_name = context
+        with self.lock:
+            self.buffer = buffer
+        self.activate_layout(layout_name)
     
     def start_monitoring(self):
         """Start monitoring keyboard input"""
@@ -190,6 +323,10 @@ class TextSubstituter:
         # Register hotkeys
         keyboard.add_hotkey('page up', self.toggle_enabled)
         keyboard.add_hotkey('esc', self.stop)
+        keyboard.add_hotkey('pause', self.next_layout)
+        
+        # Config and tray requests are watched off the hook thread
+        Thread(target=self.watch_config, daemon=True).start()
         
         # Start monitoring all keys
         keyboard.hook(self.on_key_press)
@@ -205,10 +342,12 @@ class TextSubstituter:
         self.enabled = not self.enabled
         mode = "Ethiopic (ENABLED)" if self.enabled else "Latin (DISABLED)"
         print(f"\nMode: {mode}")
+        print(f"Stats: {self.stats()}")
     
     def stop(self):
         """Stop the application"""
         print("\nStopping Text Substituter...")
+        self.stopped.set()
         keyboard.unhook_all()
         exit(0)
 
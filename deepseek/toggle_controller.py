@@ -6,6 +6,9 @@ import psutil
 from threading import Thread, Lock
 from PIL import Image, ImageDraw
 import pystray
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.config_layers import create_user_file  # noqa: E402
 
 class ToggleController:
     def __init__(self):
@@ -159,10 +162,11 @@ class ToggleController:
             print(f"Error opening help: {e}")
     
     def open_settings(self, icon, item):
-        """Open config.csv file"""
+        """Open config.user.csv, the user's changes to config.csv"""
         try:
             if os.path.exists("config.csv"):
-                os.startfile("config.csv")
+                # config.csv is replaced on upgrade; the user's changes go on top
+                os.startfile(create_user_file("config.csv"))
             else:
                 print("Config file not found: config.csv")
         except Exception as e:
@@ -5,6 +5,11 @@ import psutil
 import time
 from threading import Thread, Event
 from infi.systray import SysTrayIcon
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.cpu_profiler import request_profile  # noqa: E402
+from shared.layout_profiles import find_layouts, request_layout  # noqa: E402
+from shared.config_layers import create_user_file  # noqa: E402
 
 class TrayController:
     def __init__(self):
@@ -13,10 +18,16 @@ class TrayController:
         self.is_running = False
         self.stop_event = Event()
         
+        # Layouts found beside config.csv at startup, as a submenu
+        layouts = tuple((name, None, lambda systray, name=name: self.choose_layout(name))
+                        for name in find_layouts(os.path.abspath("config.csv")))
+        
         # Menu options
         self.menu_options = (
             ("Help", None, self.open_help),
             ("Settings", None, self.open_settings),
+            ("Layout", None, layouts),
+            ("Wall-Clock Profile (30 s)", None, self.profile_cpu),
         )
         
         self.systray = None
@@ -117,15 +128,40 @@ class TrayController:
             print(f"Error opening help: {e}")
     
     def open_settings(self, systray):
-        """Open config.csv file"""
+        """Open config.user.csv, the user's changes to config.csv"""
         try:
             if os.path.exists("config.csv"):
-                os.startfile("config.csv")
+                # config.csv is replaced on upgrade; the user's changes go on top
+                os.startfile(create_user_file("config.csv"))
             else:
                 print("Config file not found: config.csv")
         except Exception as e:
             print(f"Error opening settings: {e}")
     
+    def choose_layout(self, name):
+        """Ask the running substituter to switch layout; it needs no reload"""
+        if not self.is_running:
+            print("Text Substituter is not running")
+            return
+        try:
+            # Picked up with the substituter's next config check
+            request_layout(os.getcwd(), name)
+            print(f"Layout {name} requested")
+        except OSError as e:
+            print(f"Error requesting layout: {e}")
+    
+    def profile_cpu(self, systray):
+        """Ask the running substituter for a wall-clock profile, saved next to config.csv"""
+        if not self.is_running:
+            print("Text Substituter is not running")
+            return
+        try:
+            # The substituter picks the request up with its next config check
+            request_profile(os.getcwd())
+            print("Wall-clock profile requested, it starts with the next keys typed")
+        except OSError as e:
+            print(f"Error requesting profile: {e}")
+    
     def monitor_script(self):
         """Monitor the script status"""
         while not self.stop_event.is_set():
@@ -0,0 +1,97 @@
+import time
+
+# Inter-key intervals are bucketed this finely, anything longer than the
+# last bucket counts as a pause between words rather than typing rhythm
+BUCKET_MS = 10
+BUCKETS = 50
+PAUSE = BUCKET_MS * BUCKETS / 1000.0
+
+# Counts are halved once this many intervals are held, so the histogram
+# follows the user's current pace
+WINDOW = 400
+MIN_SAMPLES = 30
+# Recompute the delay after this many new intervals
+REFRESH = 16
+
+# The delay covers this percentile of the gaps between keys, plus a
+# margin: a share of the median split a steady typist's ambiguous pairs
+# whenever a gap ran a little long. The keyboard library runs handlers
+# one at a time, so the wait counts from the key's own press (wait()):
+# time spent queued behind the keys before it is part of it, and the
+# event queue cannot grow (benchmarks/stress_typing.py)
+PERCENTILE = 0.95
+MARGIN = 0.02
+MIN_DELAY = 0.02
+MAX_DELAY = 0.25
+
+
+class TypingRhythm:
+    """Rolling histogram of inter-key intervals giving an adaptive commit delay
+
+    The delay is the percentile interval plus margin, clamped to
+    [min_delay, max_delay]. clock must be the clock of the key times,
+    time.time for keyboard library events.
+
+    Memory is one fixed list of bucket counts; each key costs one bucket
+    increment, and the percentile walk over the buckets only runs every
+    few keys. Until enough keys are seen the default delay is used.
+    """
+
+    def __init__(self, default=0.05, percentile=PERCENTILE, margin=MARGIN,
+                 min_delay=MIN_DELAY, max_delay=MAX_DELAY, clock=time.time):
+        self.default = default
+        self.percentile = percentile
+        self.margin = margin
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.counts = [0] * BUCKETS
+        self.total = 0
+        self.last_time = None
+        self.since_refresh = 0
+        self.delay = default
+
+    def record(self, when):
+        """Feed the time (seconds) of a key press"""
+        last, self.last_time = self.last_time, when
+        if last is None:
+            return
+        interval = when - last
+        if interval < 0 or interval >= PAUSE:
+            return
+        self.counts[int(interval * 1000) // BUCKET_MS] += 1
+        self.total += 1
+        if self.total >= WINDOW:
+            self.counts = [count >> 1 for count in self.counts]
+            self.total = sum(self.counts)
+        self.since_refresh += 1
+        if self.since_refresh >= REFRESH:
+            self.since_refresh = 0
+            self.delay = self._compute()
+
+    def wait(self, when):
+        """What is left of the delay for the key pressed at when, may be <= 0"""
+        return self.delay - (self.clock() - when)
+
+    def quantile(self, fraction):
+        """Upper edge in seconds of the bucket holding that share of intervals"""
+        target = fraction * self.total
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return (bucket + 1) * BUCKET_MS / 1000.0
+        return PAUSE
+
+    def _compute(self):
+        if self.total < MIN_SAMPLES:
+            return self.default
+        return min(self.max_delay, max(self.min_delay, self.quantile(self.percentile) + self.margin))
+
+    def stats(self):
+        return {
+            "samples": self.total,
+            "median_ms": round(self.quantile(0.5) * 1000) if self.total else None,
+            "p90_ms": round(self.quantile(0.9) * 1000) if self.total else None,
+            "delay_ms": round(self.delay * 1000),
+        }
@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['ethiopic_ime.py'],
-    pathex=[],
+    pathex=['..'],
     binaries=[],
     datas=[],
     hiddenimports=[],
@@ -10,7 +10,7 @@ echo.
 echo Building EXE...
 echo Note: Ensure 'app.ico' is in this folder for the icon to be applied.
 
-pyinstaller --noconsole --onefile --icon=app.ico --name="Senay Geez" ethiopic_ime.py
+pyinstaller --noconsole --onefile --icon=app.ico --name="Senay Geez" --paths .. ethiopic_ime.py
 
 echo.
 echo =========================================
@@ -0,0 +1,138 @@
+import argparse
+import os
+import sys
+import unicodedata
+
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.phrase_trie import read_table  # noqa: E402
+
+# Vowel suffixes of config.csv keys, in fidel column order: ä u i a e ə o wa
+VOWELS = ("", "u", "i", "a", "y", "e", "o", "W")
+
+# Ethiopic and Ethiopic Supplement; collation weights are packed into this
+# same code point range, so keys of other scripts keep their usual order
+BLOCK_START = 0x1200
+BLOCK_END = 0x13A0
+
+CACHE_SIZE = 100000
+_SEPARATOR = "\x00"
+
+
+def _column(key):
+    """Vowel column a config.csv key spells, from its suffix"""
+    for column in range(len(VOWELS) - 1, 0, -1):
+        if key.endswith(VOWELS[column]) and len(key) > len(VOWELS[column]):
+            return column
+    return 0
+
+
+def series_ranks(table):
+    """Rank of each fidel series (keyed by its first code point)
+
+    Series are ranked by where config.csv first spells them out, which is
+    the traditional ሀ ለ ሐ መ ... order. Rows whose key suffix disagrees with
+    the syllable's grid column (ኋ typed as hW, bare vowels) do not count.
+    """
+    series = {}
+    for key, value in table.items():
+        if len(value) != 1 or not BLOCK_START <= ord(value) < BLOCK_END:
+            continue
+        code = ord(value)
+        if not unicodedata.name(value, "").startswith("ETHIOPIC SYLLABLE"):
+            continue
+        if _column(key) == code & 7:
+            series.setdefault(code - (code & 7), len(series))
+    return series
+
+
+def _weight_order(table):
+    """Every code point of the Ethiopic blocks in collation order"""
+    series = series_ranks(table)
+    punctuation, syllables, rest, unassigned = [], [], [], []
+    # Series the table does not type (labialized velars, ቨ, ዐ ...) sit
+    # right after the nearest series before them in the grid
+    placed = (-1, 0)
+    for code in range(BLOCK_START, BLOCK_END):
+        name = unicodedata.name(chr(code), "")
+        if not name:
+            unassigned.append(code)
+            continue
+        base = code - (code & 7)
+        if base in series:
+            placed = (series[base], 0)
+        elif code == base:
+            placed = (placed[0], base)
+        if name.startswith("ETHIOPIC SYLLABLE"):
+            syllables.append((placed + (code & 7,), code))
+        elif unicodedata.category(chr(code)).startswith("P"):
+            punctuation.append(code)
+        else:
+            rest.append(code)
+    syllables.sort()
+    return punctuation + [code for _, code in syllables] + rest + unassigned
+
+
+class Collator:
+    """Fidel-order sort keys built with one str.translate call per string
+
+    Each Ethiopic character is remapped to a weight inside the Ethiopic code
+    point range, so the translated string compares in fidel order and its
+    UTF-16-BE encoding is a compact two bytes per character.
+    """
+
+    def __init__(self, table, cache_size=CACHE_SIZE):
+        order = _weight_order(table)
+        self.table = [chr(code) for code in range(BLOCK_END)]
+        for weight, code in enumerate(order, BLOCK_START):
+            self.table[code] = chr(weight)
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def sort_key(self, text):
+        """Translated string; compares in fidel order, use as sorted(key=...)"""
+        key = self._cache.get(text)
+        if key is None:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            key = self._cache[text] = text.translate(self.table)
+        return key
+
+    def bytes_key(self, text):
+        """Compact bytes key for storage, e.g. an indexed database column"""
+        return self.sort_key(text).encode("utf-16-be", "surrogatepass")
+
+    def sort_keys(self, texts):
+        """Keys for a whole list, translated as one joined buffer"""
+        if any(_SEPARATOR in text for text in texts):
+            return [text.translate(self.table) for text in texts]
+        return _SEPARATOR.join(texts).translate(self.table).split(_SEPARATOR) if texts else []
+
+    def sort(self, texts, reverse=False):
+        """Sorted copy of a list of strings in fidel order"""
+        texts = list(texts)
+        keys = self.sort_keys(texts)
+        order = sorted(range(len(texts)), key=keys.__getitem__, reverse=reverse)
+        return [texts[i] for i in order]
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Sort lines of Ethiopic text in fidel order")
+    parser.add_argument("source", nargs="?", help="input file, stdin when omitted")
+    parser.add_argument("--config", default=os.path.join(base_path, "config.csv"), help="layout table")
+    parser.add_argument("--reverse", action="store_true", help="sort in descending order")
+    args = parser.parse_args()
+
+    collator = Collator(read_table(args.config))
+    if args.source:
+        with open(args.source, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    else:
+        lines = sys.stdin.read().splitlines()
+    for line in collator.sort(lines, args.reverse):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
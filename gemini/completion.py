@@ -0,0 +1,92 @@
+import os
+import sys
+import threading
+
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.phrase_trie import PhraseTrie, build_phrase_trie  # noqa: E402
+
+# Completions cached per prefix node
+TOP_K = 5
+
+
+def read_lexicon(path):
+    """Read word,count rows; a missing or bad count counts as 1"""
+    words = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\r\n").split(",")
+            word = parts[0].strip()
+            if not word:
+                continue
+            try:
+                count = int(parts[1]) if len(parts) > 1 else 1
+            except ValueError:
+                count = 1
+            words[word] = words.get(word, 0) + count
+    return words
+
+
+def build_completions(words, path, k=TOP_K):
+    """Compile prefix -> top-k words (newline separated) into a phrase trie file"""
+    top = {}
+    # Most frequent first, so every prefix list fills in rank order
+    for word in sorted(words, key=lambda w: (-words[w], w)):
+        for i in range(1, len(word)):
+            found = top.setdefault(word[:i], [])
+            if len(found) < k:
+                found.append(word)
+    table = {prefix: "\n".join(found) for prefix, found in top.items()}
+    return build_phrase_trie(table, path)
+
+
+class Completer:
+    """Top-k word completion over a lazily loaded, memory-mapped lexicon
+
+    Nothing is read at construction; start() compiles the lexicon when the
+    .dat file is stale and maps it on a background thread, so startup is
+    unaffected. Until then complete() simply has nothing to offer.
+    """
+
+    def __init__(self, lexicon_path, k=TOP_K):
+        self.lexicon_path = lexicon_path
+        self.dat_path = os.path.splitext(lexicon_path)[0] + ".dat"
+        self.k = k
+        self.trie = None
+
+    def start(self):
+        if os.path.exists(self.lexicon_path):
+            threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        try:
+            dat_path = self.dat_path
+            if not os.path.exists(dat_path) or os.path.getmtime(dat_path) < os.path.getmtime(self.lexicon_path):
+                dat_path = build_completions(read_lexicon(self.lexicon_path), dat_path, self.k)
+            self.trie = PhraseTrie(dat_path)
+        except Exception as e:
+            print(f"Error loading lexicon: {e}")
+
+    def complete(self, prefix):
+        """Most frequent words starting with prefix, best first"""
+        trie = self.trie
+        if trie is None or not prefix:
+            return []
+        value = trie.get(prefix)
+        return value.split("\n") if value else []
+
+
+def main():
+    """Compile a lexicon ahead of time: completion.py lexicon.csv [lexicon.dat]"""
+    if len(sys.argv) < 2:
+        print("Usage: completion.py lexicon.csv [lexicon.dat]")
+        return
+    csv_path = sys.argv[1]
+    dat_path = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(csv_path)[0] + ".dat"
+    words = read_lexicon(csv_path)
+    dat_path = build_completions(words, dat_path)
+    print(f"Compiled {len(words)} words into {dat_path} ({os.path.getsize(dat_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from collections import deque
+from json.decoder import scanstring
+from json.scanner import NUMBER_RE
+from multiprocessing import Pool
+
+from lattice_decoder import load_transliterator
+
+BATCH_SIZE = 2000
+
+
+class FieldConverter:
+    """Converts values of one batch, reusing results for repeated values"""
+
+    def __init__(self, layout):
+        self.layout = layout
+
+    def convert_column(self, values):
+        cache = {}
+        out = []
+        for value in values:
+            result = cache.get(value)
+            if result is None:
+                result = cache[value] = self.layout.transliterate(value)
+            out.append(result)
+        return out
+
+
+# --- CSV / TSV ---
+def read_records(src):
+    """Yield raw CSV records (with their line endings), joining quoted newlines"""
+    pending = None
+    for line in src:
+        pending = line if pending is None else pending + line
+        if pending.count('"') % 2 == 0:
+            yield pending
+            pending = None
+    if pending is not None:
+        yield pending
+
+
+def _field_pattern(delimiter):
+    d = re.escape(delimiter)
+    return re.compile(f'("(?:[^"]|"")*"|[^{d}"\\r\\n]*)({d}|\\r\\n|\\n|\\r|$)')
+
+
+def split_record(record, pattern, delimiter):
+    """Raw field texts plus the record terminator, quotes kept as written"""
+    fields = []
+    pos = 0
+    while True:
+        match = pattern.match(record, pos)
+        if match is None:
+            # Malformed quoting: the record passes through untouched
+            return None, record
+        fields.append(match.group(1))
+        pos = match.end()
+        if match.group(2) != delimiter:
+            return fields, record[match.start(2):]
+
+
+def unquote(raw):
+    if raw.startswith('"') and raw.endswith('"') and len(raw) >= 2:
+        return raw[1:-1].replace('""', '"')
+    return raw
+
+
+def quote(value, raw, delimiter):
+    if raw.startswith('"') or any(ch in value for ch in (delimiter, '"', "\n", "\r")):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class CsvJob:
+    """Rewrites only the selected columns of CSV/TSV records"""
+
+    def __init__(self, delimiter, columns):
+        self.delimiter = delimiter
+        self.columns = columns
+        self.pattern = _field_pattern(delimiter)
+
+    def run(self, converter, records):
+        split = [split_record(record, self.pattern, self.delimiter) for record in records]
+        for column in self.columns:
+            rows = [fields for fields, _ in split if fields is not None and column < len(fields)]
+            values = [unquote(fields[column]) for fields in rows]
+            for fields, value in zip(rows, converter.convert_column(values)):
+                fields[column] = quote(value, fields[column], self.delimiter)
+        return "".join(end if fields is None else self.delimiter.join(fields) + end
+                       for fields, end in split)
+
+
+def resolve_columns(header, names, delimiter):
+    """Map column names (or 0-based indexes) onto positions in the header"""
+    row = next(csv.reader([header], delimiter=delimiter)) if header else []
+    columns = []
+    for name in names:
+        if name in row:
+            columns.append(row.index(name))
+        elif name.isdigit():
+            columns.append(int(name))
+        else:
+            raise ValueError(f"Unknown column: {name}")
+    return columns
+
+
+# --- JSON Lines ---
+def parse_path(path):
+    """'a.b[].c' -> ['a', 'b', [], 'c'], where [] walks every list item"""
+    steps = []
+    for part in path.split("."):
+        lists = 0
+        while part.endswith("[]"):
+            part = part[:-2]
+            lists += 1
+        if part:
+            steps.append(part)
+        steps.extend([] for _ in range(lists))
+    return steps
+
+
+def _collect(node, steps, found):
+    """Find (container, key) slots holding strings at the end of a path"""
+    if not steps:
+        return
+    step, rest = steps[0], steps[1:]
+    if step == []:
+        if isinstance(node, list):
+            for index, item in enumerate(node):
+                if rest:
+                    _collect(item, rest, found)
+                elif isinstance(item, str):
+                    found.append((node, index))
+        return
+    if isinstance(node, dict) and step in node:
+        if rest:
+            _collect(node[step], rest, found)
+        elif isinstance(node[step], str):
+            found.append((node, step))
+
+
+class _Span(str):
+    """A string value that remembers where its literal sits in the line"""
+
+    def __new__(cls, value, start, end):
+        span = super().__new__(cls, value)
+        span.start = start
+        span.end = end
+        return span
+
+
+_WS = re.compile(r"[ \t\n\r]*")
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def _parse_spans(line, pos=0):
+    """Parse JSON like json.loads, string values as _Span; returns (value, end)"""
+    pos = _WS.match(line, pos).end()
+    ch = line[pos:pos + 1]
+    if ch == '"':
+        value, end = scanstring(line, pos + 1)
+        return _Span(value, pos, end), end
+    if ch in ("{", "["):
+        is_object = ch == "{"
+        node = {} if is_object else []
+        close = "}" if is_object else "]"
+        pos = _WS.match(line, pos + 1).end()
+        if line[pos:pos + 1] == close:
+            return node, pos + 1
+        while True:
+            if is_object:
+                key, pos = scanstring(line, _WS.match(line, pos).end() + 1)
+                pos = _WS.match(line, pos).end() + 1  # The colon
+                node[key], pos = _parse_spans(line, pos)
+            else:
+                value, pos = _parse_spans(line, pos)
+                node.append(value)
+            pos = _WS.match(line, pos).end()
+            if line[pos:pos + 1] == close:
+                return node, pos + 1
+            pos += 1  # The comma
+    match = NUMBER_RE.match(line, pos)
+    if match:
+        return json.loads(match.group()), match.end()
+    for word, value in _LITERALS.items():
+        if line.startswith(word, pos):
+            return value, pos + len(word)
+    raise ValueError(f"Unexpected JSON at column {pos}")
+
+
+class JsonlJob:
+    """Rewrites only the selected JSON paths; everything else passes byte for byte
+
+    Lines are parsed with json.loads to find the values to convert. Only
+    a line where one of them changed is parsed again for the spans of
+    those string literals, and the new values are written over exactly
+    those spans: numbers, escapes and spacing elsewhere stay as they were.
+    """
+
+    def __init__(self, paths):
+        self.paths = [parse_path(path) for path in paths]
+
+    def _slots(self, obj):
+        found = []
+        for steps in self.paths:
+            _collect(obj, steps, found)
+        return found
+
+    def run(self, converter, records):
+        slots = []
+        owners = []
+        for index, line in enumerate(records):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                # One bad record must not end a multi-GB job
+                print(f"Malformed JSON line passed through unchanged ({e}): {line[:60].rstrip()!r}")
+                continue
+            found = self._slots(obj)
+            slots.extend(found)
+            owners.extend([index] * len(found))
+
+        values = [container[key] for container, key in slots]
+        converted = {}
+        for owner, value, result in zip(owners, values, converter.convert_column(values)):
+            converted.setdefault(owner, []).append(result if result != value else None)
+
+        out = []
+        for index, line in enumerate(records):
+            results = converted.get(index)
+            if not results or not any(result is not None for result in results):
+                out.append(line)
+                continue
+            tree, _ = _parse_spans(line)
+            edits = {}
+            for (container, key), result in zip(self._slots(tree), results):
+                if result is not None:
+                    span = container[key]
+                    edits[span.start] = (span.end, json.dumps(result, ensure_ascii=False))
+            pieces = []
+            pos = 0
+            for start in sorted(edits):
+                end, text = edits[start]
+                pieces.append(line[pos:start])
+                pieces.append(text)
+                pos = end
+            pieces.append(line[pos:])
+            out.append("".join(pieces))
+        return "".join(out)
+
+
+# --- Batches and workers ---
+_worker = None
+
+
+def _init_worker(config_path, job, model_path):
+    global _worker
+    _worker = (FieldConverter(load_transliterator(config_path, model_path)), job)
+
+
+def _run_batch(records):
+    converter, job = _worker
+    return job.run(converter, records)
+
+
+def batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def convert_stream(records, dst, job, config_path, workers=1, batch_size=BATCH_SIZE, model_path=None):
+    """Convert raw records and write them to dst batch by batch with bounded memory"""
+    if workers <= 1:
+        converter = FieldConverter(load_transliterator(config_path, model_path))
+        for batch in batches(records, batch_size):
+            dst.write(job.run(converter, batch))
+        return
+
+    # A fixed window of batches in flight keeps memory flat on huge inputs
+    with Pool(workers, initializer=_init_worker, initargs=(config_path, job, model_path)) as pool:
+        window = deque()
+        for batch in batches(records, batch_size):
+            window.append(pool.apply_async(_run_batch, (batch,)))
+            if len(window) >= workers * 2:
+                dst.write(window.popleft().get())
+        while window:
+            dst.write(window.popleft().get())
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Transliterate selected fields of CSV/TSV or JSON Lines files")
+    parser.add_argument("source", help="input file")
+    parser.add_argument("target", help="output file")
+    parser.add_argument("--format", choices=("csv", "tsv", "jsonl"), help="defaults to the file extension")
+    parser.add_argument("--columns", default="", help="comma separated CSV column names or indexes")
+    parser.add_argument("--no-header", action="store_true", help="CSV input has no header row")
+    parser.add_argument("--paths", default="", help="comma separated JSON paths, e.g. title,tags[],meta.note")
+    parser.add_argument("--config", default=os.path.join(base_path, "config.csv"), help="layout table")
+    parser.add_argument("--decoder", metavar="MODEL", help="syllable model for the lattice decoder")
+    parser.add_argument("--workers", type=int, default=1, help="parallel worker processes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="records per batch")
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.source)[1].lower().lstrip(".")
+    if fmt not in ("csv", "tsv", "jsonl"):
+        print("Error: use --format csv, tsv or jsonl")
+        sys.exit(1)
+
+    with open(args.source, "r", encoding="utf-8", newline="") as src, \
+            open(args.target, "w", encoding="utf-8", newline="") as dst:
+        if fmt == "jsonl":
+            job = JsonlJob([p for p in args.paths.split(",") if p])
+            records = src
+        else:
+            delimiter = "\t" if fmt == "tsv" else ","
+            records = read_records(src)
+            names = [c for c in args.columns.split(",") if c]
+            if args.no_header:
+                columns = resolve_columns("", names, delimiter)
+            else:
+                header = next(records, "")
+                dst.write(header)
+                columns = resolve_columns(header, names, delimiter)
+            job = CsvJob(delimiter, columns)
+        convert_stream(records, dst, job, args.config, args.workers, args.batch_size, args.decoder)
+    print(f"Converted {args.source} -> {args.target}")
+
+
+if __name__ == "__main__":
+    main()
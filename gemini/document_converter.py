@@ -0,0 +1,267 @@
+import argparse
+import os
+import re
+import shutil
+import sys
+import zipfile
+from html.parser import HTMLParser
+from xml.sax import make_parser
+from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import XMLGenerator
+
+from lattice_decoder import load_transliterator
+
+CHUNK_SIZE = 1 << 16
+
+# URLs, e-mail addresses and paths inside text are copied verbatim
+_VERBATIM = re.compile(r"(?:https?://|ftp://|www\.|mailto:)\S+|\S+@\S+\.\w+|\\\\\S+")
+
+# Zip entries holding document text, per format
+DOCX_PARTS = re.compile(r"^word/(document|header\d*|footer\d*|footnotes|endnotes|comments)\.xml$")
+ODT_PARTS = re.compile(r"^content\.xml$")
+
+# DOCX character styles used for code, and ODT's default code span style
+CODE_STYLES = {"Code", "HTMLCode", "VerbatimChar", "SourceCode", "Source_20_Text", "Source_Text"}
+# HTML elements whose text is code or not prose at all
+HTML_VERBATIM = {"code", "pre", "kbd", "samp", "var", "script", "style", "textarea"}
+
+
+class TextConverter:
+    """Transliterates prose while leaving URLs and similar tokens alone"""
+
+    def __init__(self, layout):
+        # A Layout, or anything with the same transliterate(), e.g. a LatticeDecoder
+        self.layout = layout
+
+    def convert(self, text):
+        parts = []
+        pos = 0
+        for match in _VERBATIM.finditer(text):
+            parts.append(self.layout.transliterate(text[pos:match.start()]))
+            parts.append(match.group())
+            pos = match.end()
+        parts.append(self.layout.transliterate(text[pos:]))
+        return "".join(parts)
+
+
+class _XmlTextHandler(ContentHandler):
+    """SAX handler copying XML through, transliterating selected text nodes"""
+
+    def __init__(self, out, converter, is_text_element):
+        super().__init__()
+        self.writer = XMLGenerator(out, encoding="utf-8", short_empty_elements=True)
+        self.converter = converter
+        self.is_text_element = is_text_element
+        self.stack = []
+        self.pending = []
+        self.in_code_run = False
+
+    def _flush(self):
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        self.pending = []
+        if self.stack and self.stack[-1] and not self.in_code_run:
+            text = self.converter.convert(text)
+        self.writer.characters(text)
+
+    def startDocument(self):
+        self.writer.startDocument()
+
+    def endDocument(self):
+        self._flush()
+        self.writer.endDocument()
+
+    def startElement(self, name, attrs):
+        self._flush()
+        if name == "w:r":
+            self.in_code_run = False
+        elif name == "w:rStyle" and attrs.get("w:val") in CODE_STYLES:
+            self.in_code_run = True
+        elif name == "text:span" and attrs.get("text:style-name") in CODE_STYLES:
+            self.in_code_run = True
+        self.stack.append(self.is_text_element(name))
+        self.writer.startElement(name, attrs)
+
+    def endElement(self, name):
+        self._flush()
+        self.stack.pop()
+        if name in ("w:r", "text:span"):
+            self.in_code_run = False
+        self.writer.endElement(name)
+
+    def characters(self, content):
+        self.pending.append(content)
+
+    def ignorableWhitespace(self, content):
+        self.pending.append(content)
+
+    def processingInstruction(self, target, data):
+        self._flush()
+        self.writer.processingInstruction(target, data)
+
+
+def _docx_text(name):
+    return name == "w:t"
+
+
+def _odt_text(name):
+    return name.startswith("text:")
+
+
+def convert_xml(src, dst, converter, is_text_element):
+    """Stream one XML document from src to dst"""
+    parser = make_parser()
+    parser.setContentHandler(_XmlTextHandler(dst, converter, is_text_element))
+    parser.parse(src)
+
+
+def convert_package(src_path, dst_path, converter, parts, is_text_element):
+    """Rewrite a zip based document entry by entry, never loading it whole"""
+    with zipfile.ZipFile(src_path) as zin, zipfile.ZipFile(dst_path, "w") as zout:
+        for info in zin.infolist():
+            with zin.open(info) as src, zout.open(info, "w") as dst:
+                if parts.match(info.filename):
+                    convert_xml(src, dst, converter, is_text_element)
+                else:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+class _HtmlRewriter(HTMLParser):
+    """Copies HTML through as written, transliterating prose text nodes
+
+    The parser hands text over in pieces (at every feed() boundary and
+    around character references), so text is held in pending until the
+    next tag, comment or declaration and converted as a whole; references
+    stay in place, copied verbatim.
+    """
+
+    def __init__(self, out, converter):
+        super().__init__(convert_charrefs=False)
+        self.out = out
+        self.converter = converter
+        self.verbatim = 0
+        self.pending = []  # (text, True for a reference copied as is)
+        self.endtag = None
+
+    def _flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        run = []
+        for text, raw in pending:
+            if raw:
+                self._write_text("".join(run))
+                run = []
+                self.out.write(text)
+            else:
+                run.append(text)
+        self._write_text("".join(run))
+
+    def _write_text(self, text):
+        if text:
+            self.out.write(text if self.verbatim else self.converter.convert(text))
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in HTML_VERBATIM:
+            self.verbatim += 1
+        self.out.write(self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        self.out.write(self.get_starttag_text())
+
+    def parse_endtag(self, i):
+        # handle_endtag only gets the lower-cased name; copy the tag as written
+        self.endtag = None
+        j = super().parse_endtag(i)
+        if j >= 0 and (self.endtag is not None or self.rawdata.startswith("</>", i)):
+            self.out.write(self.rawdata[i:j])
+        return j
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in HTML_VERBATIM and self.verbatim:
+            self.verbatim -= 1
+        self.endtag = tag
+
+    def handle_data(self, data):
+        self.pending.append((data, False))
+
+    def handle_entityref(self, name):
+        self.pending.append((f"&{name};", True))
+
+    def handle_charref(self, name):
+        self.pending.append((f"&#{name};", True))
+
+    def handle_comment(self, data):
+        self._flush()
+        self.out.write(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self._flush()
+        self.out.write(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self._flush()
+        self.out.write(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self._flush()
+        self.out.write(f"<![{data}]>")
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def convert_html(src_path, dst_path, converter):
+    """Stream an HTML file through the rewriter in fixed-size chunks"""
+    with open(src_path, "r", encoding="utf-8", errors="surrogateescape", newline="") as src, \
+            open(dst_path, "w", encoding="utf-8", errors="surrogateescape", newline="") as dst:
+        rewriter = _HtmlRewriter(dst, converter)
+        while True:
+            chunk = src.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            rewriter.feed(chunk)
+        rewriter.close()
+
+
+def convert_document(src_path, dst_path, converter):
+    """Convert a DOCX, ODT or HTML document based on its extension"""
+    ext = os.path.splitext(src_path)[1].lower()
+    if ext == ".docx":
+        convert_package(src_path, dst_path, converter, DOCX_PARTS, _docx_text)
+    elif ext == ".odt":
+        convert_package(src_path, dst_path, converter, ODT_PARTS, _odt_text)
+    elif ext in (".html", ".htm", ".xhtml"):
+        convert_html(src_path, dst_path, converter)
+    else:
+        raise ValueError(f"Unsupported document type: {ext}")
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Transliterate Latin-typed DOCX/ODT/HTML documents")
+    parser.add_argument("source", help="document to convert")
+    parser.add_argument("target", nargs="?", help="output document")
+    parser.add_argument("--config", default=os.path.join(base_path, "config.csv"),
+                        help="layout table (config.csv)")
+    parser.add_argument("--decoder", metavar="MODEL", help="syllable model for the lattice decoder")
+    args = parser.parse_args()
+
+    root, ext = os.path.splitext(args.source)
+    target = args.target or f"{root}.ethiopic{ext}"
+    try:
+        converter = TextConverter(load_transliterator(args.config, args.decoder))
+        convert_document(args.source, target, converter)
+    except Exception as e:
+        print(f"Error converting {args.source}: {e}")
+        sys.exit(1)
+    print(f"Converted {args.source} -> {target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import messagebox
 from pynput import keyboard
 from pynput.keyboard import Key, Controller
-import csv
 import os
 import sys
 import threading
@@ -10,6 +9,113 @@ import time
 import webbrowser
 import pystray
 from PIL import Image, ImageTk, ImageDraw
+from transliterator import Layout, ROOT
+from completion import Completer
+from usage_counts import UsageCounts
+from injection import INJECTION_MARKER, create_injector
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.hook_watchdog import HookWatchdog  # noqa: E402
+from shared.keystroke_recorder import (KeystrokeRecorder, recording_path, from_environment, KEY_DOWN, KEY_UP,  # noqa: E402
+                                       PASS, REPLACE, CONSUME, EDIT, INJECTED, PASSTHROUGH, DISABLED, TOGGLE)
+from shared.cpu_profiler import SamplingProfiler  # noqa: E402
+from shared.focus_context import FocusContexts  # noqa: E402
+from shared.layout_profiles import LayoutProfiles, DEFAULT  # noqa: E402
+from shared.config_layers import LayeredLoader, create_user_file  # noqa: E402
+
+# Replaces the word being typed with the next lexicon completion. On
+# Windows the hook swallows it only when there is something to complete,
+# so the application's overtype toggle and Shift/Ctrl+Insert keep working
+SELECT_KEY = Key.insert
+# Cycles through config.csv and the layouts/ folder
+LAYOUT_KEY = Key.pause
+DIGITS = "123456789"
+# How often config.csv, the layouts and their user files are checked for edits
+CONFIG_CHECK_MS = 2000
+
+# Composition mode (Windows): the keyboard hook swallows Latin keys and
+# only finished syllables are typed, with no backspace corrections
+WM_KEYUP = 0x101
+WM_SYSKEYUP = 0x105
+LLKHF_EXTENDED = 0x01
+VK_BACK = 0x08
+VK_RETURN = 0x0D
+VK_PAUSE = 0x13
+VK_ESCAPE = 0x1B
+VK_SPACE = 0x20
+VK_PRIOR = 0x21
+VK_INSERT = 0x2D
+VK_SHIFT = 0x10
+VK_CONTROL = 0x11
+VK_MENU = 0x12
+VK_CAPITAL = 0x14
+MODIFIER_VKS = {VK_SHIFT, VK_CONTROL, VK_MENU, VK_CAPITAL, 0x5B, 0x5C, 0xA0, 0xA1, 0xA2, 0xA3, 0xA4, 0xA5}
+# Unshifted punctuation keys used by config.csv keys
+VK_CHARS = {0xBD: "-", 0xDB: "["}
+
+
+def vk_to_char(vk):
+    """Character a key types on a US layout; None for shortcuts and other keys"""
+    from ctypes import windll
+    get_state = windll.user32.GetKeyState
+    if get_state(VK_CONTROL) & 0x8000 or get_state(VK_MENU) & 0x8000:
+        return None
+    shift = bool(get_state(VK_SHIFT) & 0x8000)
+    if 0x41 <= vk <= 0x5A:
+        caps = bool(get_state(VK_CAPITAL) & 1)
+        return chr(vk) if shift != caps else chr(vk).lower()
+    if shift:
+        return None
+    if 0x30 <= vk <= 0x39:
+        return chr(vk)
+    return VK_CHARS.get(vk)
+
+
+def modifiers_down():
+    """True while Shift, Ctrl or Alt is held"""
+    from ctypes import windll
+    get_state = windll.user32.GetKeyState
+    return any(get_state(vk) & 0x8000 for vk in (VK_SHIFT, VK_CONTROL, VK_MENU))
+
+
+def recorded_key(key):
+    """What the keystroke recorder stores for a pynput key: character, name or vk"""
+    char = getattr(key, "char", None)
+    if char:
+        return char
+    name = getattr(key, "name", None)
+    if name:
+        return name
+    return getattr(key, "vk", None) or 0
+
+
+def format_strip(candidates):
+    """Strip label: each candidate after the digit that picks it"""
+    return "  ".join(f"{i} {output}" for i, (_, output, _) in enumerate(candidates, 1))
+
+
+def caret_position():
+    """Screen position just below the text caret of the focused window, or None"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class GUITHREADINFO(ctypes.Structure):
+            _fields_ = [("cbSize", wintypes.DWORD), ("flags", wintypes.DWORD),
+                        ("hwndActive", wintypes.HWND), ("hwndFocus", wintypes.HWND),
+                        ("hwndCapture", wintypes.HWND), ("hwndMenuOwner", wintypes.HWND),
+                        ("hwndMoveSize", wintypes.HWND), ("hwndCaret", wintypes.HWND),
+                        ("rcCaret", wintypes.RECT)]
+
+        info = GUITHREADINFO(cbSize=ctypes.sizeof(GUITHREADINFO))
+        if not ctypes.windll.user32.GetGUIThreadInfo(0, ctypes.byref(info)) or not info.hwndCaret:
+            return None
+        point = wintypes.POINT(info.rcCaret.left, info.rcCaret.bottom)
+        ctypes.windll.user32.ClientToScreen(info.hwndCaret, ctypes.byref(point))
+        return point.x, point.y
+    except Exception:
+        return None
+
 
 class SenayGeezIME:
     def __init__(self, root):
@@ -22,6 +128,8 @@ class SenayGeezIME:
         
         # 2. Define File Paths
         self.config_path = os.path.join(self.base_path, "config.csv")
+        self.lexicon_path = os.path.join(self.base_path, "lexicon.csv")
+        self.usage_path = os.path.join(self.base_path, "usage.bin")
         self.icon_path = os.path.join(self.base_path, "app.ico")
         self.splash_path = os.path.join(self.base_path, "splash.jpg")
         self.blue_img_path = os.path.join(self.base_path, "blue.png")
@@ -37,18 +145,55 @@ class SenayGeezIME:
         # 4. Initialize State
         self.is_active = True
         self.mapping = {}
+        self.layout = Layout(self.mapping)
         self.output_chars = set()
-        self.buffer = ""
+        self.layers = LayeredLoader(Layout, Layout.patched)  # Compiled layouts and user changes
+        self.profiles = None
+        self.layout_name = DEFAULT
+        self.strip_cache = {}  # Strip texts of each layout
+        self.state = ROOT
+        self.last_unit = ""
+        self.units = []  # Units typed since the last word break
+        self.completer = Completer(self.lexicon_path)
+        self.usage = UsageCounts(self.usage_path)
+        self.candidates = []
+        self.candidate_index = -1
+        self.typed_word = ""
+        self.show_candidates = False  # Syllable strip, toggled from the tray
+        self.strip_candidates = []
+        self.strip_texts = {}
+        self.candidate_window = None
+        self.candidate_label = None
+        self.composition = False  # Opt-in from the tray, needs the win32 hook filter
+        self.pending = ""  # Syllable shown in the pre-edit window, not typed yet
+        self.pending_keys = []
+        self.base_state = ROOT
+        self.suppressed = set()
+        self.preedit_window = None
+        self.preedit_label = None
         self.keyboard_controller = Controller()
+        self.injector = create_injector(self.keyboard_controller)
+        self.watchdog = HookWatchdog()
+        self.private_recording = True  # Recorded keys are hashed
+        self.recorder = from_environment(self.base_path)  # Opt-in, also from the tray
+        self.profiler = None  # Only exists while a capture runs
         self.listener = None
+        # Off Windows only: ControllerInjector's untagged backspaces come back
+        # through on_key_press and are skipped by count. Tagged output and
+        # composition mode never touch it
         self.ignore_backspaces = 0
+        self.focus = FocusContexts(self)  # Typing state per focused window
         self.tray_icon = None
+        self.notify_images = {}  # Notification PhotoImage per on/off state
 
         # 5. Show Splash Screen
         self.show_splash()
 
         # 6. Load Data & Start Services
         self.load_config()
+        self.root.after(CONFIG_CHECK_MS, self.watch_config)
+        self.completer.start()  # Lexicon is mapped in the background
+        self.usage.start()  # Counters are saved in the background
         self.setup_tray()
         self.start_listener()
 
@@ -97,26 +242,62 @@ class SenayGeezIME:
             splash.destroy()
 
     def load_config(self):
-        """Loads mapping strictly from config.csv in the app folder."""
+        """Loads mapping from config.csv in the app folder, with config.user.csv on top."""
         if not os.path.exists(self.config_path):
             messagebox.showerror("Config Missing", f"Could not find config.csv in:\n{self.base_path}\n\nPlease add the file and restart.")
             return
 
         try:
-            new_mapping = {}
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    if len(row) >= 2:
-                        key = row[0].strip()
-                        val = row[1].strip()
-                        new_mapping[key] = val
-            
-            self.mapping = new_mapping
-            self.output_chars = set(self.mapping.values())
+            # Large phrase tables are compiled once and memory-mapped; the
+            # layouts/ folder is compiled in the background. Each file is
+            # merged with its user file, only the user's changes are redone
+            profiles = LayoutProfiles(self.config_path, self.layers)
+            profiles.load(self.layout_name)
+            self.profiles = profiles
+            self.strip_cache = {}
+            self.focus.forget()  # Saved states belong to the old layouts
+            if not self.activate_layout(self.layout_name):
+                self.activate_layout(DEFAULT)
         except Exception as e:
             messagebox.showerror("Config Error", f"Error reading config.csv:\n{e}")
 
+    def watch_config(self):
+        """Reload once a layout or user file was saved, e.g. from Settings"""
+        # Layouts still compiling in the background are not stale, just not there yet
+        profiles = self.profiles
+        if profiles and profiles.ready.is_set() and any(map(self.layers.stale, profiles.paths.values())):
+            print("Settings changed, reloading layouts")
+            self.load_config()
+            self.switch_layout(self.layout_name)
+        self.root.after(CONFIG_CHECK_MS, self.watch_config)
+
+    def activate_layout(self, name):
+        """Point the engine at a compiled layout: no file is read, nothing waits"""
+        layout = self.profiles.get(name) if self.profiles else None
+        if layout is None:
+            return False
+        self.layout = layout
+        self.mapping = layout.table
+        self.output_chars = layout.outputs
+        self.strip_texts = self.strip_cache.setdefault(name, {})
+        self.layout_name = name
+        return True
+
+    def switch_layout(self, name):
+        """Change the layout of the focused window, from the hotkey or the tray"""
+        self.commit_pending()
+        if not self.activate_layout(name):
+            print(f"Layout {name} is not available yet")
+            return False
+        self.state = ROOT
+        self.base_state = ROOT
+        self.reset_word()
+        self.hide_candidates()
+        print(f"Layout: {name}")
+        if self.tray_icon:
+            self.tray_icon.title = f"Senay Geez IME - {name}"
+        return True
+
     # --- TRAY ICON LOGIC ---
     def setup_tray(self):
         threading.Thread(target=self._run_tray, daemon=True).start()
@@ -141,6 +322,21 @@ class SenayGeezIME:
         menu = pystray.Menu(
             pystray.MenuItem("Help", self.open_help),
             pystray.MenuItem("Settings", self.open_settings),
+            pystray.MenuItem("Layout", pystray.Menu(lambda: (
+                pystray.MenuItem(name, self.choose_layout, radio=True,
+                                 checked=lambda item: item.text == self.layout_name)
+                for name in (self.profiles.names if self.profiles else [DEFAULT])))),
+            pystray.MenuItem("Candidate Window", self.toggle_candidates,
+                             checked=lambda item: self.show_candidates),
+            pystray.MenuItem("Composition Mode", self.toggle_composition,
+                             checked=lambda item: self.composition,
+                             visible=sys.platform == "win32"),
+            pystray.MenuItem("Record Keystrokes", self.toggle_recording,
+                             checked=lambda item: self.recorder is not None),
+            pystray.MenuItem("Private Recording", self.toggle_private_recording,
+                             checked=lambda item: self.private_recording),
+            pystray.MenuItem("Wall-Clock Profile (30 s)", self.toggle_profiling,
+                             checked=lambda item: self.profiler is not None and self.profiler.running),
             pystray.MenuItem("Exit", self.quit_app)
         )
 
@@ -153,14 +349,61 @@ class SenayGeezIME:
     def open_settings(self, icon, item):
         if os.path.exists(self.config_path):
             try:
-                os.startfile(self.config_path)
+                # config.csv is replaced on upgrade; the user's changes go on top
+                os.startfile(create_user_file(self.config_path))
             except Exception as e:
                 print(f"Error opening settings: {e}")
         else:
             # If it doesn't exist, try to create an empty one or warn
             messagebox.showwarning("Settings", "config.csv not found.")
 
+    def choose_layout(self, icon, item):
+        self.switch_layout(item.text)
+
+    def toggle_candidates(self, icon, item):
+        self.show_candidates = not self.show_candidates
+        if not self.show_candidates:
+            self.hide_candidates()
+
+    def toggle_composition(self, icon, item):
+        self.commit_pending()
+        self.composition = not self.composition
+
+    def toggle_recording(self, icon, item):
+        recorder = self.recorder
+        if recorder:
+            self.recorder = None
+            recorder.stop()
+            print(f"Keystrokes saved to {recorder.path}")
+            return
+        recorder = KeystrokeRecorder(recording_path(self.base_path), private=self.private_recording)
+        try:
+            recorder.start()
+        except OSError as e:
+            print(f"Error starting keystroke recorder: {e}")
+            return
+        self.recorder = recorder
+
+    def toggle_private_recording(self, icon, item):
+        # Applies to the next recording
+        self.private_recording = not self.private_recording
+
+    def toggle_profiling(self, icon, item):
+        # A second click ends the capture early; the profile goes next to config.csv
+        profiler = self.profiler
+        if profiler and profiler.running:
+            profiler.stop()
+            return
+        self.profiler = SamplingProfiler(self.base_path)
+        self.profiler.start()
+        print(f"Wall-clock profile for {self.profiler.duration:g} s")
+
     def quit_app(self, icon, item):
+        self.usage.stop()
+        if self.recorder:
+            self.recorder.stop()
+        if self.profiler:
+            self.profiler.stop()
         self.tray_icon.stop()
         self.root.quit()
         os._exit(0)
@@ -186,13 +429,16 @@ class SenayGeezIME:
         top.geometry(f"{win_w}x{win_h}+{x_pos}+{y_pos}")
 
         try:
-            # Use PIL for loading png to support transparency/formats better
-            pil_img = Image.open(image_file)
-            # Resize to fit notification box if needed
-            pil_img = pil_img.resize((win_w, win_h), Image.Resampling.LANCZOS)
-            self.current_notify_img = ImageTk.PhotoImage(pil_img)
+            # Made once per state and kept, which also prevents GC
+            photo = self.notify_images.get(is_on)
+            if photo is None:
+                # Use PIL for loading png to support transparency/formats better
+                with Image.open(image_file) as pil_img:
+                    # Resize to fit notification box if needed
+                    photo = ImageTk.PhotoImage(pil_img.resize((win_w, win_h), Image.Resampling.LANCZOS))
+                self.notify_images[is_on] = photo
             
-            lbl = tk.Label(top, image=self.current_notify_img, bg="black")
+            lbl = tk.Label(top, image=photo, bg="black")
             lbl.pack(fill=tk.BOTH, expand=True)
         except Exception:
             # Fallback
@@ -204,82 +450,471 @@ class SenayGeezIME:
 
         top.after(2000, top.destroy)
 
+    # --- CANDIDATE STRIP ---
+    def strip_text(self, state):
+        """Label text for a state, or None when digits could not select
+
+        Candidate lists come precomputed from the layout; the text is built
+        once per state and reused on every later visit.
+        """
+        if state in self.strip_texts:
+            return self.strip_texts[state]
+        candidates = self.layout.candidates_at(state)
+        text = None
+        # A state a digit continues (numerals) keeps digits for typing
+        if candidates and not any(self.layout.trie.step(state, d) >= 0 for d in DIGITS):
+            text = format_strip(candidates)
+        self.strip_texts[state] = text
+        return text
+
+    def ranked_candidates(self, candidates):
+        """Strip candidates, those finishing a word this user types often first
+
+        The syllable replaces the current unit, so each one is counted as
+        the word it would make with the units before it.
+        """
+        if self.composition:
+            before = "".join(self.units)
+        else:
+            before = "".join(self.units[:-1])
+        return self.usage.rank(candidates, lambda candidate: before + candidate[1])
+
+    def update_candidates(self):
+        text = self.strip_text(self.state) if self.show_candidates else None
+        if text is None:
+            self.hide_candidates()
+            return
+        candidates = self.layout.candidates_at(self.state)
+        self.strip_candidates = self.ranked_candidates(candidates)
+        # The cached text is in layout order, still right when no counts moved it
+        if self.strip_candidates != list(candidates):
+            text = format_strip(self.strip_candidates)
+        self.root.after(0, lambda: self._show_strip(text))
+
+    def hide_candidates(self):
+        if self.strip_candidates:
+            self.strip_candidates = []
+            self.root.after(0, self._hide_strip)
+
+    def _show_strip(self, text):
+        # One window for the whole session, only its text changes
+        if self.candidate_window is None:
+            self.candidate_window = tk.Toplevel(self.root)
+            self.candidate_window.overrideredirect(True)
+            self.candidate_window.attributes('-topmost', True)
+            self.candidate_label = tk.Label(self.candidate_window, font=("Nyala", 14),
+                                            bg="white", fg="black", padx=6, pady=2,
+                                            relief=tk.SOLID, borderwidth=1)
+            self.candidate_label.pack()
+        self.candidate_label.config(text=text)
+        position = caret_position() or self.root.winfo_pointerxy()
+        # Below the pre-edit window when composing
+        offset = 40 if self.composition else 4
+        self.candidate_window.geometry(f"+{position[0]}+{position[1] + offset}")
+        self.candidate_window.deiconify()
+
+    def _hide_strip(self):
+        if self.candidate_window is not None:
+            self.candidate_window.withdraw()
+
+    # --- PRE-EDIT WINDOW ---
+    def update_preedit(self):
+        text = self.pending
+        self.root.after(0, lambda: self._show_preedit(text))
+
+    def _show_preedit(self, text):
+        if not text:
+            if self.preedit_window is not None:
+                self.preedit_window.withdraw()
+            return
+        if self.preedit_window is None:
+            self.preedit_window = tk.Toplevel(self.root)
+            self.preedit_window.overrideredirect(True)
+            self.preedit_window.attributes('-topmost', True)
+            self.preedit_label = tk.Label(self.preedit_window, font=("Nyala", 18, "underline"),
+                                          bg="lightyellow", fg="black", padx=4)
+            self.preedit_label.pack()
+        self.preedit_label.config(text=text)
+        position = caret_position() or self.root.winfo_pointerxy()
+        self.preedit_window.geometry(f"+{position[0]}+{position[1] + 4}")
+        self.preedit_window.deiconify()
+
     # --- KEYBOARD LISTENER ---
     def start_listener(self):
-        self.listener = keyboard.Listener(on_press=self.on_key_press)
+        # The filter option is only used by the win32 backend
+        self.listener = keyboard.Listener(on_press=self.on_key_press,
+                                          win32_event_filter=self.win32_filter)
         self.listener.start()
 
+    def win32_filter(self, msg, data):
+        """Hook filter for composition mode, runs before on_key_press
+
+        Our own tagged output is dropped before any callback sees it. In
+        composition mode the keys the layout consumes are suppressed
+        system-wide and composed here; everything else passes. Outside it
+        only a completing Insert is suppressed.
+        """
+        started = time.monotonic_ns()
+        decision = self.filter_key(msg, data)
+        if self.recorder and decision is not None:
+            event = KEY_UP if msg in (WM_KEYUP, WM_SYSKEYUP) else KEY_DOWN
+            self.recorder.record(data.vkCode, decision, started, event)
+        if decision == INJECTED:
+            return False  # Our own output never reaches on_key_press
+        if decision == CONSUME:
+            self.listener.suppress_event()
+        return True
+
+    def filter_key(self, msg, data):
+        """Decision for one hook event; None when on_key_press handles it"""
+        if data.dwExtraInfo == INJECTION_MARKER:
+            return INJECTED
+        if not self.is_active:
+            return None
+        vk = data.vkCode
+        if msg in (WM_KEYUP, WM_SYSKEYUP):
+            if vk in self.suppressed:
+                self.suppressed.discard(vk)
+                return CONSUME
+            return PASS if self.composition else None
+        if not self.composition:
+            return self.filter_select() if vk == VK_INSERT else None
+        # Page Up and the layout key belong to dispatch_key. Composing them
+        # would replay them as tagged input, which never reaches it; the
+        # toggle and switch_layout() commit the pending syllable themselves
+        if vk in MODIFIER_VKS or vk in (VK_PRIOR, VK_PAUSE):
+            return None
+        if not self.watchdog.active():
+            # Pass-through: finish what is pending, then leave keys alone
+            if self.pending:
+                self.commit_pending()
+            return PASSTHROUGH
+        self.watchdog.begin()
+        try:
+            self.follow_focus()
+            consumed = self.compose_key(vk, bool(data.flags & LLKHF_EXTENDED))
+        except Exception as e:
+            print(f"Composition error: {e}")
+            return PASS
+        finally:
+            self.watchdog.end()
+        if consumed:
+            self.suppressed.add(vk)
+            return CONSUME
+        return PASS
+
+    def filter_select(self):
+        """Outside composition mode: swallow a plain Insert that completes the word
+
+        Without a completion, or with a modifier held, the key is left to
+        on_key_press and reaches the application untouched.
+        """
+        if modifiers_down() or not self.watchdog.active():
+            return None
+        self.watchdog.begin()
+        try:
+            self.follow_focus()
+            if not self.has_completion():
+                return None
+            self.select_completion()
+        except Exception as e:
+            print(f"Completion error: {e}")
+            return None
+        finally:
+            self.watchdog.end()
+        self.suppressed.add(VK_INSERT)
+        return CONSUME
+
+    def compose_key(self, vk, extended=False):
+        """Handle one key press in composition mode, True when it was consumed"""
+        if vk == VK_BACK:
+            if not self.pending_keys:
+                self.state = ROOT
+                self.reset_word()
+                self.hide_candidates()
+                return False
+            self.pending_keys.pop()
+            self.replay_pending()
+            return True
+        if vk == VK_ESCAPE and self.pending_keys:
+            self.pending_keys = []
+            self.replay_pending()
+            return True
+        # A plain Insert completes the word when there is a completion;
+        # otherwise, and with Shift/Ctrl held, it is an ordinary key below
+        if vk == VK_INSERT and not modifiers_down() and self.has_completion():
+            self.commit_pending()
+            self.select_completion()
+            return True
+
+        char = vk_to_char(vk)
+        if char is not None:
+            if self.strip_candidates and char in DIGITS and int(char) <= len(self.strip_candidates):
+                self.choose_candidate(int(char) - 1)
+                return True
+            if self.layout.trie.step(ROOT, char) >= 0 or self.layout.trie.step(self.state, char) >= 0:
+                self.compose_char(char)
+                return True
+
+        # Any other key finishes the syllable; when text had to be typed
+        # first, the key is replayed after it so the order holds
+        had_pending = bool(self.pending)
+        self.commit_pending()
+        self.state = ROOT
+        self.hide_candidates()
+        if vk in (VK_SPACE, VK_RETURN):
+            self.commit_word()
+            self.reset_word()
+        if had_pending:
+            self.injector.send_key(vk, extended)
+        return had_pending
+
+    def compose_char(self, char):
+        before = self.state
+        state, back, text = self.layout.step(self.state, char)
+        self.watchdog.mark("transition")
+        self.state = state
+        if back:
+            # The pending syllable grows, nothing is typed
+            self.pending_keys.append(char)
+        else:
+            self.commit_pending()
+            self.base_state = before
+            self.pending_keys = [char]
+        self.pending = text
+        self.candidate_index = -1
+        self.settle_pending()
+
+    def settle_pending(self):
+        # No longer key can extend it: type it right away
+        if not self.layout.candidates_at(self.state):
+            self.commit_pending()
+        self.update_preedit()
+        if self.show_candidates or self.strip_candidates:
+            self.update_candidates()
+
+    def replay_pending(self):
+        """Recompute the pending syllable after keys were removed"""
+        state = self.base_state
+        text = ""
+        for ch in self.pending_keys:
+            state, _, text = self.layout.step(state, ch)
+        self.state = state
+        self.pending = text
+        self.update_preedit()
+        if self.show_candidates or self.strip_candidates:
+            self.update_candidates()
+
+    def commit_pending(self):
+        """Type the pending syllable: one injected character, no backspaces"""
+        if self.pending:
+            self.injector.send(self.pending)
+            self.watchdog.mark("inject")
+            self.units.append(self.pending)
+            self.last_unit = self.pending
+            self.pending = ""
+            self.update_preedit()
+        self.pending_keys = []
+        self.base_state = self.state
+
     def on_key_press(self, key):
+        started = time.monotonic_ns()
+        decision = self.dispatch_key(key)
+        if self.recorder and decision is not None:
+            self.recorder.record(recorded_key(key), decision, started)
+
+    def dispatch_key(self, key):
+        """Handle a key press, returns the recorder decision"""
         # Toggle Logic
         if key == Key.page_up:
+            self.commit_pending()
             self.is_active = not self.is_active
-            self.buffer = ""
+            self.state = ROOT
+            self.reset_word()
+            self.hide_candidates()
             self.show_notification(self.is_active)
-            return
+            return TOGGLE
+
+        if key == LAYOUT_KEY and self.profiles:
+            self.switch_layout(self.profiles.next_name(self.layout_name))
+            return TOGGLE
 
         if not self.is_active:
-            return
+            return DISABLED
+
+        # The hook filter already handled (and recorded) this key
+        if self.composition:
+            return None
+
+        if not self.watchdog.active():
+            self.state = ROOT
+            return PASSTHROUGH
+        self.watchdog.begin()
+        try:
+            self.follow_focus()
+            return self.handle_key(key)
+        finally:
+            self.watchdog.end()
+
+    # --- PER-WINDOW STATE ---
+    def follow_focus(self):
+        """Keys go to another window now: switch to that window's typing state"""
+        if self.focus.check():
+            self.hide_candidates()
+            self.update_preedit()
+            self.watchdog.mark("focus")
+
+    def save_context(self):
+        return (self.state, self.last_unit, self.units, self.pending, self.pending_keys, self.base_state,
+                self.candidates, self.candidate_index, self.typed_word, self.layout_name)
+
+    def restore_context(self, context):
+        """State saved by save_context(), or a fresh word for None
+
+        A window seen for the first time gets its application's layout
+        from layouts/apps.csv, else keeps the current one.
+        """
+        if context is None:
+            app_layout = self.profiles.for_application(self.focus.provider.application()) if self.profiles else None
+            context = (ROOT, "", [], "", [], ROOT, [], -1, "", app_layout or self.layout_name)
+        (self.state, self.last_unit, self.units, self.pending, self.pending_keys, self.base_state,
+         self.candidates, self.candidate_index, self.typed_word, layout_name) = context
+        if not self.activate_layout(layout_name):
+            self.state = self.base_state = ROOT
+
+    def handle_key(self, key):
+        # On Windows the hook filter already completed (and swallowed) the
+        # key if there was anything to complete; elsewhere nothing can be
+        # suppressed, so the press also reaches the application
+        if key == SELECT_KEY and sys.platform != "win32":
+            self.select_completion()
+            return REPLACE
 
         if key == Key.backspace:
             if self.ignore_backspaces > 0:
                 self.ignore_backspaces -= 1
-                return
+                return INJECTED
             else:
-                self.buffer = ""
-                return
+                self.state = ROOT
+                self.reset_word()
+                self.hide_candidates()
+                return EDIT
 
         if key == Key.space or key == Key.enter:
-            self.buffer = ""
-            return
+            self.state = ROOT
+            self.commit_word()
+            self.reset_word()
+            self.hide_candidates()
+            return PASS
 
         char = None
         try:
             if hasattr(key, 'char') and key.char:
                 char = key.char
         except AttributeError:
-            return
+            return PASS
 
         if not char:
-            return
+            return PASS
 
         if char in self.output_chars:
-            return
+            return INJECTED
 
-        self.process_char(char)
+        if self.strip_candidates and char in DIGITS and int(char) <= len(self.strip_candidates):
+            self.choose_candidate(int(char) - 1)
+            return REPLACE
 
-    def process_char(self, char):
-        candidate = self.buffer + char
-        
-        # Case 1: Exact Match
-        if candidate in self.mapping:
-            backspaces = 2 if self.buffer else 1
-            self.apply_replacement(candidate, backspaces)
-            return
+        replaced = self.process_char(char)
+        if self.show_candidates or self.strip_candidates:
+            self.update_candidates()
+            self.watchdog.mark("candidates")
+        return REPLACE if replaced else PASS
 
-        # Case 2: Prefix Match
-        is_prefix = any(k.startswith(candidate) for k in self.mapping.keys())
-        if is_prefix:
-            self.buffer = candidate
+    def process_char(self, char):
+        # One precompiled transition per key (see transliterator.Layout)
+        state, back, text = self.layout.step(self.state, char)
+        self.watchdog.mark("transition")
+        previous = self.last_unit
+        self.state = state
+        self.last_unit = text
+        if back and self.units:
+            self.units.pop()
+        self.units.append(text)
+        self.candidate_index = -1
+
+        # Prefix or unmapped key: the typed character stays as it is
+        if text == char and not back:
+            return False
+
+        # Erase the typed key, plus the previous unit when it is replaced
+        backspaces = 1 + (len(previous) if back else 0)
+        self.apply_replacement(text, backspaces)
+        self.watchdog.mark("inject")
+        return True
+
+    def choose_candidate(self, index):
+        """Replace the current unit with a strip candidate picked by digit"""
+        keys, output, state = self.strip_candidates[index]
+        if self.composition:
+            # Only the pre-edit text changes, the digit never got through
+            self.pending_keys.extend(keys)
+            self.pending = output
+            self.state = state
+            self.settle_pending()
             return
-        
-        # Case 3: Broken Sequence
-        new_buffer = char
-        if new_buffer in self.mapping:
-            self.apply_replacement(new_buffer, 1)
-        elif any(k.startswith(new_buffer) for k in self.mapping.keys()):
-            self.buffer = new_buffer
+        # The digit itself reached the application too
+        self.apply_replacement(output, 1 + len(self.last_unit))
+        if self.units:
+            self.units.pop()
+        self.units.append(output)
+        self.last_unit = output
+        self.state = state
+        self.update_candidates()
+
+    def reset_word(self):
+        self.units = []
+        self.candidate_index = -1
+
+    def commit_word(self):
+        """Count the finished word so rankings follow this user's typing"""
+        word = "".join(self.units)
+        if word and all(ch in self.output_chars for ch in word):
+            self.usage.record(word)
+
+    def has_completion(self):
+        """True when the completion key would change the current word"""
+        if self.candidate_index >= 0:
+            return True
+        return bool(self.completer.complete("".join(self.units) + self.pending))
+
+    def select_completion(self):
+        """Complete the current word, cycling through candidates on repeats"""
+        if self.candidate_index < 0:
+            word = "".join(self.units)
+            self.candidates = self.usage.rank(self.completer.complete(word))
+            if not self.candidates:
+                return
+            self.typed_word = word
+            shown = word
         else:
-            self.buffer = ""
-
-    def apply_replacement(self, match_key, backspaces_needed):
-        eth_char = self.mapping[match_key]
-        self.ignore_backspaces += backspaces_needed
-        
-        for _ in range(backspaces_needed):
-            self.keyboard_controller.tap(Key.backspace)
-            
-        self.keyboard_controller.type(eth_char)
-        self.buffer = match_key
+            shown = self.candidates[self.candidate_index]
+        self.candidate_index = (self.candidate_index + 1) % len(self.candidates)
+        candidate = self.candidates[self.candidate_index]
+
+        # Candidates all start with the typed word: only the tails change
+        self.apply_replacement(candidate[len(self.typed_word):], len(shown) - len(self.typed_word))
+        self.units = [candidate]
+        self.state = ROOT
+        self.last_unit = candidate
+
+    def apply_replacement(self, eth_text, backspaces_needed):
+        # Tagged output is recognised by the hook filter; only the untagged
+        # fallback (ControllerInjector, never used in composition mode) has
+        # to count its own backspaces
+        if not self.injector.tagged and not self.composition:
+            self.ignore_backspaces += backspaces_needed
+
+        self.injector.send(eth_text, backspaces_needed)
 
 if __name__ == "__main__":
     # Ensure high DPI awareness for Windows
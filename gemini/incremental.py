@@ -0,0 +1,136 @@
+from transliterator import ROOT
+
+# Source characters per chunk; a boundary stores the automaton state there
+CHUNK_SIZE = 256
+
+
+class _Chunk:
+    """Transliterated slice of the source with the state it started from"""
+    __slots__ = ("src", "state_in", "state_out", "text", "last_len", "drop_prev")
+
+    def __init__(self, layout, src, state):
+        step = layout.step
+        units = []
+        drop_prev = False
+        self.src = src
+        self.state_in = state
+        for ch in src:
+            state, back, out = step(state, ch)
+            if back:
+                if units:
+                    units.pop()
+                else:
+                    # Erases the last unit of the previous chunk
+                    drop_prev = True
+            units.append(out)
+        self.state_out = state
+        self.text = "".join(units)
+        self.last_len = len(units[-1]) if units else 0
+        self.drop_prev = drop_prev
+
+
+def _render(chunks, next_drop):
+    """Output of consecutive chunks, honouring erasures across boundaries"""
+    parts = []
+    for index, chunk in enumerate(chunks):
+        drop = chunks[index + 1].drop_prev if index + 1 < len(chunks) else next_drop
+        parts.append(chunk.text[:-chunk.last_len] if drop and chunk.last_len else chunk.text)
+    return "".join(parts)
+
+
+class IncrementalDocument:
+    """Latin source document whose Ethiopic output is updated edit by edit
+
+    Only the chunks from the last boundary before an edit up to the first
+    boundary where the automaton state matches the old run again are
+    re-transliterated, so an edit costs O(edit + chunk) instead of O(document).
+    """
+
+    def __init__(self, layout, text="", chunk_size=CHUNK_SIZE):
+        self.layout = layout
+        self.chunk_size = chunk_size
+        self.chunks, _ = self._run(text, ROOT)
+
+    def _run(self, src, state):
+        chunks = []
+        for start in range(0, len(src), self.chunk_size):
+            chunk = _Chunk(self.layout, src[start:start + self.chunk_size], state)
+            chunks.append(chunk)
+            state = chunk.state_out
+        return chunks, state
+
+    @property
+    def source(self):
+        return "".join(chunk.src for chunk in self.chunks)
+
+    @property
+    def output(self):
+        return _render(self.chunks, False)
+
+    def _output_offset(self, stop):
+        """Length of the rendered output of chunks[:stop]"""
+        total = 0
+        for index in range(stop):
+            chunk = self.chunks[index]
+            total += len(chunk.text)
+            if index + 1 < len(self.chunks) and self.chunks[index + 1].drop_prev:
+                total -= chunk.last_len
+        return total
+
+    def edit(self, start, end, text):
+        """Replace source[start:end] with text
+
+        Returns a list of (out_start, out_end, replacement) diffs against the
+        previous output, empty when the rendered output did not change.
+        """
+        chunks = self.chunks
+        if start < 0 or end < start or end > sum(len(chunk.src) for chunk in chunks):
+            raise ValueError("edit range outside the document")
+
+        # Last stable boundary at or before the edit, and the chunk holding its end
+        first, pos = 0, 0
+        while first < len(chunks) - 1 and pos + len(chunks[first].src) <= start:
+            pos += len(chunks[first].src)
+            first += 1
+        last, last_pos = first, pos
+        while last < len(chunks) - 1 and last_pos + len(chunks[last].src) < end:
+            last_pos += len(chunks[last].src)
+            last += 1
+
+        if chunks:
+            head = chunks[first].src[:start - pos]
+            tail = chunks[last].src[end - last_pos:]
+            state = chunks[first].state_in
+            resume = last + 1
+        else:
+            head, tail, state, resume = "", "", ROOT, 0
+
+        new_chunks, state = self._run(head + text + tail, state)
+
+        # Keep going until the automaton re-synchronizes with the old run
+        while resume < len(chunks) and chunks[resume].state_in != state:
+            chunk = _Chunk(self.layout, chunks[resume].src, state)
+            new_chunks.append(chunk)
+            state = chunk.state_out
+            resume += 1
+
+        next_drop = chunks[resume].drop_prev if resume < len(chunks) else False
+        keep = chunks[first - 1:first] if first > 0 else []
+        offset = self._output_offset(first - 1) if first > 0 else 0
+        old_text = _render(keep + chunks[first:resume], next_drop)
+        new_text = _render(keep + new_chunks, next_drop)
+
+        self.chunks = chunks[:first] + new_chunks + chunks[resume:]
+
+        # Trim the common prefix and suffix down to a minimal diff
+        limit = min(len(old_text), len(new_text))
+        lead = 0
+        while lead < limit and old_text[lead] == new_text[lead]:
+            lead += 1
+        trail = 0
+        while trail < limit - lead and old_text[-1 - trail] == new_text[-1 - trail]:
+            trail += 1
+        if lead == len(old_text) == len(new_text):
+            return []
+        return [(offset + lead, offset + len(old_text) - trail,
+                 new_text[lead:len(new_text) - trail])]
@@ -0,0 +1,93 @@
+import ctypes
+import sys
+
+from pynput.keyboard import Key, KeyCode
+
+# Stamped into dwExtraInfo of every event we inject ("SG" + 1), so the
+# hook can drop our own output with one comparison
+INJECTION_MARKER = 0x53470001
+
+INPUT_KEYBOARD = 1
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+VK_BACK = 0x08
+
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [("wVk", ctypes.c_ushort), ("wScan", ctypes.c_ushort), ("dwFlags", ctypes.c_ulong),
+                ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long), ("dy", ctypes.c_long), ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong), ("time", ctypes.c_ulong), ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class _INPUTUNION(ctypes.Union):
+    # The mouse member only gives the union its real size
+    _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+
+class INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong), ("union", _INPUTUNION)]
+
+
+class Win32Injector:
+    """Sends tagged keyboard input, a whole replacement in one SendInput call"""
+
+    tagged = True
+
+    def __init__(self):
+        self._send_input = ctypes.windll.user32.SendInput
+
+    def _send(self, events):
+        inputs = (INPUT * len(events))()
+        for item, (vk, scan, flags) in zip(inputs, events):
+            item.type = INPUT_KEYBOARD
+            item.union.ki = KEYBDINPUT(vk, scan, flags, 0, INJECTION_MARKER)
+        self._send_input(len(events), inputs, ctypes.sizeof(INPUT))
+
+    def send(self, text, backspaces=0):
+        """Erase backspaces characters, then type text"""
+        events = []
+        for _ in range(backspaces):
+            events.append((VK_BACK, 0, 0))
+            events.append((VK_BACK, 0, KEYEVENTF_KEYUP))
+        data = text.encode("utf-16-le")
+        for i in range(0, len(data), 2):
+            unit = data[i] | data[i + 1] << 8
+            events.append((0, unit, KEYEVENTF_UNICODE))
+            events.append((0, unit, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP))
+        if events:
+            self._send(events)
+
+    def send_key(self, vk, extended=False):
+        """Tap one virtual key, e.g. a key replayed after composed text"""
+        flags = KEYEVENTF_EXTENDEDKEY if extended else 0
+        self._send([(vk, 0, flags), (vk, 0, flags | KEYEVENTF_KEYUP)])
+
+
+class ControllerInjector:
+    """pynput fallback for other platforms; its events carry no marker"""
+
+    tagged = False
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def send(self, text, backspaces=0):
+        for _ in range(backspaces):
+            self.controller.tap(Key.backspace)
+        if text:
+            self.controller.type(text)
+
+    def send_key(self, vk, extended=False):
+        self.controller.tap(KeyCode.from_vk(vk))
+
+
+def create_injector(controller):
+    """Tagged SendInput on Windows, the pynput controller elsewhere"""
+    if sys.platform == "win32":
+        return Win32Injector()
+    return ControllerInjector(controller)
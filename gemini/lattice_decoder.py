@@ -0,0 +1,295 @@
+import argparse
+import math
+import os
+import re
+import struct
+import sys
+import unicodedata
+from array import array
+
+from normalizer import FOLDS
+from transliterator import ROOT, load_layout
+
+# Model file: header, vocabulary as UTF-8, then a dense V x V float32
+# table of log P(next syllable | previous syllable)
+MAGIC = b"SGNG"
+VERSION = 1
+HEADER = struct.Struct("=4sII")
+
+# Syllable ids 0 and 1 are the word boundary and anything never seen
+BOUNDARY = 0
+UNKNOWN = 1
+# Interpolation weight of the unigram distribution in the bigram estimate
+SMOOTHING = 2.0
+
+# Every extra syllable and every homophone swap costs a little, so with no
+# evidence either way the decoder falls back to the layout's own choice
+EDGE_COST = 0.5
+ALTERNATIVE_COST = 1.5
+
+CACHE_SIZE = 200000
+_ETHIOPIC_WORD = re.compile("[ሀ-ፚᎀ-ᎏ]+")
+
+
+class SyllableModel:
+    """Bigram syllable model held in one flat array for O(1) lookups"""
+
+    def __init__(self, vocab, logprobs):
+        self.vocab = vocab
+        self.size = len(vocab) + 2
+        self.ids = {ch: i for i, ch in enumerate(vocab, 2)}
+        self.logprobs = logprobs
+
+    @classmethod
+    def train(cls, lines):
+        """Count syllable bigrams inside the Ethiopic words of a text stream"""
+        unigrams = {}
+        bigrams = {}
+        for line in lines:
+            for word in _ETHIOPIC_WORD.findall(line):
+                prev = None
+                for ch in word + "\n":
+                    unigrams[ch] = unigrams.get(ch, 0) + 1
+                    bigrams[prev, ch] = bigrams.get((prev, ch), 0) + 1
+                    prev = ch
+
+        vocab = "".join(sorted(ch for ch in unigrams if ch != "\n"))
+        model = cls(vocab, None)
+        ids = dict(model.ids)
+        ids[None] = ids["\n"] = BOUNDARY
+        size = model.size
+        total = sum(unigrams.values())
+
+        # Add-one unigrams, interpolated into every bigram row
+        unigram = [1.0 / (total + size)] * size
+        unigram[BOUNDARY] = (unigrams.get("\n", 0) + 1.0) / (total + size)
+        for ch, i in model.ids.items():
+            unigram[i] = (unigrams[ch] + 1.0) / (total + size)
+        rows = [[0.0] * size for _ in range(size)]
+        totals = [0.0] * size
+        for (prev, ch), count in bigrams.items():
+            rows[ids[prev]][ids[ch]] += count
+            totals[ids[prev]] += count
+
+        logprobs = array("f")
+        for prev in range(size):
+            denom = totals[prev] + SMOOTHING
+            logprobs.extend(math.log((rows[prev][ch] + SMOOTHING * unigram[ch]) / denom)
+                            for ch in range(size))
+        model.logprobs = logprobs
+        return model
+
+    def save(self, path):
+        vocab = self.vocab.encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(vocab)))
+            f.write(vocab)
+            self.logprobs.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, version, vocab_len = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a syllable model file")
+            vocab = f.read(vocab_len).decode("utf-8")
+            logprobs = array("f")
+            size = len(vocab) + 2
+            logprobs.fromfile(f, size * size)
+        return cls(vocab, logprobs)
+
+    def id(self, ch):
+        return self.ids.get(ch, UNKNOWN)
+
+
+# Vowel columns loose typing leaves ambiguous: a bare consonant is often
+# meant as sixth order (ብ for b), and first/fourth order are mixed up
+VOWEL_ALTERNATIVES = {0: (3, 5), 3: (0,), 5: (0,)}
+
+
+def homophones(folds=FOLDS):
+    """First syllable of each homophone series mapped to its whole group"""
+    groups = {}
+    for pairs in folds.values():
+        for src, dst in pairs:
+            groups.setdefault(dst, {dst}).add(src)
+    series = {}
+    for bases in groups.values():
+        for base in bases:
+            series[base] = sorted(bases)
+    return series
+
+
+class LatticeDecoder:
+    """Picks the likeliest Ethiopic reading of loosely typed Latin words
+
+    Each word becomes a lattice of every way the layout keys can segment it,
+    with homophone series and commonly confused vowel orders offered next
+    to the layout's own choice. Viterbi
+    over the syllable model, keyed by the last syllable, picks the best
+    path. Edges per key window and whole decoded words are cached, since
+    bulk corpora repeat both heavily. Drop-in for Layout.transliterate.
+    """
+
+    def __init__(self, layout, model, cache_size=CACHE_SIZE):
+        self.layout = layout
+        self.model = model
+        self.series = homophones()
+        self._alternatives = {}
+        self.max_key = max((len(key) for key in layout.table.keys()), default=1)
+        letters = {ch for key in layout.table.keys() for ch in key if ch.isalpha() or ch == "["}
+        self.word = re.compile("[" + re.escape("".join(sorted(letters))) + "]+") if letters else None
+        self.cache_size = cache_size
+        self._edges = {}
+        self._words = {}
+
+    def alternatives(self, ch):
+        """(syllable, cost) readings a loose typist may have meant by ch"""
+        found = self._alternatives.get(ch)
+        if found is not None:
+            return found
+        found = []
+        code = ord(ch)
+        if "ETHIOPIC SYLLABLE" in unicodedata.name(ch, ""):
+            column = code & 7
+            base = code - column
+            for other_base in self.series.get(base, (base,)):
+                for other_column in (column,) + VOWEL_ALTERNATIVES.get(column, ()):
+                    other = chr(other_base + other_column)
+                    if other != ch and unicodedata.name(other, ""):
+                        swaps = (other_base != base) + (other_column != column)
+                        found.append((other, swaps * ALTERNATIVE_COST))
+        self._alternatives[ch] = found
+        return found
+
+    def _edges_at(self, window):
+        """(length, output, cost) for every key starting a text window"""
+        edges = self._edges.get(window)
+        if edges is not None:
+            return edges
+        edges = []
+        trie = self.layout.trie
+        node = ROOT
+        for length, ch in enumerate(window, 1):
+            node = trie.step(node, ch)
+            if node < 0:
+                break
+            value = trie.value(node)
+            if value is None:
+                continue
+            edges.append((length, value, EDGE_COST))
+            if len(value) == 1:
+                for other, cost in self.alternatives(value):
+                    edges.append((length, other, EDGE_COST + cost))
+        if not edges:
+            # Not a key at all: the character passes through like when typed
+            edges.append((1, window[0], EDGE_COST))
+        self._edges[window] = edges
+        return edges
+
+    def decode_word(self, word):
+        result = self._words.get(word)
+        if result is not None:
+            return result
+
+        logprobs = self.model.logprobs
+        size = self.model.size
+        ids = self.model.id
+        n = len(word)
+        # best[i] maps the last syllable id to (score, back pointer)
+        best = [{} for _ in range(n + 1)]
+        best[0][BOUNDARY] = (0.0, None)
+        for i in range(n):
+            if not best[i]:
+                continue
+            for length, out, cost in self._edges_at(word[i:i + self.max_key]):
+                out_ids = [ids(ch) for ch in out]
+                column = best[i + length]
+                for prev, (score, _) in best[i].items():
+                    score -= cost
+                    last = prev
+                    for k in out_ids:
+                        score += logprobs[last * size + k]
+                        last = k
+                    current = column.get(last)
+                    if current is None or score > current[0]:
+                        column[last] = (score, (i, prev, out))
+
+        end = max(best[n], key=lambda last: best[n][last][0] + logprobs[last * size + BOUNDARY])
+        parts = []
+        i, last = n, end
+        while i > 0:
+            i, last, out = best[i][last][1]
+            parts.append(out)
+        result = "".join(reversed(parts))
+
+        if len(self._words) >= self.cache_size:
+            self._words.clear()
+        if len(self._edges) >= self.cache_size:
+            self._edges.clear()
+        self._words[word] = result
+        return result
+
+    def transliterate(self, text):
+        """Decode the words of a text; anything between them goes through the layout"""
+        if self.word is None:
+            return self.layout.transliterate(text)
+        parts = []
+        pos = 0
+        for match in self.word.finditer(text):
+            if match.start() > pos:
+                parts.append(self.layout.transliterate(text[pos:match.start()]))
+            parts.append(self.decode_word(match.group()))
+            pos = match.end()
+        if pos < len(text):
+            parts.append(self.layout.transliterate(text[pos:]))
+        return "".join(parts)
+
+
+def load_transliterator(config_path, model_path=None):
+    """The layout itself, or a lattice decoder over it when a model is given"""
+    layout = load_layout(config_path)
+    if not model_path:
+        return layout
+    return LatticeDecoder(layout, SyllableModel.load(model_path))
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Train or run the syllable n-gram lattice decoder")
+    parser.add_argument("--config", default=os.path.join(base_path, "config.csv"), help="layout table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="build a model from Ethiopic text files")
+    train.add_argument("model", help="model file to write")
+    train.add_argument("corpus", nargs="+")
+    decode = sub.add_parser("decode", help="decode Latin text from a file or stdin")
+    decode.add_argument("model", help="model file")
+    decode.add_argument("source", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        def lines():
+            for path in args.corpus:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    yield from f
+        model = SyllableModel.train(lines())
+        model.save(args.model)
+        print(f"Saved model of {len(model.vocab)} syllables to {args.model}")
+        return
+
+    try:
+        decoder = load_transliterator(args.config, args.model)
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        sys.exit(1)
+    src = open(args.source, "r", encoding="utf-8") if args.source else sys.stdin
+    try:
+        for line in src:
+            sys.stdout.write(decoder.transliterate(line))
+    finally:
+        if args.source:
+            src.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import argparse
+import os
+import re
+import sys
+
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.phrase_trie import read_table  # noqa: E402
+
+# Per-encoding tables live here, one <encoding>.csv each, same two-column
+# layout as config.csv: legacy characters, Unicode Ethiopic replacement
+ENCODINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "encodings")
+
+# Legacy documents are byte streams; latin-1 maps every byte to one character
+LEGACY_CODEC = "latin-1"
+CHUNK_SIZE = 1 << 20
+SAMPLE_SIZE = 64 * 1024
+DETECT_THRESHOLD = 0.9
+
+_HEX_KEY = re.compile(r"^0x[0-9A-Fa-f]{2}(\s+0x[0-9A-Fa-f]{2})*$")
+
+
+def _parse_key(key):
+    """Table keys are literal text, or 0xNN byte codes for awkward bytes"""
+    if _HEX_KEY.match(key):
+        return "".join(chr(int(code, 16)) for code in key.split())
+    return key
+
+
+class LegacyEncoding:
+    """One font encoding compiled into a translate table plus a sequence regex"""
+
+    def __init__(self, name, table):
+        self.name = name
+        self.table = table
+        # Single characters go through str.translate, which runs in C
+        self.single = {ord(k): v for k, v in table.items() if len(k) == 1}
+        # Glyph sequences (base plus vowel mark) are substituted first
+        self.multi = {k: v for k, v in table.items() if len(k) > 1}
+        if self.multi:
+            keys = sorted(self.multi, key=len, reverse=True)
+            self.pattern = re.compile("|".join(re.escape(k) for k in keys))
+        else:
+            self.pattern = None
+        self.max_key = max((len(k) for k in table), default=1)
+        self.key_chars = {ch for key in table for ch in key}
+
+    @classmethod
+    def load(cls, path):
+        """Read an encoding table file"""
+        table = {_parse_key(key): value for key, value in read_table(path).items()}
+        name = os.path.splitext(os.path.basename(path))[0]
+        return cls(name, table)
+
+    def convert(self, text):
+        """Convert one piece of legacy text to Unicode"""
+        if self.pattern is not None:
+            text = self.pattern.sub(lambda m: self.multi[m.group()], text)
+        return text.translate(self.single)
+
+    def convert_settled(self, text):
+        """Convert the start of a chunk, returns (converted, rest to carry)
+
+        The longest-match scan decides at each position from at most
+        max_key characters, so everything it decided before the last
+        max_key characters is final. The cut falls where the scan stands
+        after that, never inside a glyph sequence.
+        """
+        if self.pattern is None:
+            return text.translate(self.single), ""
+        limit = len(text) - self.max_key
+        multi = self.multi
+        pieces = []
+        pos = 0
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            if start > limit:
+                break
+            pieces.append(text[pos:start])
+            pieces.append(multi[match.group()])
+            pos = match.end()
+        cut = max(pos, limit + 1)
+        pieces.append(text[pos:cut])
+        return "".join(pieces).translate(self.single), text[cut:]
+
+    def score(self, sample):
+        """Share of the non-blank sample characters this table knows about"""
+        chars = [ch for ch in sample if not ch.isspace()]
+        if not chars:
+            return 0.0
+        known = sum(1 for ch in chars if ch in self.key_chars)
+        return known / len(chars)
+
+
+def load_encodings(directory=ENCODINGS_DIR):
+    """Load every encoding table in the directory, keyed by name"""
+    encodings = {}
+    if not os.path.isdir(directory):
+        return encodings
+    for filename in sorted(os.listdir(directory)):
+        if filename.lower().endswith(".csv"):
+            try:
+                encoding = LegacyEncoding.load(os.path.join(directory, filename))
+                encodings[encoding.name] = encoding
+            except Exception as e:
+                print(f"Error loading encoding table {filename}: {e}")
+    return encodings
+
+
+def detect_encoding(sample, encodings, threshold=DETECT_THRESHOLD):
+    """Best matching encoding for a text sample, or None
+
+    Text that is already Unicode Ethiopic is never legacy-encoded. Otherwise
+    every table is scored on how much of the sample it covers; on a tie the
+    table covering more of the non-letter bytes wins, since those are the
+    glyph slots that differ between font families.
+    """
+    if any("ሀ" <= ch <= "᎟" for ch in sample):
+        return None
+    best, best_key = None, None
+    for encoding in encodings.values():
+        coverage = encoding.score(sample)
+        if coverage < threshold:
+            continue
+        distinctive = sum(1 for ch in set(sample) if not ch.isalpha() and ch in encoding.key_chars)
+        key = (coverage, distinctive)
+        if best_key is None or key > best_key:
+            best, best_key = encoding, key
+    return best
+
+
+def convert_stream(encoding, src, dst, chunk_size=CHUNK_SIZE):
+    """Stream legacy text from src to dst in fixed-size chunks"""
+    carry = ""
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        converted, carry = encoding.convert_settled(carry + chunk)
+        dst.write(converted)
+    if carry:
+        dst.write(encoding.convert(carry))
+
+
+def convert_file(src_path, dst_path, encodings, name="auto"):
+    """Convert one file, returns the encoding used or None when skipped"""
+    with open(src_path, "r", encoding=LEGACY_CODEC, newline="") as src:
+        if name == "auto":
+            encoding = detect_encoding(src.read(SAMPLE_SIZE), encodings)
+            src.seek(0)
+            if encoding is None:
+                return None
+        else:
+            encoding = encodings[name]
+        with open(dst_path, "w", encoding="utf-8", newline="") as dst:
+            convert_stream(encoding, src, dst)
+    return encoding.name
+
+
+def convert_tree(src_dir, dst_dir, encodings, name="auto"):
+    """Convert every file below src_dir into the same layout under dst_dir"""
+    converted = skipped = 0
+    for folder, _, files in os.walk(src_dir):
+        target = os.path.join(dst_dir, os.path.relpath(folder, src_dir))
+        os.makedirs(target, exist_ok=True)
+        for filename in files:
+            used = convert_file(os.path.join(folder, filename), os.path.join(target, filename),
+                                encodings, name)
+            if used:
+                converted += 1
+            else:
+                skipped += 1
+                print(f"Skipped (no matching encoding): {os.path.join(folder, filename)}")
+    return converted, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert legacy Ethiopic font encodings to Unicode")
+    parser.add_argument("source", nargs="?", help="file or directory to convert")
+    parser.add_argument("target", nargs="?", help="output file or directory")
+    parser.add_argument("--encoding", default="auto", help="table name, or auto to detect per file")
+    parser.add_argument("--tables", default=ENCODINGS_DIR, help="directory of encoding tables")
+    parser.add_argument("--list", action="store_true", help="list available encodings")
+    args = parser.parse_args()
+
+    encodings = load_encodings(args.tables)
+    if args.list or not args.source:
+        print("Available encodings: " + (", ".join(encodings) or "none"))
+        return
+    if not encodings:
+        # None are bundled: a guessed glyph chart would corrupt documents
+        print(f"Error: no encoding tables found in {args.tables}; "
+              f"see {os.path.join(ENCODINGS_DIR, 'README.txt')} for the table format")
+        sys.exit(1)
+    if args.encoding != "auto" and args.encoding not in encodings:
+        print(f"Error: unknown encoding {args.encoding}")
+        sys.exit(1)
+
+    if os.path.isdir(args.source):
+        converted, skipped = convert_tree(args.source, args.target or args.source + "_unicode",
+                                          encodings, args.encoding)
+        print(f"Converted {converted} files, skipped {skipped}")
+    else:
+        target = args.target or os.path.splitext(args.source)[0] + ".unicode.txt"
+        used = convert_file(args.source, target, encodings, args.encoding)
+        if used:
+            print(f"Converted {args.source} ({used}) -> {target}")
+        else:
+            print(f"No matching encoding detected for {args.source}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import re
+import sys
+import unicodedata
+
+CHUNK_SIZE = 1 << 20
+
+# Homophone series folded onto the series people use most, as
+# (first syllable of folded series, first syllable of target series)
+FOLDS = {
+    "h": [(0x1210, 0x1200), (0x1280, 0x1200)],  # ሐ ኀ -> ሀ
+    "s": [(0x1220, 0x1230)],                    # ሠ -> ሰ
+    "a": [(0x12D0, 0x12A0)],                    # ዐ -> አ
+    "ts": [(0x1340, 0x1338)],                   # ፀ -> ጸ
+}
+DEFAULT_FOLDS = ("h", "s", "a", "ts")
+# Labialized syllables of a folded series with no -wa slot in the target
+FOLD_EXTRA = {"h": {0x1217: 0x128B}}                # ሗ -> ኋ
+
+# Word space pairs typed in place of the full stop
+PUNCTUATION = {"፡፡": "።", "::": "።"}
+
+_SEPARATOR = "\x00"
+
+
+def _syllable(code):
+    """Name of an assigned Ethiopic syllable, or None"""
+    return unicodedata.name(chr(code), None)
+
+
+def _fold_table(folds):
+    """Translate table as a list indexed by code point
+
+    str.translate looks list entries up without hashing, which is several
+    times faster than a dict; code points past the end are left alone.
+    """
+    table = {}
+    for name in folds:
+        for src, dst in FOLDS[name]:
+            # Seven vowel orders line up one to one
+            for order in range(7):
+                if _syllable(src + order) and _syllable(dst + order):
+                    table[src + order] = chr(dst + order)
+            # The eighth slot only when both are the -wa form
+            eighth_src, eighth_dst = _syllable(src + 7), _syllable(dst + 7)
+            if eighth_src and eighth_dst and eighth_src.endswith("WA") and eighth_dst.endswith("WA"):
+                table[src + 7] = chr(dst + 7)
+        for src, dst in FOLD_EXTRA.get(name, {}).items():
+            table[src] = chr(dst)
+    if not table:
+        return []
+    lookup = [chr(code) for code in range(max(table) + 1)]
+    for code, target in table.items():
+        lookup[code] = target
+    return lookup
+
+
+def _labialized_table():
+    """Second order + ዋ spellings mapped to the single labialized syllable"""
+    table = {}
+    prefix = "ETHIOPIC SYLLABLE "
+    for code in range(0x1200, 0x1380):
+        name = _syllable(code)
+        if not name or not name.startswith(prefix) or not name.endswith("U"):
+            continue
+        consonant = name[len(prefix):-1]
+        # Velars have a full labialized series; their ዋ-like form is -WAA
+        for suffix in ("WAA", "WA"):
+            try:
+                table[chr(code) + "ዋ"] = unicodedata.lookup(f"{prefix}{consonant}{suffix}")
+                break
+            except KeyError:
+                pass
+    return table
+
+
+class Normalizer:
+    """Folds homophone series and spelling variants of Ethiopic text
+
+    Single characters go through one precompiled str.translate table; the
+    few multi-character rules use one compiled regex that only runs when
+    its trigger character is present.
+    """
+
+    def __init__(self, folds=DEFAULT_FOLDS, labialized=True, punctuation=True):
+        self.table = _fold_table(folds)
+        self.sequences = {}
+        if labialized:
+            # Rules apply after folding, so key them by the folded spelling
+            for seq, target in _labialized_table().items():
+                self.sequences[seq.translate(self.table)] = target.translate(self.table)
+        if punctuation:
+            self.sequences.update(PUNCTUATION)
+        if self.sequences:
+            keys = sorted(self.sequences, key=len, reverse=True)
+            self.pattern = re.compile("|".join(re.escape(k) for k in keys))
+            self.triggers = {key[-1] for key in keys}
+            self.starts = {key[0] for key in keys}
+        else:
+            self.pattern = None
+            self.triggers = set()
+            self.starts = set()
+
+    def normalize(self, text):
+        text = text.translate(self.table)
+        if self.pattern is not None and any(ch in text for ch in self.triggers):
+            text = self.pattern.sub(lambda m: self.sequences[m.group()], text)
+        return text
+
+    def normalize_many(self, texts):
+        """Normalize a list in one pass over a joined buffer"""
+        if not texts:
+            return []
+        if any(_SEPARATOR in text for text in texts):
+            return [self.normalize(text) for text in texts]
+        return self.normalize(_SEPARATOR.join(texts)).split(_SEPARATOR)
+
+    def normalize_stream(self, src, dst, chunk_size=CHUNK_SIZE):
+        """Normalize a text stream chunk by chunk"""
+        carry = ""
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            text = carry + chunk
+            # Hold back a character that might start a two-character rule
+            cut = len(text) - 1 if text[-1] in self.starts else len(text)
+            dst.write(self.normalize(text[:cut]))
+            carry = text[cut:]
+        if carry:
+            dst.write(self.normalize(carry))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold Ethiopic homophones and spelling variants")
+    parser.add_argument("source", nargs="?", help="input file, stdin when omitted")
+    parser.add_argument("target", nargs="?", help="output file, stdout when omitted")
+    parser.add_argument("--folds", default=",".join(DEFAULT_FOLDS),
+                        help="series to fold: " + ", ".join(FOLDS) + " (empty for none)")
+    parser.add_argument("--keep-labialized", action="store_true", help="leave Cu+ዋ spellings alone")
+    parser.add_argument("--keep-punctuation", action="store_true", help="leave ፡፡ and :: alone")
+    args = parser.parse_args()
+
+    folds = [name for name in args.folds.split(",") if name]
+    unknown = [name for name in folds if name not in FOLDS]
+    if unknown:
+        print(f"Error: unknown folds {', '.join(unknown)}")
+        sys.exit(1)
+    normalizer = Normalizer(folds, not args.keep_labialized, not args.keep_punctuation)
+
+    src = open(args.source, "r", encoding="utf-8", newline="") if args.source else sys.stdin
+    dst = open(args.target, "w", encoding="utf-8", newline="") if args.target else sys.stdout
+    try:
+        normalizer.normalize_stream(src, dst)
+    finally:
+        if args.source:
+            src.close()
+        if args.target:
+            dst.close()
+
+
+if __name__ == "__main__":
+    main()
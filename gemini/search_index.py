@@ -0,0 +1,204 @@
+import argparse
+import math
+import os
+import sqlite3
+import sys
+
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.phrase_trie import read_table  # noqa: E402
+from transliterator import Layout  # noqa: E402
+
+GRAM = 3
+# Candidates are drawn from the rarest query grams, then fully scored
+MAX_CANDIDATES = 5000
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Ethiopic punctuation has no config.csv entry
+PUNCTUATION = {"፡": " ", "።": ".", "፣": ",", "፤": ";", "፥": ":", "፦": ":", "፧": "?", "፨": " "}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, name TEXT UNIQUE, length INTEGER, text TEXT);
+CREATE TABLE IF NOT EXISTS grams (gram TEXT PRIMARY KEY, df INTEGER) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (gram TEXT, doc INTEGER, tf INTEGER, PRIMARY KEY (gram, doc)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER) WITHOUT ROWID;
+"""
+
+
+class Romanizer:
+    """Reverse-maps Ethiopic through the config.csv table into a folded Latin form"""
+
+    def __init__(self, table):
+        self.layout = Layout(table)
+        reverse = {}
+        for key, value in table.items():
+            if len(value) == 1 and (value not in reverse or len(key) < len(reverse[value])):
+                reverse[value] = key
+        # First, fourth and sixth order are the forms people mix up when
+        # typing (ሀ/ሃ/ህ), so they share the bare consonant
+        for value, key in reverse.items():
+            if len(key) > 1 and key[-1] in "ae":
+                reverse[value] = key[:-1]
+        reverse.update(PUNCTUATION)
+        self.reverse = str.maketrans(reverse)
+
+        # Scheme variants: case never matters, series markers and the
+        # glottal carrier x/X are dropped so h/H, s/S/s[, a/xa all meet
+        letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        self.fold = str.maketrans(letters, letters.lower(), "[xX")
+
+    def normalize(self, text, typed=False):
+        """Folded romanized form of Ethiopic text, or of a Latin query when typed"""
+        if typed and not any("ሀ" <= ch <= "᎟" for ch in text):
+            # Latin in the IME scheme: type it through the layout first
+            text = self.layout.transliterate(text)
+        return " ".join(text.translate(self.reverse).translate(self.fold).split())
+
+
+def grams(text):
+    """Character n-grams of every word, padded so short words still count"""
+    counts = {}
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(max(1, len(padded) - GRAM + 1)):
+            gram = padded[i:i + GRAM]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+class SearchIndex:
+    """On-disk inverted n-gram index over romanized documents"""
+
+    def __init__(self, path, romanizer):
+        self.romanizer = romanizer
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _stat(self, key):
+        row = self.db.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, key, delta):
+        self.db.execute("INSERT INTO stats VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + ?",
+                        (key, delta, delta))
+
+    def _remove(self, doc_id, text):
+        counts = grams(text)
+        self.db.executemany("DELETE FROM postings WHERE gram = ? AND doc = ?",
+                            [(gram, doc_id) for gram in counts])
+        self.db.executemany("UPDATE grams SET df = df - 1 WHERE gram = ?", [(gram,) for gram in counts])
+        self.db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+        self._bump("docs", -1)
+        self._bump("length", -len(text))
+
+    def add(self, name, text):
+        """Index (or re-index) one document; call commit() after a batch"""
+        norm = self.romanizer.normalize(text)
+        row = self.db.execute("SELECT id, text FROM docs WHERE name = ?", (name,)).fetchone()
+        if row:
+            self._remove(row[0], row[1])
+        cur = self.db.execute("INSERT INTO docs (name, length, text) VALUES (?, ?, ?)", (name, len(norm), norm))
+        doc_id = cur.lastrowid
+        counts = grams(norm)
+        self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                            [(gram, doc_id, tf) for gram, tf in counts.items()])
+        self.db.executemany("INSERT INTO grams VALUES (?, 1) ON CONFLICT(gram) DO UPDATE SET df = df + 1",
+                            [(gram,) for gram in counts])
+        self._bump("docs", 1)
+        self._bump("length", len(norm))
+
+    def commit(self):
+        self.db.commit()
+
+    def search(self, query, limit=10):
+        """Rank documents for a Latin or Ethiopic query, best first"""
+        counts = grams(self.romanizer.normalize(query, typed=True))
+        if not counts:
+            return []
+        n_docs = self._stat("docs")
+        if not n_docs:
+            return []
+        avg_len = self._stat("length") / n_docs
+
+        dfs = {}
+        for gram in counts:
+            row = self.db.execute("SELECT df FROM grams WHERE gram = ?", (gram,)).fetchone()
+            if row and row[0] > 0:
+                dfs[gram] = row[0]
+        if not dfs:
+            return []
+
+        # Rarest grams first: they give few candidates and the most evidence
+        ordered = sorted(dfs, key=dfs.get)
+        candidates = {}
+        for gram in ordered:
+            for doc, tf in self.db.execute("SELECT doc, tf FROM postings WHERE gram = ? LIMIT ?",
+                                           (gram, MAX_CANDIDATES)):
+                candidates.setdefault(doc, {})[gram] = tf
+            if len(candidates) >= MAX_CANDIDATES // 10:
+                break
+        if not candidates:
+            return []
+
+        # Fill in the remaining grams only for the candidate documents
+        doc_ids = list(candidates)
+        marks = ",".join("?" * len(doc_ids))
+        for gram in ordered:
+            for doc, tf in self.db.execute(f"SELECT doc, tf FROM postings WHERE gram = ? AND doc IN ({marks})",
+                                           [gram] + doc_ids):
+                candidates[doc][gram] = tf
+        lengths = dict(self.db.execute(f"SELECT id, length FROM docs WHERE id IN ({marks})", doc_ids))
+
+        scored = []
+        for doc, found in candidates.items():
+            norm = 1 - BM25_B + BM25_B * lengths.get(doc, avg_len) / max(avg_len, 1)
+            score = 0.0
+            for gram, tf in found.items():
+                idf = math.log(1 + (n_docs - dfs[gram] + 0.5) / (dfs[gram] + 0.5))
+                score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+            scored.append((score, doc))
+        scored.sort(reverse=True)
+
+        top = scored[:limit]
+        names = dict(self.db.execute(f"SELECT id, name FROM docs WHERE id IN ({','.join('?' * len(top))})",
+                                     [doc for _, doc in top]))
+        return [(names[doc], score) for score, doc in top]
+
+
+def main():
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Search Ethiopic text with Latin or Ethiopic queries")
+    parser.add_argument("index", help="index database file")
+    parser.add_argument("--config", default=os.path.join(base_path, "config.csv"), help="layout table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="index text files")
+    add.add_argument("files", nargs="+")
+    find = sub.add_parser("search", help="query the index")
+    find.add_argument("query")
+    find.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index, Romanizer(read_table(args.config)))
+    try:
+        if args.command == "add":
+            for path in args.files:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    index.add(path, f.read())
+            index.commit()
+            print(f"Indexed {len(args.files)} documents")
+        else:
+            for name, score in index.search(args.query, args.limit):
+                print(f"{score:8.3f}  {name}")
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
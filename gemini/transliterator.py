@@ -0,0 +1,228 @@
+import os
+import sys
+from collections import deque
+
+# The shared/ package sits in the repository root, beside this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.phrase_trie import PhraseTrie, load_table, output_alphabet  # noqa: E402
+
+# State of an empty composition buffer
+ROOT = 0
+# Continuations offered per state, one per digit key
+MAX_CANDIDATES = 9
+
+
+class _DictTrie:
+    """Character trie over a plain dict table, same walk API as PhraseTrie"""
+
+    def __init__(self, table):
+        self.root = ROOT
+        self._children = [{}]
+        self._values = [None]
+        self._chars = [""]
+        for key, value in table.items():
+            self.insert(key, value)
+
+    def copy(self):
+        trie = _DictTrie({})
+        trie._children = [children.copy() for children in self._children]
+        trie._values = list(self._values)
+        trie._chars = list(self._chars)
+        return trie
+
+    def insert(self, key, value):
+        """Add or replace key, returns the nodes along it from the root"""
+        node = ROOT
+        path = [node]
+        for ch in key:
+            nxt = self._children[node].get(ch)
+            if nxt is None:
+                nxt = len(self._children)
+                self._children.append({})
+                self._values.append(None)
+                self._chars.append(ch)
+                self._children[node][ch] = nxt
+            node = nxt
+            path.append(node)
+        self._values[node] = value
+        return path
+
+    def remove(self, key):
+        """Take key out, returns the nodes along it from the root
+
+        The branch it leaves without keys is cut off; its nodes stay
+        allocated but can no longer be reached, so no state is renumbered.
+        """
+        path = [ROOT]
+        for ch in key:
+            nxt = self._children[path[-1]].get(ch, -1)
+            if nxt < 0:
+                return path
+            path.append(nxt)
+        self._values[path[-1]] = None
+        for i in range(len(path) - 1, 0, -1):
+            node = path[i]
+            if self._values[node] is not None or self._children[node]:
+                break
+            del self._children[path[i - 1]][key[i - 1]]
+        return path
+
+    def __len__(self):
+        return len(self._children)
+
+    def step(self, node, ch):
+        return self._children[node].get(ch, -1)
+
+    def value(self, node):
+        return self._values[node]
+
+    def last_char(self, node):
+        return self._chars[node]
+
+    def children(self, node):
+        return self._children[node].items()
+
+
+class Layout:
+    """A config.csv mapping compiled into a keystroke transducer
+
+    States are automaton nodes, one per buffered prefix. Every keystroke maps
+    (state, char) to (next state, back, text): when back is set the previously
+    emitted unit is erased, then text is emitted as a new unit. This is the
+    exact behaviour of the live IME, precomputed so each key is one lookup.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.outputs = output_alphabet(table)
+        if isinstance(table, PhraseTrie):
+            # Huge phrase tables stay memory-mapped, transitions are computed
+            # straight from the double array instead of being tabulated
+            self.trie = table
+            self.transitions = None
+            self.candidates = None
+            self._candidate_cache = {}
+        else:
+            self.trie = _DictTrie(table)
+            self.transitions = [{} for _ in range(len(self.trie))]
+            self.alphabet = alphabet = {ch for key in table for ch in key}
+            for state in range(len(self.trie)):
+                row = self.transitions[state]
+                for ch in alphabet:
+                    row[ch] = self._transition(state, ch)
+            self.candidates = [self._candidates(state) for state in range(len(self.trie))]
+
+    def patched(self, table, changed):
+        """Layout(table) for a table that differs from ours only in the changed keys
+
+        Only what can see those keys is worked out again: the states they
+        add, the transitions and candidates along each of them, and the
+        columns of characters that became or stopped being an output or
+        the start of a key. Everything else is copied, so the cost follows
+        the number of changes rather than the size of the layout. Layouts
+        over a PhraseTrie are not tabulated and are compiled from scratch.
+        """
+        if self.transitions is None or isinstance(table, PhraseTrie):
+            return Layout(table)
+        layout = Layout.__new__(Layout)
+        layout.table = table
+        layout.outputs = output_alphabet(table)
+        layout.trie = trie = self.trie.copy()
+        size = len(trie)
+        # Removals first, so a branch cut off is not one an addition needs.
+        # Additions go in table order, the order a fresh compile would give
+        # new children, so the strip lists continuations the same way
+        paths = [(key, trie.remove(key)) for key in changed if key not in table]
+        paths += [(key, trie.insert(key, table[key])) for key in table if key in changed]
+
+        added = {ch for key in changed for ch in key} - self.alphabet
+        layout.alphabet = alphabet = self.alphabet | added
+        columns = (self.outputs ^ layout.outputs) | added | {key[0] for key in changed if key}
+        layout.transitions = transitions = [row.copy() for row in self.transitions]
+        transitions += [{} for _ in range(size, len(trie))]
+        for state, row in enumerate(transitions):
+            for ch in (alphabet if state >= size else columns):
+                if ch in alphabet:
+                    row[ch] = layout._transition(state, ch)
+                else:
+                    # No longer a key or output: worked out when typed
+                    row.pop(ch, None)
+        for key, path in paths:
+            for state, ch in zip(path, key):
+                transitions[state][ch] = layout._transition(state, ch)
+
+        layout.candidates = candidates = self.candidates + [None] * (len(trie) - size)
+        for state in {state for _, path in paths for state in path} | set(range(size, len(trie))):
+            candidates[state] = layout._candidates(state)
+        return layout
+
+    def _transition(self, state, ch):
+        """Work out one transition the way SenayGeezIME.process_char does"""
+        trie = self.trie
+        if ch in self.outputs:
+            # Our own output, typed back at us: leave the buffer alone
+            return state, False, ch
+
+        nxt = trie.step(state, ch)
+        if nxt >= 0:
+            value = trie.value(nxt)
+            if value is not None:
+                return nxt, state != ROOT, value
+            return nxt, False, ch
+
+        # Broken sequence: start over from this character alone
+        nxt = trie.step(ROOT, ch)
+        if nxt >= 0:
+            value = trie.value(nxt)
+            return nxt, False, ch if value is None else value
+        return ROOT, False, ch
+
+    def _candidates(self, state):
+        """(keys still to type, output, state) for the nearest completions"""
+        found = []
+        if state == ROOT:
+            return found
+        queue = deque([("", state)])
+        while queue and len(found) < MAX_CANDIDATES:
+            keys, node = queue.popleft()
+            for ch, child in self.trie.children(node):
+                value = self.trie.value(child)
+                if value is not None and len(found) < MAX_CANDIDATES:
+                    found.append((keys + ch, value, child))
+                queue.append((keys + ch, child))
+        return found
+
+    def candidates_at(self, state):
+        """Precomputed continuations of a state, empty at the root"""
+        if self.candidates is not None:
+            return self.candidates[state]
+        found = self._candidate_cache.get(state)
+        if found is None:
+            found = self._candidate_cache[state] = self._candidates(state)
+        return found
+
+    def step(self, state, ch):
+        """Transition for one keystroke"""
+        if self.transitions is None:
+            return self._transition(state, ch)
+        row = self.transitions[state]
+        result = row.get(ch)
+        if result is None:
+            result = row[ch] = self._transition(state, ch)
+        return result
+
+    def transliterate(self, text, state=ROOT):
+        """Convert Latin text exactly as it would appear when typed live"""
+        step = self.step
+        units = []
+        for ch in text:
+            state, back, out = step(state, ch)
+            if back and units:
+                units.pop()
+            units.append(out)
+        return "".join(units)
+
+
+def load_layout(path):
+    """Compile the layout stored in a config.csv style file"""
+    return Layout(load_table(path))
@@ -0,0 +1,125 @@
+import os
+import struct
+import threading
+import zlib
+from array import array
+
+# File layout: header, then depth x width native uint32 counters
+MAGIC = b"SGUC"
+VERSION = 1
+HEADER = struct.Struct("=4sIIII")
+
+DEPTH = 4
+WIDTH = 1 << 15
+# Every this many records all counters are halved, so old habits fade
+DECAY_INTERVAL = 20000
+FLUSH_INTERVAL = 60
+MAX_COUNT = 0xFFFFFFFF
+
+
+class UsageCounts:
+    """Count-min sketch of committed words, fixed size whatever is typed
+
+    record() only bumps a few array cells and is safe on the key path;
+    decay and saving happen on a background thread. Estimates can only
+    overcount, and only when unrelated words collide in every row.
+    """
+
+    def __init__(self, path, depth=DEPTH, width=WIDTH):
+        self.path = path
+        self.depth = depth
+        self.width = width
+        self.counts = array("I", bytes(4 * depth * width))
+        self.since_decay = 0
+        self.dirty = False
+        self._stop = threading.Event()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, depth, width, since_decay = HEADER.unpack(f.read(HEADER.size))
+                if magic != MAGIC or version != VERSION or depth != self.depth or width != self.width:
+                    print(f"Ignoring usage counts in {self.path}: different format")
+                    return
+                counts = array("I")
+                counts.fromfile(f, depth * width)
+            self.counts = counts
+            self.since_decay = since_decay
+        except Exception as e:
+            print(f"Error loading usage counts: {e}")
+
+    def _cells(self, word):
+        # Double hashing: row i uses h1 + i * h2, both computed in C
+        data = word.encode("utf-8")
+        h1 = zlib.crc32(data)
+        h2 = zlib.adler32(data) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def record(self, word):
+        if not word:
+            return
+        counts = self.counts
+        for cell in self._cells(word):
+            if counts[cell] < MAX_COUNT:
+                counts[cell] += 1
+        self.since_decay += 1
+        self.dirty = True
+
+    def estimate(self, word):
+        counts = self.counts
+        return min(counts[cell] for cell in self._cells(word))
+
+    def rank(self, candidates, word=None):
+        """Candidates reordered by usage; ties keep their original order
+
+        word maps a candidate to the word whose count decides its place,
+        for candidates that are not words themselves.
+        """
+        if len(candidates) < 2:
+            return candidates
+        if word is None:
+            return sorted(candidates, key=lambda candidate: -self.estimate(candidate))
+        return sorted(candidates, key=lambda candidate: -self.estimate(word(candidate)))
+
+    def decay(self):
+        # Built aside and swapped in: a record() racing with this is lost,
+        # which an approximate counter can afford
+        self.counts = array("I", [count >> 1 for count in self.counts])
+        self.since_decay = 0
+        self.dirty = True
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        counts = self.counts
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.depth, self.width, self.since_decay))
+            counts.tofile(f)
+        os.replace(tmp_path, self.path)
+
+    def flush(self):
+        """Decay when due and write the counters if anything changed"""
+        if self.since_decay >= DECAY_INTERVAL:
+            self.decay()
+        if self.dirty:
+            self.dirty = False
+            try:
+                self.save()
+            except OSError as e:
+                self.dirty = True
+                print(f"Error saving usage counts: {e}")
+
+    def start(self, interval=FLUSH_INTERVAL):
+        threading.Thread(target=self._run, args=(interval,), daemon=True).start()
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def stop(self):
+        """Stop the flusher and save one last time"""
+        self._stop.set()
+        self.flush()
@@ -0,0 +1,3 @@
+"""Modules both apps use: gemini/ and deepseek/ put the repository root on
+sys.path and import them from here, and their PyInstaller builds add it
+with --paths .."""
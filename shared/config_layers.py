@@ -0,0 +1,145 @@
+import csv
+import os
+import threading
+
+from .phrase_trie import PhraseTrie, build_phrase_trie, load_table
+
+# Beside every layout file: config.csv gets config.user.csv. Upgrades
+# replace the layout file, the user's own file is never shipped
+USER_SUFFIX = ".user"
+
+USER_TEMPLATE = """\
+# Your changes to {name}, kept when Senay Geez is upgraded
+# key,value  adds a key, or replaces what {name} types for it
+# key,       removes a key of {name}
+"""
+
+
+def user_path(path):
+    """config.csv -> config.user.csv"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}{USER_SUFFIX}{ext}"
+
+
+def is_user_file(name):
+    return os.path.splitext(os.path.splitext(name)[0])[1].lower() == USER_SUFFIX
+
+
+def create_user_file(path):
+    """The overlay of a layout file, written with instructions when missing"""
+    overlay = user_path(path)
+    if not os.path.exists(overlay):
+        with open(overlay, "w", encoding="utf-8") as f:
+            f.write(USER_TEMPLATE.format(name=os.path.basename(path)))
+    return overlay
+
+
+def read_overlay(path):
+    """(keys added or replaced, keys removed) from a user file"""
+    changes = {}
+    removed = set()
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].startswith("#"):
+                continue
+            key = row[0].strip()
+            value = row[1].strip()
+            if not key:
+                continue
+            if value:
+                changes[key] = value
+                removed.discard(key)
+            else:
+                removed.add(key)
+                changes.pop(key, None)
+    return changes, removed
+
+
+def _stamp(path):
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+class LayeredLoader:
+    """Compiles a layout file merged with its user overlay, for LayoutProfiles
+
+    compile turns a table into whatever the engine runs on. The layout
+    file is compiled once per version and kept; the overlay is applied
+    on top with patch(compiled, merged table, changed keys), which only
+    redoes what the changed keys touch, so a reload after editing the
+    user file costs about as much as the user file is long. The merged
+    result is kept as well and returned as is until either file changes.
+    Large phrase tables are merged into their own memory-mapped trie,
+    rebuilt only when one of the two files is newer than it.
+    """
+
+    def __init__(self, compile, patch=None):
+        self.compile = compile
+        self.patch = patch
+        self.bases = {}  # Layout file -> (stamp, table, compiled)
+        self.merged = {}  # Layout file -> (stamps, compiled)
+        self.lock = threading.Lock()  # Layouts also compile in the background
+
+    def __call__(self, path):
+        stamps = (_stamp(path), _stamp(user_path(path)))
+        with self.lock:
+            cached = self.merged.get(path)
+            if cached and cached[0] == stamps and cached[1] is not None:
+                return cached[1]
+            try:
+                compiled = self._merge(path, stamps)
+            except Exception:
+                # Not stale again until one of the files is saved
+                self.merged[path] = (stamps, None)
+                raise
+            self.merged[path] = (stamps, compiled)
+            return compiled
+
+    def _merge(self, path, stamps):
+        base = self.bases.get(path)
+        if base is None or base[0] != stamps[0]:
+            table = load_table(path)
+            base = self.bases[path] = (stamps[0], table, self.compile(table))
+        _, table, compiled = base
+        if stamps[1] is None:
+            return compiled
+
+        changes, removed = read_overlay(user_path(path))
+        changed = {key for key, value in changes.items() if table.get(key) != value}
+        changed |= {key for key in removed if key in table}
+        if not changed:
+            return compiled
+        print(f"Applying {len(changed)} changes from {user_path(path)}")
+        if isinstance(table, PhraseTrie):
+            return self.compile(self._merged_trie(path, table, changes, removed))
+        merged = dict(table)
+        merged.update(changes)
+        for key in removed:
+            merged.pop(key, None)
+        if self.patch is None:
+            return self.compile(merged)
+        return self.patch(compiled, merged, changed)
+
+    def _merged_trie(self, path, table, changes, removed):
+        overlay = user_path(path)
+        dat_path = os.path.splitext(overlay)[0] + ".dat"
+        if (not os.path.exists(dat_path)
+                or os.path.getmtime(dat_path) < max(os.path.getmtime(path), os.path.getmtime(overlay))):
+            print(f"Compiling {path} with {overlay}...")
+            merged = dict(table.items())
+            merged.update(changes)
+            for key in removed:
+                merged.pop(key, None)
+            build_phrase_trie(merged, dat_path)
+        return PhraseTrie(dat_path)
+
+    def stale(self, path):
+        """True when the layout file or its overlay changed since it was last compiled,
+        or when a layout file never compiled has turned up"""
+        cached = self.merged.get(path)
+        if cached is None:
+            return os.path.exists(path)
+        return cached[0] != (_stamp(path), _stamp(user_path(path)))
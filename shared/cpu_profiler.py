@@ -0,0 +1,201 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DURATION = 30.0
+INTERVAL = 0.005
+# Dropped next to config.csv to ask a running substituter for a profile
+REQUEST_FILE = "profile.request"
+# Python functions a thread sits in while blocked in C, by module: a
+# sample taken there is waiting time, not work. Waits with no Python
+# frame of their own (time.sleep, the hook message loops) cannot be told
+# apart from running code
+WAITS = {
+    "threading": {"wait", "join", "_wait_for_tstate_lock"},
+    "selectors": {"select"},
+    "tkinter": {"mainloop"},
+}
+# Leaf added to the stack of a sample taken in one of WAITS
+WAITING = "(waiting)"
+
+
+def module_name(path):
+    """Module a code object's file belongs to, a package for its __init__.py"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.basename(os.path.dirname(path)) if name == "__init__" else name
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread from a background thread, for a while
+
+    Nothing is hooked into the interpreter: while no capture runs there is
+    no profiler at all, and during one the other threads only give up
+    the GIL for a moment every interval. When the time is up (or stop()
+    is called) the stacks are written in the folded format flame graph
+    tools read, beside a text summary of the hottest functions.
+
+    Every thread is sampled whether it runs or not, so this is a
+    wall-clock profile. Samples in a known wait (see WAITS) end in a
+    WAITING leaf and are left out of the summary's function tables.
+    """
+
+    def __init__(self, directory, duration=DURATION, interval=INTERVAL):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.profile_path = os.path.join(directory, f"profile-{stamp}.folded")
+        self.summary_path = os.path.join(directory, f"profile-{stamp}.txt")
+        self.duration = duration
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="cpu-profiler", daemon=True)
+        self.thread.start()
+
+    def sample(self, own):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            code = frame.f_code
+            stack = [WAITING] if code.co_name in WAITS.get(module_name(code.co_filename), ()) else []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread {ident}"))
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def _run(self):
+        own = threading.get_ident()
+        self.started = time.perf_counter()
+        deadline = self.started + self.duration
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            self.sample(own)
+            self._stop.wait(self.interval)
+        self.elapsed = time.perf_counter() - self.started
+        try:
+            self.write()
+            print(f"Wall-clock profile saved to {self.summary_path}")
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+
+    def stop(self):
+        """End the capture early, the profile is still written"""
+        self._stop.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def write(self):
+        with open(self.profile_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+        with open(self.summary_path, "w", encoding="utf-8") as f:
+            f.write(summary(self.stacks, self.samples, self.elapsed))
+
+
+def summary(stacks, samples, elapsed=None, top=25):
+    """Text report: samples per thread, then functions by own and total samples
+
+    Samples ending in WAITING only count in the thread table.
+    """
+    threads = Counter()
+    waiting = Counter()
+    own = Counter()
+    total = Counter()
+    for stack, count in stacks.items():
+        threads[stack[0]] += count
+        if stack[-1] == WAITING:
+            waiting[stack[0]] += count
+            continue
+        own[stack[-1]] += count
+        for function in set(stack[1:]):
+            total[function] += count
+    duration = "" if elapsed is None else f" over {elapsed:.1f} s"
+    lines = [f"{samples} samples{duration}, wall clock: every thread is sampled, running or not",
+             f"{sum(waiting.values())} thread samples were in a known wait and are left out of the function tables",
+             "", "Threads (samples, in a known wait):"]
+    lines += [f"  {count:7d}  {waiting[name]:7d}  {name}" for name, count in threads.most_common()]
+    for title, counts in (("Own samples (in the function itself, not in a known wait):", own),
+                          ("Total samples (the function or what it called):", total)):
+        lines += ["", title]
+        lines += [f"  {count:7d}  {count * 100.0 / max(samples, 1):6.1f}%  {function}"
+                  for function, count in counts.most_common(top)]
+    return "\n".join(lines) + "\n"
+
+
+def read_folded(path):
+    stacks = Counter()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[tuple(stack.split(";"))] += int(count)
+    return stacks
+
+
+def request_profile(directory, duration=DURATION):
+    """Ask the substituter running from directory for a profile"""
+    with open(os.path.join(directory, REQUEST_FILE), "w", encoding="utf-8") as f:
+        f.write(f"{duration}\n")
+
+
+def take_request(directory):
+    """Duration of a pending profile request, removing it, or None"""
+    path = os.path.join(directory, REQUEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read().strip()
+        os.remove(path)
+    except OSError:
+        return None
+    try:
+        return float(text) if text else DURATION
+    except ValueError:
+        return DURATION
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a wall-clock profile, or ask a running substituter for one")
+    parser.add_argument("profile", nargs="?", help="a .folded profile")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--request", metavar="DIR", help="folder of the substituter's config.csv")
+    parser.add_argument("--duration", type=float, default=DURATION)
+    args = parser.parse_args()
+
+    if args.request:
+        request_profile(args.request, args.duration)
+        print("Profile requested; it starts with the next keys typed")
+        return
+    if not args.profile:
+        parser.error("a profile or --request is needed")
+    try:
+        stacks = read_folded(args.profile)
+    except (OSError, ValueError) as e:
+        print(f"Error reading profile: {e}")
+        sys.exit(1)
+    # The sample count is not stored; every thread is sampled each time
+    per_thread = Counter()
+    for stack, count in stacks.items():
+        per_thread[stack[0]] += count
+    samples = max(per_thread.values(), default=0)
+    print(summary(stacks, samples, top=args.top), end="")
+
+
+if __name__ == "__main__":
+    main()
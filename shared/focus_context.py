@@ -0,0 +1,136 @@
+import ctypes
+import os
+import sys
+from collections import OrderedDict
+
+# Windows whose typing state is kept; the least recently focused goes first
+CAPACITY = 32
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+
+class FocusProvider:
+    """Says which window keys are going to
+
+    current() returns a hashable identity for the focus target, the
+    same for as long as it keeps focus, and application() the lower case
+    executable name of the program it belongs to. This base class tracks
+    nothing: every key counts as going to one window, as before focus
+    tracking.
+    """
+
+    def current(self):
+        return None
+
+    def application(self):
+        return None
+
+
+class Win32FocusProvider(FocusProvider):
+    """The focused control of the foreground window, so two text boxes
+    in one window are kept apart; one GetGUIThreadInfo call per key"""
+
+    def __init__(self):
+        from ctypes import wintypes
+
+        class GUITHREADINFO(ctypes.Structure):
+            _fields_ = [("cbSize", wintypes.DWORD), ("flags", wintypes.DWORD),
+                        ("hwndActive", wintypes.HWND), ("hwndFocus", wintypes.HWND),
+                        ("hwndCapture", wintypes.HWND), ("hwndMenuOwner", wintypes.HWND),
+                        ("hwndMoveSize", wintypes.HWND), ("hwndCaret", wintypes.HWND),
+                        ("rcCaret", wintypes.RECT)]
+
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.info = GUITHREADINFO(cbSize=ctypes.sizeof(GUITHREADINFO))
+        self.info_ref = ctypes.byref(self.info)
+        self.pid = wintypes.DWORD()
+        self.size = wintypes.DWORD()
+        self.image = ctypes.create_unicode_buffer(260)
+
+    def current(self):
+        if self.user32.GetGUIThreadInfo(0, self.info_ref):
+            target = self.info.hwndFocus or self.info.hwndActive
+            if target:
+                return target
+        return self.user32.GetForegroundWindow() or None
+
+    def application(self):
+        # Only asked on a focus change, never per key
+        self.user32.GetWindowThreadProcessId(self.user32.GetForegroundWindow(), ctypes.byref(self.pid))
+        handle = self.kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, self.pid.value)
+        if not handle:
+            return None
+        try:
+            self.size.value = len(self.image)
+            if self.kernel32.QueryFullProcessImageNameW(handle, 0, self.image, ctypes.byref(self.size)):
+                return os.path.basename(self.image.value).lower()
+        finally:
+            self.kernel32.CloseHandle(handle)
+        return None
+
+
+class FakeFocusProvider(FocusProvider):
+    """Focus moved by hand, for driving the engines without Windows"""
+
+    def __init__(self, target="window", app=None):
+        self.target = target
+        self.app = app
+
+    def focus(self, target, app=None):
+        self.target = target
+        self.app = app
+
+    def current(self):
+        return self.target
+
+    def application(self):
+        return self.app
+
+
+def create_focus_provider():
+    """Focused control on Windows; elsewhere all keys share one context"""
+    if sys.platform == "win32":
+        try:
+            return Win32FocusProvider()
+        except (AttributeError, OSError) as e:
+            print(f"Focus tracking unavailable: {e}")
+    return FocusProvider()
+
+
+class FocusContexts:
+    """Engine state per focus target, in a bounded LRU
+
+    check() asks the provider where keys are going; when that changed,
+    the engine's save_context() result is stored under the window it
+    left and the context of the window it entered is handed to
+    restore_context(), or None for a window not seen yet (or dropped
+    from the cache), which means fresh state. A dict lookup and a move
+    to the end: O(1) per focus change, one provider call per key.
+    """
+
+    def __init__(self, engine, provider=None, capacity=CAPACITY):
+        self.engine = engine
+        self.provider = provider or create_focus_provider()
+        self.capacity = capacity
+        self.contexts = OrderedDict()
+        self.target = self.provider.current()
+        self.switches = 0
+
+    def check(self):
+        """Swap contexts if focus moved since the last key, True when it did"""
+        target = self.provider.current()
+        if target == self.target:
+            return False
+        contexts = self.contexts
+        contexts[self.target] = self.engine.save_context()
+        contexts.move_to_end(self.target)
+        while len(contexts) > self.capacity:
+            contexts.popitem(last=False)
+        self.engine.restore_context(contexts.pop(target, None))
+        self.target = target
+        self.switches += 1
+        return True
+
+    def forget(self):
+        """Drop every stored context, e.g. after the layout changed"""
+        self.contexts.clear()
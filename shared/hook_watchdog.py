@@ -0,0 +1,128 @@
+import time
+from collections import deque
+
+# Windows silently removes a low-level hook whose callback takes longer
+# than LowLevelHooksTimeout (a few hundred ms), so stay well below it
+BUDGET = 0.05
+# This many over-budget callbacks within WINDOW seconds trip pass-through
+STRIKES = 3
+WINDOW = 10.0
+# Seconds of pass-through before processing is tried again
+RECOVERY = 30.0
+
+
+class HookWatchdog:
+    """Times keyboard hook callbacks and falls back to pass-through
+
+    A callback is bracketed by begin() and end(), with mark() after each
+    stage so a slow callback can be blamed on the stage that took longest.
+    Repeatedly going over budget switches to pass-through (no suppression,
+    no substitution) until RECOVERY seconds have passed. The clock and
+    sleep functions can be replaced to drive it with fake slow handlers.
+    """
+
+    def __init__(self, budget=BUDGET, strikes=STRIKES, window=WINDOW, recovery=RECOVERY,
+                 clock=time.perf_counter, sleeper=time.sleep, log=print):
+        self.budget = budget
+        self.strikes = strikes
+        self.window = window
+        self.recovery = recovery
+        self.clock = clock
+        self.sleeper = sleeper
+        self.log = log
+        self.over_budget = deque()
+        self.passthrough_until = None
+        self.trips = 0
+        self.start = None
+        self.last = None
+        self.waited = 0.0
+        self.stages = []
+
+    def active(self):
+        """False while in pass-through; recovers by itself once the time is up"""
+        if self.passthrough_until is None:
+            return True
+        if self.clock() < self.passthrough_until:
+            return False
+        self.passthrough_until = None
+        self.over_budget.clear()
+        self.log("Hook watchdog: resuming normal processing")
+        return True
+
+    def begin(self):
+        self.start = self.last = self.clock()
+        self.waited = 0.0
+        self.stages = []
+
+    def mark(self, stage):
+        """Close the current stage of the callback under this name"""
+        if self.start is None:
+            return
+        now = self.clock()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def sleep(self, seconds):
+        """Deliberate waits (typing delay) do not count against the budget"""
+        before = self.clock()
+        self.sleeper(seconds)
+        spent = self.clock() - before
+        self.waited += spent
+        if self.last is not None:
+            self.last += spent
+
+    def end(self):
+        """Finish a callback, returns its counted duration"""
+        if self.start is None:
+            return 0.0
+        now = self.clock()
+        if now > self.last:
+            self.stages.append(("other", now - self.last))
+        elapsed = now - self.start - self.waited
+        self.start = None
+        if elapsed > self.budget:
+            self._strike(now, elapsed)
+        return elapsed
+
+    def _strike(self, now, elapsed):
+        stage, spent = max(self.stages, key=lambda item: item[1], default=("other", elapsed))
+        self.log(f"Hook watchdog: callback took {elapsed * 1000:.1f} ms "
+                 f"(budget {self.budget * 1000:.0f} ms), slowest stage {stage} {spent * 1000:.1f} ms")
+        self.over_budget.append(now)
+        while self.over_budget and now - self.over_budget[0] > self.window:
+            self.over_budget.popleft()
+        if len(self.over_budget) >= self.strikes:
+            self.trips += 1
+            self.passthrough_until = now + self.recovery
+            self.over_budget.clear()
+            self.log(f"Hook watchdog: switching to pass-through for {self.recovery:.0f} s")
+
+
+def main():
+    """Drive the watchdog with a fake clock and a handler that turns slow"""
+    now = [0.0]
+
+    def clock():
+        return now[0]
+
+    def sleeper(seconds):
+        now[0] += seconds
+
+    watchdog = HookWatchdog(clock=clock, sleeper=sleeper)
+    for key in range(12):
+        now[0] += 1.0
+        if key == 9:
+            now[0] += RECOVERY
+        if not watchdog.active():
+            print(f"key {key}: passed through")
+            continue
+        watchdog.begin()
+        watchdog.sleep(0.04)  # typing delay, not counted
+        now[0] += 0.2 if 2 <= key < 5 else 0.001
+        watchdog.mark("transition")
+        watchdog.end()
+        print(f"key {key}: processed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+
+# File layout: header, then fixed size little-endian records
+MAGIC = b"SGKR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQI")
+# monotonic ns, key, duration us, key kind, event, decision, padding
+RECORD = struct.Struct("<QIIBBBx")
+
+FLAG_PRIVATE = 1
+
+# How the key field is to be read
+KIND_CHAR = 0  # Unicode code point
+KIND_HASHED = 1  # Keyed hash of a printable character or key (privacy mode)
+KIND_NAMED = 2  # Index into NAMED_KEYS
+KIND_VK = 3  # Windows virtual key code
+
+KEY_DOWN = 0
+KEY_UP = 1
+
+# What the engine did with the key
+PASS = 0  # Left alone, reached the application as typed
+REPLACE = 1  # Output was replaced or completed
+CONSUME = 2  # Held back (pre-edit, suppressed) without output yet
+EDIT = 3  # Backspace or similar changed engine state
+INJECTED = 4  # Our own injected output seen by the hook
+PASSTHROUGH = 5  # Hook watchdog tripped, nothing processed
+DISABLED = 6  # Latin mode
+TOGGLE = 7  # Mode switch
+DECISIONS = ("pass", "replace", "consume", "edit", "injected", "passthrough", "disabled", "toggle")
+
+# Names shared by pynput (Key.page_up) and keyboard ('page up') events
+NAMED_KEYS = (
+    "other", "space", "enter", "backspace", "tab", "esc", "shift", "shift_r",
+    "ctrl", "ctrl_l", "ctrl_r", "alt", "alt_l", "alt_r", "alt_gr", "cmd",
+    "caps_lock", "insert", "delete", "home", "end", "page_up", "page_down",
+    "up", "down", "left", "right", "print_screen", "scroll_lock", "pause",
+    "menu", "num_lock", "f1", "f2", "f3", "f4", "f5", "f6", "f7", "f8", "f9",
+    "f10", "f11", "f12",
+)
+_NAME_INDEX = {name: index for index, name in enumerate(NAMED_KEYS)}
+_NAME_INDEX.update({"escape": _NAME_INDEX["esc"], "return": _NAME_INDEX["enter"]})
+
+# Virtual keys that type characters: digits, letters, numpad, punctuation
+PRINTABLE_VKS = frozenset(list(range(0x30, 0x3A)) + list(range(0x41, 0x5B)) +
+                          list(range(0x60, 0x70)) + list(range(0xBA, 0xC1)) + list(range(0xDB, 0xE0)))
+
+CAPACITY = 4096
+FLUSH_INTERVAL = 1.0
+ENV_VAR = "SENAY_GEEZ_RECORD"
+
+
+class KeystrokeRecorder:
+    """Records hook events into a preallocated ring, written out in the background
+
+    record() packs one fixed size record into a bytearray slot and never
+    touches the disk; a daemon thread copies finished slots out and
+    appends them to the file. If the writer falls a whole ring
+    behind, the oldest unwritten records are dropped and counted. In
+    private mode printable keys are stored as a keyed hash whose key is
+    never written, so a recording keeps its rhythm and repetitions but
+    not what was typed.
+    """
+
+    def __init__(self, path, private=True, capacity=CAPACITY, interval=FLUSH_INTERVAL):
+        self.path = path
+        self.private = private
+        self.capacity = capacity
+        self.interval = interval
+        self.ring = bytearray(RECORD.size * capacity)
+        self.head = 0  # Records written into the ring so far
+        self.flushed = 0  # Records copied out of the ring so far
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self._stop = threading.Event()
+        self.secret = os.urandom(16)
+        self.hashes = {}
+        self.file = None
+        self.thread = None
+
+    def start(self):
+        self.file = open(self.path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, FLAG_PRIVATE if self.private else 0,
+                                    time.monotonic_ns(), RECORD.size))
+        self.file.flush()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def encode(self, key):
+        """(kind, value) for a character, key name or virtual key code"""
+        if isinstance(key, int):
+            if self.private and key in PRINTABLE_VKS:
+                return KIND_HASHED, self._hash(key)
+            return KIND_VK, key
+        if len(key) == 1:
+            if self.private and key.isprintable():
+                return KIND_HASHED, self._hash(key)
+            return KIND_CHAR, ord(key)
+        return KIND_NAMED, _NAME_INDEX.get(key.replace(" ", "_").lower(), 0)
+
+    def _hash(self, key):
+        # Stable within one recording only: the key is never written out
+        value = self.hashes.get(key)
+        if value is None:
+            data = key.to_bytes(2, "little") if isinstance(key, int) else key.encode("utf-8")
+            digest = hashlib.blake2s(data, digest_size=4, key=self.secret).digest()
+            value = self.hashes[key] = int.from_bytes(digest, "little")
+        return value
+
+    def record(self, key, decision, started, event=KEY_DOWN):
+        """Add one event; started is time.monotonic_ns() when the hook got it"""
+        kind, value = self.encode(key)
+        spent = (time.monotonic_ns() - started) // 1000
+        with self.lock:
+            slot = self.head % self.capacity
+            RECORD.pack_into(self.ring, slot * RECORD.size, started, value,
+                             min(spent, 0xFFFFFFFF), kind, event, decision)
+            self.head += 1
+            if self.head - self.flushed == self.capacity // 2:
+                self.wake.set()
+
+    def flush(self):
+        """Copy pending records out of the ring and append them to the file"""
+        with self.lock:
+            head = self.head
+            start = self.flushed
+            if head - start > self.capacity:
+                self.dropped += head - start - self.capacity
+                start = head - self.capacity
+            first = start % self.capacity
+            last = head % self.capacity
+            size = RECORD.size
+            if head == start:
+                data = b""
+            elif first < last:
+                data = bytes(self.ring[first * size:last * size])
+            else:
+                data = bytes(self.ring[first * size:]) + bytes(self.ring[:last * size])
+            self.flushed = head
+        if data and self.file:
+            try:
+                self.file.write(data)
+                self.file.flush()
+            except (OSError, ValueError) as e:
+                print(f"Error writing keystroke recording: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+
+    def stop(self):
+        """Write what is left and close the file"""
+        self._stop.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+        if self.file:
+            self.file.close()
+            self.file = None
+        if self.dropped:
+            print(f"Keystroke recorder dropped {self.dropped} events")
+
+
+def recording_path(directory):
+    return os.path.join(directory, time.strftime("keystrokes-%Y%m%d-%H%M%S.sgkr"))
+
+
+def from_environment(directory):
+    """Started recorder when SENAY_GEEZ_RECORD is set (1/private or plain), else None"""
+    mode = os.environ.get(ENV_VAR, "").lower()
+    if mode in ("", "0", "off"):
+        return None
+    recorder = KeystrokeRecorder(recording_path(directory), private=mode != "plain")
+    try:
+        recorder.start()
+    except OSError as e:
+        print(f"Error starting keystroke recorder: {e}")
+        return None
+    print(f"Recording keystrokes to {recorder.path}")
+    return recorder
+
+
+def read_recording(path):
+    """Header dict and a list of records as dicts, times in seconds from the start"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, flags, origin, size = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+        raise ValueError(f"{path} is not a keystroke recording")
+    header = {"private": bool(flags & FLAG_PRIVATE), "version": version}
+    records = []
+    end = HEADER.size + (len(data) - HEADER.size) // size * size
+    for started, value, spent, kind, event, decision in RECORD.iter_unpack(data[HEADER.size:end]):
+        records.append({
+            "time": (started - origin) / 1e9,
+            "key": describe_key(kind, value),
+            "char": chr(value) if kind == KIND_CHAR else None,
+            "kind": kind,
+            "value": value,
+            "event": "up" if event == KEY_UP else "down",
+            "decision": DECISIONS[decision] if decision < len(DECISIONS) else str(decision),
+            "duration_ms": spent / 1000.0,
+        })
+    return header, records
+
+
+def describe_key(kind, value):
+    if kind == KIND_CHAR:
+        return repr(chr(value))
+    if kind == KIND_HASHED:
+        return f"#{value:08x}"
+    if kind == KIND_NAMED:
+        return NAMED_KEYS[value] if value < len(NAMED_KEYS) else "other"
+    return f"vk{value}"
+
+
+def replay_keys(records):
+    """(delay, char) pairs of the key-down characters for replaying a timeline
+
+    Hashed keys come back as None: private recordings keep the timing
+    and the engine decisions, not the text.
+    """
+    keys = []
+    previous = None
+    for record in records:
+        if record["event"] != "down" or record["decision"] == "injected":
+            continue
+        if record["kind"] == KIND_NAMED:
+            char = {"space": " ", "enter": "\n", "backspace": "\b", "tab": "\t"}.get(record["key"])
+            if char is None:
+                continue
+        else:
+            char = record["char"]
+        # Delays run from the last kept key, so the timeline keeps its length
+        keys.append((0.0 if previous is None else record["time"] - previous, char))
+        previous = record["time"]
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show a keystroke recording")
+    parser.add_argument("recording")
+    parser.add_argument("--timeline", action="store_true", help="list every event")
+    args = parser.parse_args()
+
+    try:
+        header, records = read_recording(args.recording)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Error reading recording: {e}")
+        sys.exit(1)
+
+    if args.timeline:
+        for record in records:
+            print(f"{record['time']:10.3f}  {record['event']:4}  {record['key']:12}  "
+                  f"{record['decision']:11}  {record['duration_ms']:7.3f} ms")
+
+    print(f"{len(records)} events, {'private' if header['private'] else 'plain'} keys")
+    if not records:
+        return
+    print(f"Duration: {records[-1]['time'] - records[0]['time']:.1f} s")
+    for decision, count in Counter(record["decision"] for record in records).most_common():
+        print(f"  {decision}: {count}")
+    durations = sorted(record["duration_ms"] for record in records)
+    print(f"Hook time: median {durations[len(durations) // 2]:.3f} ms, "
+          f"p99 {durations[int(len(durations) * 0.99)]:.3f} ms, max {durations[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import threading
+
+from .config_layers import is_user_file
+
+# Extra layouts live in this folder beside config.csv, one CSV each, named
+# after the file: layouts/tigrinya.csv is the "tigrinya" layout, with the
+# user's changes in layouts/tigrinya.user.csv
+LAYOUT_DIR = "layouts"
+# In LAYOUT_DIR: application,layout lines, e.g. winword.exe,geez
+APPS_FILE = "apps.csv"
+# config.csv itself
+DEFAULT = "default"
+# Dropped next to config.csv to switch a running substituter's layout
+REQUEST_FILE = "layout.request"
+
+
+def find_layouts(config_path):
+    """Layout name -> file, config.csv first as DEFAULT"""
+    paths = {DEFAULT: config_path}
+    directory = os.path.join(os.path.dirname(config_path), LAYOUT_DIR)
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(name)
+            if (ext.lower() == ".csv" and name.lower() != APPS_FILE and stem.lower() != DEFAULT
+                    and not is_user_file(name)):
+                paths[stem.lower()] = os.path.join(directory, name)
+    return paths
+
+
+def read_app_defaults(config_path):
+    """Application executable (lower case) -> layout name"""
+    defaults = {}
+    path = os.path.join(os.path.dirname(config_path), LAYOUT_DIR, APPS_FILE)
+    if not os.path.exists(path):
+        return defaults
+    try:
+        with open(path, encoding="utf-8-sig") as f:
+            for line in f:
+                app, _, name = line.strip().partition(",")
+                if app and name and not app.startswith("#"):
+                    defaults[app.strip().lower()] = name.strip().lower()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"Error reading {path}: {e}")
+    return defaults
+
+
+class LayoutProfiles:
+    """Every layout file compiled once, so switching is a dict lookup
+
+    load() compiles config.csv (and the layout in use) right away, as
+    the engines always did, and the other layouts on a background
+    thread. compile is the engine's own loader (path -> compiled
+    layout). A layout still compiling, or one that failed, is simply
+    not available yet: get() returns None and the caller keeps the
+    layout it has.
+    """
+
+    def __init__(self, config_path, compile):
+        self.config_path = config_path
+        self.compile = compile
+        self.paths = find_layouts(config_path)
+        self.app_defaults = read_app_defaults(config_path)
+        self.compiled = {}
+        self.ready = threading.Event()
+
+    @property
+    def names(self):
+        return list(self.paths)
+
+    def load(self, active=DEFAULT):
+        """Compile config.csv and the active layout now, the rest in the background"""
+        self.compiled[DEFAULT] = self.compile(self.config_path)
+        if active in self.paths and active not in self.compiled:
+            try:
+                self.compiled[active] = self.compile(self.paths[active])
+            except Exception as e:
+                print(f"Error loading layout {active}: {e}")
+        if len(self.compiled) < len(self.paths):
+            threading.Thread(target=self._compile_rest, daemon=True).start()
+        else:
+            self.ready.set()
+
+    def _compile_rest(self):
+        for name, path in self.paths.items():
+            if name in self.compiled:
+                continue
+            try:
+                self.compiled[name] = self.compile(path)
+            except Exception as e:
+                print(f"Error loading layout {name}: {e}")
+        print(f"Layouts ready: {', '.join(name for name in self.paths if name in self.compiled)}")
+        self.ready.set()
+
+    def get(self, name):
+        return self.compiled.get(name)
+
+    def next_name(self, current):
+        """The next available layout after current, wrapping around"""
+        names = [name for name in self.paths if name in self.compiled]
+        if current not in names:
+            return names[0] if names else None
+        return names[(names.index(current) + 1) % len(names)]
+
+    def for_application(self, app):
+        """Layout the user set for this application, if it is available"""
+        if not app:
+            return None
+        name = self.app_defaults.get(app.lower())
+        return name if name in self.compiled else None
+
+
+def request_layout(directory, name):
+    """Ask the substituter running from directory to switch layout"""
+    with open(os.path.join(directory, REQUEST_FILE), "w", encoding="utf-8") as f:
+        f.write(f"{name}\n")
+
+
+def take_request(directory):
+    """Layout name of a pending switch request, removing it, or None"""
+    path = os.path.join(directory, REQUEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            name = f.read().strip().lower()
+        os.remove(path)
+    except OSError:
+        return None
+    return name or None
@@ -0,0 +1,380 @@
+import array
+import csv
+import mmap
+import os
+import struct
+import sys
+
+# Compiled table layout (native byte order, 4 byte cells):
+#   header   magic, version, cells, alphabet size, keys, strings, pool bytes
+#   alphabet code point of every label, label id = index + 1
+#   base     double-array base per cell
+#   check    parent cell per cell, -1 for free cells
+#   value    string pool index per cell, -1 for non-terminal cells
+#   offsets  start of every pool string plus the end offset
+#   pool     utf-8 bytes of all distinct outputs
+MAGIC = b"SGDA"
+VERSION = 1
+HEADER = struct.Struct("=4sIIIIII")
+
+# Tables smaller than this are cheaper to keep as a plain dict
+TRIE_THRESHOLD = 256 * 1024
+
+
+def read_table(path):
+    """Read latin,ethiopic rows from a config.csv style file into a dict"""
+    table = {}
+    with open(path, "r", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) >= 2:
+                key = row[0].strip()
+                value = row[1].strip()
+                if key:
+                    table[key] = value
+    return table
+
+
+def build_phrase_trie(table, path):
+    """Compile a key -> output mapping into a double-array trie file"""
+    alphabet = sorted({ch for key in table for ch in key})
+    labels = {ch: i + 1 for i, ch in enumerate(alphabet)}
+
+    # Plain nested trie first: children dict and output per node
+    children = [{}]
+    outputs = [None]
+    for key, value in table.items():
+        node = 0
+        for ch in key:
+            label = labels[ch]
+            nxt = children[node].get(label)
+            if nxt is None:
+                nxt = len(children)
+                children.append({})
+                outputs.append(None)
+                children[node][label] = nxt
+            node = nxt
+        outputs[node] = value
+
+    # Shared string pool, identical outputs are stored once
+    pool_index = {}
+    offsets = [0]
+    pool = bytearray()
+    for value in outputs:
+        if value is not None and value not in pool_index:
+            pool_index[value] = len(offsets) - 1
+            pool += value.encode("utf-8")
+            offsets.append(len(pool))
+
+    base = [0]
+    check = [-2]
+    cell_value = [-1]
+    cell_of = {0: 0}
+
+    # Free cells form a doubly linked list so placement never rescans used
+    # cells; cells that keep failing as a first position leave the scan
+    next_free = [-1]
+    prev_free = [-1]
+    failures = [0]
+    listed = bytearray(1)
+    head = -1
+    tail = -1
+
+    def grow(size):
+        nonlocal head, tail
+        while len(check) < size:
+            cell = len(check)
+            base.append(0)
+            check.append(-1)
+            cell_value.append(-1)
+            next_free.append(-1)
+            prev_free.append(tail)
+            failures.append(0)
+            listed.append(1)
+            if tail < 0:
+                head = cell
+            else:
+                next_free[tail] = cell
+            tail = cell
+
+    def unlink(cell):
+        nonlocal head, tail
+        if not listed[cell]:
+            return
+        listed[cell] = 0
+        before, after = prev_free[cell], next_free[cell]
+        if before < 0:
+            head = after
+        else:
+            next_free[before] = after
+        if after < 0:
+            tail = before
+        else:
+            prev_free[after] = before
+
+    queue = [0]
+    for node in queue:
+        cell = cell_of[node]
+        if outputs[node] is not None:
+            cell_value[cell] = pool_index[outputs[node]]
+        kids = sorted(children[node].items())
+        if not kids:
+            continue
+
+        # Find the first base where every child label lands on a free cell
+        first_label = kids[0][0]
+        pos = head
+        while True:
+            if pos < 0:
+                pos = len(check)
+                grow(pos + first_label + 1)
+                continue
+            b = pos - first_label
+            if b >= 1:
+                grow(b + kids[-1][0] + 1)
+                if all(check[b + label] == -1 for label, _ in kids):
+                    break
+                failures[pos] += 1
+                if failures[pos] > 16:
+                    following = next_free[pos]
+                    unlink(pos)
+                    pos = following
+                    continue
+            pos = next_free[pos]
+
+        base[cell] = b
+        for label, child in kids:
+            check[b + label] = cell
+            cell_of[child] = b + label
+            unlink(b + label)
+            queue.append(child)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(check), len(alphabet), len(table),
+                            len(offsets) - 1, len(pool)))
+        array.array("i", [ord(ch) for ch in alphabet]).tofile(f)
+        array.array("i", base).tofile(f)
+        array.array("i", check).tofile(f)
+        array.array("i", cell_value).tofile(f)
+        array.array("I", offsets).tofile(f)
+        f.write(pool)
+    try:
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # Another process still has the old table mapped (Windows)
+        print(f"Could not replace {path}: {e}")
+        return tmp_path
+    return path
+
+
+class PhraseTrie:
+    """Read-only mapping over a memory-mapped double-array trie file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, cells, n_alpha, keys, strings, pool_bytes = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a compiled phrase table")
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+
+        def section(count, fmt):
+            nonlocal offset
+            part = view[offset:offset + count * 4].cast(fmt)
+            offset += count * 4
+            return part
+
+        alphabet = section(n_alpha, "i")
+        self._labels = {chr(cp): i + 1 for i, cp in enumerate(alphabet)}
+        self._chars = [""] + [chr(cp) for cp in alphabet]
+        alphabet.release()
+        self._base = section(cells, "i")
+        self._check = section(cells, "i")
+        self._value = section(cells, "i")
+        self._offsets = section(strings + 1, "I")
+        self._pool = view[offset:offset + pool_bytes]
+        self._cells = cells
+        self._keys = keys
+        self.root = 0
+
+    def close(self):
+        """Release the mapped file"""
+        for part in (self._base, self._check, self._value, self._offsets, self._pool):
+            part.release()
+        self._mm.close()
+
+    # --- Automaton access ---
+    def step(self, node, ch):
+        """Follow one character from node, returns -1 when there is no edge"""
+        label = self._labels.get(ch)
+        if label is None or node < 0:
+            return -1
+        cell = self._base[node] + label
+        if cell < self._cells and self._check[cell] == node:
+            return cell
+        return -1
+
+    def walk(self, text, node=0):
+        """Follow every character of text from node"""
+        for ch in text:
+            node = self.step(node, ch)
+            if node < 0:
+                return -1
+        return node
+
+    def value(self, node):
+        """Output stored at node, or None for non-terminal nodes"""
+        index = self._value[node]
+        if index < 0:
+            return None
+        return bytes(self._pool[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+    def last_char(self, node):
+        """Character on the edge leading into node"""
+        parent = self._check[node]
+        return self._chars[node - self._base[parent]]
+
+    def children(self, node):
+        """(character, node) pairs for every edge leaving node"""
+        base = self._base[node]
+        for label in range(1, len(self._chars)):
+            cell = base + label
+            if 0 < cell < self._cells and self._check[cell] == node:
+                yield self._chars[label], cell
+
+    # --- Mapping interface used by the engines ---
+    def get(self, key, default=None):
+        node = self.walk(key)
+        if node < 0:
+            return default
+        value = self.value(node)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        node = self.walk(key)
+        return node >= 0 and self._value[node] >= 0
+
+    def __len__(self):
+        return self._keys
+
+    def has_prefix(self, prefix):
+        """True when some key starts with prefix"""
+        return self.walk(prefix) >= 0
+
+    def items(self):
+        stack = [("", self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            value = self.value(node)
+            if value is not None:
+                yield prefix, value
+            for ch, child in self.children(node):
+                stack.append((prefix + ch, child))
+
+    def keys(self):
+        return (key for key, _ in self.items())
+
+    def values(self):
+        return (value for _, value in self.items())
+
+    __iter__ = keys
+
+    def output_alphabet(self):
+        """Every character that can appear in an output"""
+        return set(bytes(self._pool).decode("utf-8"))
+
+
+def load_table(csv_path, threshold=TRIE_THRESHOLD):
+    """Load a substitution table, memory-mapping a compiled trie for large files"""
+    if os.path.getsize(csv_path) < threshold:
+        return read_table(csv_path)
+
+    dat_path = os.path.splitext(csv_path)[0] + ".dat"
+    if not os.path.exists(dat_path) or os.path.getmtime(dat_path) < os.path.getmtime(csv_path):
+        print(f"Compiling {csv_path}...")
+        dat_path = build_phrase_trie(read_table(csv_path), dat_path)
+    return PhraseTrie(dat_path)
+
+
+def output_alphabet(table):
+    """Characters the engines themselves type for a dict or compiled table"""
+    if isinstance(table, PhraseTrie):
+        return table.output_alphabet()
+    return set("".join(table.values()))
+
+
+def prefix_lookup(table):
+    """Return a callable answering 'does any key start with this'"""
+    if isinstance(table, PhraseTrie):
+        return table.has_prefix
+    prefixes = set()
+    for key in table:
+        for i in range(1, len(key) + 1):
+            prefixes.add(key[:i])
+    return prefixes.__contains__
+
+
+def extension_lookup(table):
+    """Return a callable answering 'is this a proper prefix of some longer key'"""
+    if isinstance(table, PhraseTrie):
+        def extendable(text):
+            node = table.walk(text)
+            return node >= 0 and next(iter(table.children(node)), None) is not None
+        return extendable
+    # Proper prefix -> number of keys extending it, so keys can be taken out again
+    prefixes = {}
+    for key in table:
+        for i in range(1, len(key)):
+            prefix = key[:i]
+            prefixes[prefix] = prefixes.get(prefix, 0) + 1
+    return prefixes.__contains__
+
+
+def patch_extension_lookup(lookup, added, removed):
+    """extension_lookup of a dict table after adding and removing keys
+
+    Only the prefixes of those keys are counted again; lookup itself is
+    left as it was.
+    """
+    prefixes = dict(lookup.__self__)
+    for key in added:
+        for i in range(1, len(key)):
+            prefix = key[:i]
+            prefixes[prefix] = prefixes.get(prefix, 0) + 1
+    for key in removed:
+        for i in range(1, len(key)):
+            prefix = key[:i]
+            count = prefixes.get(prefix, 0) - 1
+            if count > 0:
+                prefixes[prefix] = count
+            else:
+                prefixes.pop(prefix, None)
+    return prefixes.__contains__
+
+
+def main():
+    """Compile a table ahead of time: python -m shared.phrase_trie phrases.csv [phrases.dat]"""
+    if len(sys.argv) < 2:
+        print("Usage: python -m shared.phrase_trie table.csv [table.dat]")
+        return
+    csv_path = sys.argv[1]
+    dat_path = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(csv_path)[0] + ".dat"
+    table = read_table(csv_path)
+    build_phrase_trie(table, dat_path)
+    print(f"Compiled {len(table)} entries into {dat_path} ({os.path.getsize(dat_path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
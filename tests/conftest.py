@@ -0,0 +1,87 @@
+import importlib
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEMINI = os.path.join(ROOT, "gemini")
+CONFIG = os.path.join(GEMINI, "config.csv")
+
+DEEPSEEK = os.path.join(ROOT, "deepseek")
+BENCHMARKS = os.path.join(ROOT, "benchmarks")
+
+# shared/ from the root, the gemini modules and the benchmark fakes by
+# their plain names
+sys.path.insert(0, BENCHMARKS)
+sys.path.insert(0, GEMINI)
+sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def relay():
+    """The headless fakes in benchmarks/, installed once; engine output goes to relay.target"""
+    import fakes
+    return fakes.install()
+
+
+@pytest.fixture(scope="session")
+def ethiopic_ime(relay):
+    """The gemini IME module, imported over the fakes"""
+    import ethiopic_ime
+    return ethiopic_ime
+
+
+@pytest.fixture(scope="session")
+def deepseek(relay):
+    """The deepseek modules by name, imported aside: gemini has an injection module too"""
+    names = ("injection", "typing_rhythm", "text_substituter", "senay_geez")
+    saved = {name: sys.modules.pop(name) for name in names if name in sys.modules}
+    sys.path.insert(0, DEEPSEEK)
+    try:
+        return types.SimpleNamespace(**{name: importlib.import_module(name) for name in names})
+    finally:
+        sys.path.remove(DEEPSEEK)
+        for name in names:
+            sys.modules.pop(name, None)
+        sys.modules.update(saved)
+
+
+class RecordingInjector:
+    """Injector stand-in keeping (text, backspaces) and ("key", vk) sends"""
+
+    def __init__(self, tagged=True):
+        self.tagged = tagged
+        self.sent = []
+
+    def send(self, text, backspaces=0):
+        self.sent.append((text, backspaces))
+
+    def send_key(self, vk, extended=False):
+        self.sent.append(("key", vk))
+
+
+@pytest.fixture
+def ime(ethiopic_ime, tmp_path):
+    """SenayGeezIME on config.csv with tagged output recorded, composition off"""
+    import tkinter
+    ime = ethiopic_ime.SenayGeezIME(tkinter.Tk())
+    ime.usage.path = str(tmp_path / "usage.bin")
+    ime.watchdog = ethiopic_ime.HookWatchdog(sleeper=lambda seconds: None, log=lambda message: None)
+    ime.injector = RecordingInjector()
+    return ime
+
+
+@pytest.fixture
+def keys(ethiopic_ime, monkeypatch):
+    """Hook events for filter_key, with the key state GetKeyState would report"""
+    held = {"modifiers": False}
+    monkeypatch.setattr(ethiopic_ime, "modifiers_down", lambda: held["modifiers"])
+    monkeypatch.setattr(ethiopic_ime, "vk_to_char",
+                        lambda vk: None if held["modifiers"] or not 0x41 <= vk <= 0x5A else chr(vk).lower())
+
+    def press(vk):
+        return types.SimpleNamespace(vkCode=vk, dwExtraInfo=0, flags=0)
+    press.held = held
+    return press
@@ -0,0 +1,122 @@
+import itertools
+import os
+import random
+import shutil
+
+import pytest
+
+from conftest import CONFIG
+from shared.config_layers import LayeredLoader, create_user_file, read_overlay, user_path
+from shared.phrase_trie import read_table
+from transliterator import ROOT, Layout
+
+
+SAVES = itertools.count(1)
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = str(tmp_path / "config.csv")
+    shutil.copy(CONFIG, path)
+    return path
+
+
+def write_overlay(config, lines):
+    """Save config.user.csv with a new modification time, as an editor would"""
+    path = user_path(config)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    stamp = os.path.getmtime(config) + next(SAVES)
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def merged_table(config):
+    table = read_table(config)
+    changes, removed = read_overlay(user_path(config))
+    table.update(changes)
+    for key in removed:
+        table.pop(key, None)
+    return table
+
+
+def assert_same_layout(ours, fresh, rng):
+    keys = list(fresh.table)
+    for _ in range(200):
+        text = " ".join(rng.choice(keys) + rng.choice(keys) for _ in range(5))
+        assert ours.transliterate(text) == fresh.transliterate(text)
+    for prefix in sorted({key[:i] for key in keys for i in range(1, len(key))}):
+        a, b = ROOT, ROOT
+        for ch in prefix:
+            a, b = ours.step(a, ch)[0], fresh.step(b, ch)[0]
+        assert [item[:2] for item in ours.candidates_at(a)] == [item[:2] for item in fresh.candidates_at(b)]
+
+
+def test_without_overlay_the_layout_file_is_used_as_is(config):
+    loader = LayeredLoader(Layout, Layout.patched)
+    assert loader(config).table == read_table(config)
+    create_user_file(config)  # Only instructions so far
+    assert read_overlay(user_path(config)) == ({}, set())
+    assert loader(config).table == read_table(config)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_overlay_patch_matches_a_fresh_compile(config, seed):
+    rng = random.Random(seed)
+    base = read_table(config)
+    keys = sorted(base)
+    lines = ["# my changes"]
+    lines += [f"{key},{rng.choice(list(base.values()))}" for key in rng.sample(keys, 5)]
+    lines += [f"{key}," for key in rng.sample(keys, 5)]
+    lines += ["zz,ዝዝ", "hq,ሀቅ"]
+    write_overlay(config, lines)
+
+    loader = LayeredLoader(Layout, Layout.patched)
+    patched = loader(config)
+    fresh = Layout(merged_table(config))
+    assert patched.table == fresh.table
+    assert_same_layout(patched, fresh, rng)
+
+
+def test_overlay_removes_and_restores_keys(config):
+    loader = LayeredLoader(Layout, Layout.patched)
+    assert loader(config).transliterate("hu") == "ሁ"
+
+    write_overlay(config, ["hu,"])
+    assert loader.stale(config)
+    layout = loader(config)
+    assert "hu" not in layout.table
+    assert layout.transliterate("hu") == "ሀኡ"  # h and u each on their own
+
+    # A later line wins over an earlier removal
+    write_overlay(config, ["hu,", "hu,ሁሁ"])
+    assert loader(config).transliterate("hu") == "ሁሁ"
+    os.remove(user_path(config))
+    assert loader(config).transliterate("hu") == "ሁ"
+
+
+def test_only_the_overlay_is_redone_after_an_edit(config):
+    compiled = []
+
+    def compile(table):
+        compiled.append(len(table))
+        return Layout(table)
+    loader = LayeredLoader(compile, Layout.patched)
+    first = loader(config)
+    assert loader(config) is first and not loader.stale(config)
+
+    write_overlay(config, ["hu,ሑ"])
+    assert loader(config).transliterate("hu") == "ሑ"
+    write_overlay(config, ["hu,ሒ"])
+    assert loader(config).transliterate("hu") == "ሒ"
+    assert len(compiled) == 1  # The layout file itself, once
+
+
+def test_substituter_tables_layer_the_same_way(deepseek, config):
+    module = deepseek.text_substituter
+    write_overlay(config, ["hu,", "hq,ሀቅ", "h,ኸ"])
+    table, extendable = LayeredLoader(module.compile_substitutions, module.patch_substitutions)(config)
+    fresh_table, fresh_extendable = module.compile_substitutions(merged_table(config))
+    assert table == fresh_table
+    for prefix in {key[:i] for key in set(table) | {"hu", "hq"} for i in range(1, len(key) + 1)}:
+        assert extendable(prefix) == fresh_extendable(prefix), prefix
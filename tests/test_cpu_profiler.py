@@ -0,0 +1,32 @@
+import threading
+import time
+
+from shared.cpu_profiler import SamplingProfiler, WAITING, summary
+
+
+def test_blocked_threads_are_labelled_and_left_out(tmp_path):
+    done = threading.Event()
+
+    def busy():
+        while not done.is_set():
+            sum(range(1000))
+
+    waiter = threading.Thread(target=done.wait, name="waiter")
+    worker = threading.Thread(target=busy, name="worker")
+    waiter.start()
+    worker.start()
+    profiler = SamplingProfiler(str(tmp_path))
+    own = threading.get_ident()
+    for _ in range(20):
+        profiler.sample(own)
+        time.sleep(0.001)
+    done.set()
+    waiter.join()
+    worker.join()
+
+    waits = {stack[0] for stack in profiler.stacks if stack[-1] == WAITING}
+    assert "waiter" in waits and "worker" not in waits
+    report = summary(profiler.stacks, profiler.samples)
+    assert "wall clock" in report
+    tables = report.split("Own samples")[1]
+    assert "busy" in tables and WAITING not in tables
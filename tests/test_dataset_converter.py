@@ -0,0 +1,99 @@
+import io
+import json
+import random
+
+import pytest
+
+from conftest import CONFIG
+from dataset_converter import (CsvJob, FieldConverter, JsonlJob, _parse_spans, convert_stream, read_records,
+                               resolve_columns)
+from transliterator import load_layout
+
+
+@pytest.fixture(scope="module")
+def layout():
+    return load_layout(CONFIG)
+
+
+@pytest.fixture(scope="module")
+def converter(layout):
+    return FieldConverter(layout)
+
+
+def run_csv(converter, text, names, delimiter=","):
+    records = list(read_records(io.StringIO(text, newline="")))
+    header, rows = records[0], records[1:]
+    job = CsvJob(delimiter, resolve_columns(header, names, delimiter))
+    return header + job.run(converter, rows)
+
+
+def test_csv_rewrites_selected_columns_in_place(converter, layout):
+    text = ('id,name,note\r\n'
+            '1,selam,"keep, this"\r\n'
+            '2,"hu, ""ber""\nsecond line",x\r\n'
+            '3,,"selam"\r\n')
+    output = run_csv(converter, text, ["name"])
+    t = layout.transliterate
+    assert output == ('id,name,note\r\n'
+                      f'1,{t("selam")},"keep, this"\r\n'
+                      f'2,"{t("hu, ")}""{t("ber")}""{t(chr(10) + "second line")}",x\r\n'
+                      '3,,"selam"\r\n')
+
+
+def test_tsv_and_index_columns(converter, layout):
+    output = run_csv(converter, "a\tb\nselam\thu\n", ["1"], delimiter="\t")
+    assert output == f"a\tb\nselam\t{layout.transliterate('hu')}\n"
+
+
+def test_malformed_csv_record_passes_through(converter):
+    job = CsvJob(",", [0])
+    assert job.run(converter, ['"selam"x,hu\n']) == '"selam"x,hu\n'
+
+
+def test_unknown_column_is_reported():
+    with pytest.raises(ValueError):
+        resolve_columns("a,b\n", ["c"], ",")
+
+
+def test_jsonl_splices_converted_values_only(converter, layout):
+    line = '{"n": 1e5, "title": "selam", "tags": ["hu", 3, "ber"], "note": "caf\\u00e9 selam",  "meta": {"x": "hu"}}\n'
+    output = JsonlJob(["title", "tags[]", "meta.x"]).run(converter, [line])
+    t = layout.transliterate
+    assert output == ('{"n": 1e5, "title": "' + t("selam") + '", "tags": ["' + t("hu") + '", 3, "' + t("ber") +
+                      '"], "note": "caf\\u00e9 selam",  "meta": {"x": "' + t("hu") + '"}}\n')
+    assert json.loads(output)["note"] == "café selam"
+
+
+def test_jsonl_keeps_untouched_and_malformed_lines(converter, capsys):
+    lines = ['{"title": 5}\n', '{"title": "selam"\n', "\n", '{"other": "selam"}\n']
+    assert JsonlJob(["title"]).run(converter, lines) == "".join(lines)
+    assert "Malformed JSON line" in capsys.readouterr().out
+
+
+def random_json(rng, depth=0):
+    roll = rng.random()
+    if depth > 3 or roll < 0.4:
+        return rng.choice([rng.randint(-999, 999), rng.random() * 1e6, True, None, "selam",
+                           "a\"b\\cሀ\n", ""])
+    if roll < 0.7:
+        return [random_json(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{i}": random_json(rng, depth + 1) for i in range(rng.randint(0, 4))}
+
+
+def test_span_parser_agrees_with_json(converter):
+    rng = random.Random(3)
+    for _ in range(300):
+        value = random_json(rng)
+        line = json.dumps(value, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 1]))
+        parsed, end = _parse_spans(line)
+        assert parsed == value and end == len(line)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_stream_matches_one_batch(converter, workers):
+    lines = [json.dumps({"title": word, "n": index}) + "\n"
+             for index, word in enumerate(["selam", "hu", "ber"] * 20)]
+    job = JsonlJob(["title"])
+    dst = io.StringIO()
+    convert_stream(lines, dst, job, CONFIG, workers=workers, batch_size=7)
+    assert dst.getvalue() == job.run(converter, lines)
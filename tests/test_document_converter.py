@@ -0,0 +1,95 @@
+import io
+import zipfile
+
+import pytest
+
+from conftest import CONFIG
+from document_converter import TextConverter, _HtmlRewriter, convert_document
+from transliterator import load_layout
+
+HTML = """<!DOCTYPE html>
+<HTML><Body Class="x">
+<!-- selam stays -->
+<P>selam &amp; hu&#32;ber</P >
+<p>see https://selam.example/hu and hu@selam.org</P>
+<PRE>selam</PRE><br/><Code>hu</CODE>
+<?pi selam?></body></html>
+"""
+
+
+@pytest.fixture(scope="module")
+def converter():
+    return TextConverter(load_layout(CONFIG))
+
+
+def rewrite(converter, html, piece):
+    out = io.StringIO()
+    rewriter = _HtmlRewriter(out, converter)
+    for start in range(0, len(html), piece):
+        rewriter.feed(html[start:start + piece])
+    rewriter.close()
+    return out.getvalue()
+
+
+def test_html_converts_prose_and_copies_markup(converter):
+    layout = converter.layout
+    output = rewrite(converter, HTML, len(HTML))
+    assert f"<P>{layout.transliterate('selam ')}&amp;{layout.transliterate(' hu')}&#32;" \
+           f"{layout.transliterate('ber')}</P >" in output
+    assert "https://selam.example/hu" in output and "hu@selam.org" in output
+    assert "<PRE>selam</PRE><br/><Code>hu</CODE>" in output
+    assert "<!-- selam stays -->" in output and "<?pi selam?>" in output
+    assert '<!DOCTYPE html>\n<HTML><Body Class="x">' in output
+
+
+@pytest.mark.parametrize("piece", [1, 2, 3, 5, 7, 64])
+def test_html_output_does_not_depend_on_feed_size(converter, piece):
+    assert rewrite(converter, HTML, piece) == rewrite(converter, HTML, len(HTML))
+
+
+def write_package(path, entries):
+    with zipfile.ZipFile(path, "w") as package:
+        for name, data in entries.items():
+            package.writestr(name, data)
+
+
+def read_package(path):
+    with zipfile.ZipFile(path) as package:
+        return {name: package.read(name) for name in package.namelist()}
+
+
+def test_docx_converts_text_runs_only(converter, tmp_path):
+    document = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<w:document xmlns:w="urn:w"><w:body><w:p>'
+                '<w:r><w:t>selam</w:t></w:r>'
+                '<w:r><w:rPr><w:rStyle w:val="Code"/></w:rPr><w:t>hu</w:t></w:r>'
+                '<w:r><w:instrText>selam</w:instrText></w:r>'
+                '</w:p></w:body></w:document>')
+    source, target = tmp_path / "in.docx", tmp_path / "out.docx"
+    write_package(source, {"word/document.xml": document, "word/media/image1.png": b"\x89PNG selam"})
+    convert_document(str(source), str(target), converter)
+    entries = read_package(target)
+    xml = entries["word/document.xml"].decode("utf-8")
+    assert f"<w:t>{converter.layout.transliterate('selam')}</w:t>" in xml
+    assert "<w:t>hu</w:t>" in xml and "<w:instrText>selam</w:instrText>" in xml
+    assert entries["word/media/image1.png"] == b"\x89PNG selam"
+
+
+def test_odt_converts_text_outside_code_spans(converter, tmp_path):
+    content = ('<?xml version="1.0" encoding="UTF-8"?>'
+               '<office:document-content xmlns:office="urn:o" xmlns:text="urn:t"><office:body>'
+               '<text:p>selam <text:span text:style-name="Source_Text">hu</text:span> hu</text:p>'
+               '</office:body></office:document-content>')
+    source, target = tmp_path / "in.odt", tmp_path / "out.odt"
+    write_package(source, {"mimetype": "application/vnd.oasis.opendocument.text", "content.xml": content})
+    convert_document(str(source), str(target), converter)
+    entries = read_package(target)
+    layout = converter.layout
+    assert (f"<text:p>{layout.transliterate('selam ')}<text:span text:style-name=\"Source_Text\">hu</text:span>"
+            f"{layout.transliterate(' hu')}</text:p>") in entries["content.xml"].decode("utf-8")
+    assert entries["mimetype"] == b"application/vnd.oasis.opendocument.text"
+
+
+def test_unsupported_type_is_refused(converter, tmp_path):
+    with pytest.raises(ValueError):
+        convert_document(str(tmp_path / "notes.rtf"), str(tmp_path / "out.rtf"), converter)
@@ -0,0 +1,124 @@
+import pytest
+
+from conftest import RecordingInjector
+from fakes import Key, KeyCode
+
+VK_INSERT = 0x2D
+WM_KEYDOWN = 0x100
+
+
+@pytest.fixture
+def completions(ime):
+    ime.completer.complete = lambda word: ["ሀሁሂ", "ሀሁሃ"] if word == "ሀሁ" else []
+
+
+def test_composition_is_off_by_default(ime):
+    assert ime.composition is False
+
+
+def test_untagged_fallback_skips_its_own_backspaces(ime):
+    # Off Windows: ControllerInjector output comes back through on_key_press
+    ime.injector = RecordingInjector(tagged=False)
+    ime.on_key_press(KeyCode.from_char("h"))
+    ime.on_key_press(KeyCode.from_char("u"))
+    assert ime.injector.sent == [("ሀ", 1), ("ሁ", 2)]
+    assert ime.ignore_backspaces == 3
+    for _ in range(3):
+        ime.on_key_press(Key.backspace)
+    assert ime.units == ["ሁ"]
+    ime.on_key_press(Key.backspace)  # The user's own
+    assert ime.units == []
+
+
+def test_tagged_output_counts_no_backspaces(ime):
+    ime.on_key_press(KeyCode.from_char("h"))
+    ime.on_key_press(KeyCode.from_char("u"))
+    assert ime.injector.sent == [("ሀ", 1), ("ሁ", 2)]
+    assert ime.ignore_backspaces == 0
+
+
+def test_composition_never_counts_backspaces(ime, keys, completions):
+    ime.composition = True
+    ime.injector = RecordingInjector(tagged=False)
+    ime.units = ["ሀ", "ሁ"]
+    ime.filter_key(WM_KEYDOWN, keys(VK_INSERT))
+    assert ime.injector.sent == [("ሂ", 0)]
+    ime.filter_key(WM_KEYDOWN, keys(VK_INSERT))
+    assert ime.injector.sent[-1] == ("ሃ", 1)
+    assert ime.ignore_backspaces == 0
+
+
+@pytest.mark.parametrize("composition", [False, True])
+def test_insert_without_completion_reaches_the_application(ethiopic_ime, ime, keys, composition):
+    ime.composition = composition
+    ime.units = ["ሀ", "ሁ"]
+    assert ime.filter_key(WM_KEYDOWN, keys(VK_INSERT)) in (None, ethiopic_ime.PASS)
+    assert ime.injector.sent == []
+
+
+@pytest.mark.parametrize("composition", [False, True])
+def test_insert_completes_and_is_swallowed(ethiopic_ime, ime, keys, completions, composition):
+    ime.composition = composition
+    ime.units = ["ሀ", "ሁ"]
+    assert ime.filter_key(WM_KEYDOWN, keys(VK_INSERT)) == ethiopic_ime.CONSUME
+    assert ime.injector.sent == [("ሂ", 0)]
+    assert ime.filter_key(ethiopic_ime.WM_KEYUP, keys(VK_INSERT)) == ethiopic_ime.CONSUME
+
+
+@pytest.mark.parametrize("composition", [False, True])
+def test_modified_insert_is_left_alone(ethiopic_ime, ime, keys, completions, composition):
+    ime.composition = composition
+    ime.units = ["ሀ", "ሁ"]
+    keys.held["modifiers"] = True
+    assert ime.filter_key(WM_KEYDOWN, keys(VK_INSERT)) in (None, ethiopic_ime.PASS)
+    assert ime.injector.sent == []
+
+
+def test_modified_insert_commits_the_pending_syllable_first(ethiopic_ime, ime, keys, completions):
+    ime.composition = True
+    ime.filter_key(WM_KEYDOWN, keys(0x48))  # h, pending
+    assert ime.pending == "ሀ" and ime.injector.sent == []
+    keys.held["modifiers"] = True
+    assert ime.filter_key(WM_KEYDOWN, keys(VK_INSERT)) == ethiopic_ime.CONSUME
+    assert ime.injector.sent == [("ሀ", 0), ("key", VK_INSERT)]
+
+
+def test_layout_key_switches_with_a_syllable_pending(ime, keys, monkeypatch):
+    switched = []
+    switch_layout = ime.switch_layout
+    monkeypatch.setattr(ime, "switch_layout", lambda name: switched.append(name) or switch_layout(name))
+    ime.composition = True
+    ime.filter_key(WM_KEYDOWN, keys(0x48))  # h, pending
+    assert ime.filter_key(WM_KEYDOWN, keys(0x13)) is None  # Pause goes on to on_key_press
+    assert ime.injector.sent == []
+    ime.on_key_press(Key.pause)
+    assert switched == [ime.profiles.next_name(ime.layout_name)]
+    assert ime.injector.sent == [("ሀ", 0)] and ime.pending == ""
+
+
+def test_strip_puts_the_usual_word_ending_first(ime):
+    ime.show_candidates = True
+    for ch in "sl":
+        ime.on_key_press(KeyCode.from_char(ch))
+    layout_order = [output for _, output, _ in ime.strip_candidates]
+    assert layout_order[0] == "ሉ"
+
+    for _ in range(3):
+        ime.usage.record("ሰሊ")
+    ime.on_key_press(Key.space)
+    for ch in "sl":
+        ime.on_key_press(KeyCode.from_char(ch))
+    ranked = [output for _, output, _ in ime.strip_candidates]
+    assert ranked == ["ሊ"] + [output for output in layout_order if output != "ሊ"]
+    ime.on_key_press(KeyCode.from_char("1"))
+    assert ime.units == ["ሰ", "ሊ"]
+
+
+def test_strip_ranks_pending_syllables_after_the_typed_units(ime, keys):
+    ime.composition = True
+    ime.show_candidates = True
+    ime.usage.record("ሰሊ")
+    for vk in (0x53, 0x4C):  # s l
+        ime.filter_key(WM_KEYDOWN, keys(vk))
+    assert ime.units == ["ሰ"] and ime.pending == "ለ"
+    assert ime.strip_candidates[0][1] == "ሊ"
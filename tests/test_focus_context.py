@@ -0,0 +1,101 @@
+import pytest
+
+from fakes import KeyCode
+from shared.focus_context import FakeFocusProvider, FocusContexts
+
+WM_KEYDOWN = 0x100
+
+
+class Engine:
+    """save_context/restore_context pair that keeps what it was handed"""
+
+    def __init__(self):
+        self.state = "fresh"
+        self.restored = []
+
+    def save_context(self):
+        return self.state
+
+    def restore_context(self, context):
+        self.restored.append(context)
+        self.state = "fresh" if context is None else context
+
+
+@pytest.fixture
+def provider():
+    return FakeFocusProvider("editor", "notepad.exe")
+
+
+def test_same_window_keeps_its_context(provider):
+    contexts = FocusContexts(Engine(), provider)
+    assert not contexts.check()
+    assert contexts.switches == 0
+
+
+def test_each_window_gets_its_own_state_back(provider):
+    engine = Engine()
+    contexts = FocusContexts(engine, provider)
+    engine.state = "editor word"
+    provider.focus("browser")
+    assert contexts.check()
+    assert engine.state == "fresh"
+    engine.state = "browser word"
+    provider.focus("editor")
+    contexts.check()
+    assert engine.state == "editor word"
+    provider.focus("browser")
+    contexts.check()
+    assert engine.state == "browser word"
+    assert contexts.switches == 3
+
+
+def test_least_recently_focused_window_is_evicted(provider):
+    engine = Engine()
+    contexts = FocusContexts(engine, provider, capacity=2)
+    for window in ("a", "b", "c"):
+        engine.state = f"{provider.target} state"
+        provider.focus(window)
+        contexts.check()
+    # editor, a and b were left; only the two most recent are kept
+    assert list(contexts.contexts) == ["a", "b"]
+    engine.state = "c state"
+    provider.focus("editor")
+    contexts.check()
+    assert engine.restored[-1] is None
+    provider.focus("a")
+    contexts.check()
+    # Refocusing a window takes it out of the cache, so c and editor are kept
+    assert engine.restored[-1] is None
+    assert list(contexts.contexts) == ["c", "editor"]
+
+
+def test_ime_typing_state_follows_the_window(ime):
+    provider = FakeFocusProvider("editor")
+    ime.focus = FocusContexts(ime, provider)
+    ime.on_key_press(KeyCode.from_char("h"))
+    provider.focus("browser")
+    ime.on_key_press(KeyCode.from_char("s"))
+    assert ime.units == ["ሰ"]
+    provider.focus("editor")
+    ime.on_key_press(KeyCode.from_char("u"))
+    # h became ሀ in the editor, and u there still extends it to ሁ
+    assert ime.units == ["ሁ"]
+    assert ime.injector.sent[-1] == ("ሁ", 2)
+
+
+def test_ime_pending_syllable_stays_with_its_window(ime, keys):
+    provider = FakeFocusProvider("editor")
+    ime.focus = FocusContexts(ime, provider)
+    ime.composition = True
+    ime.filter_key(WM_KEYDOWN, keys(0x48))  # h
+    assert ime.pending == "ሀ"
+    provider.focus("browser")
+    ime.filter_key(WM_KEYDOWN, keys(0x53))  # s
+    assert ime.pending == "ሰ"
+    provider.focus("editor")
+    ime.filter_key(WM_KEYDOWN, keys(0x55))  # u
+    # hu cannot grow any further, so ሁ is typed, and nothing of the browser's ሰ
+    assert ime.injector.sent == [("ሁ", 0)]
+    provider.focus("browser")
+    ime.follow_focus()
+    assert ime.pending == "ሰ"
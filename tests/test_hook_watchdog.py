@@ -0,0 +1,97 @@
+import pytest
+
+from shared.hook_watchdog import HookWatchdog
+
+BUDGET = 0.05
+RECOVERY = 30.0
+
+
+class FakeClock:
+    """perf_counter and sleep stand-in; time moves only when told to"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def watchdog(clock):
+    return HookWatchdog(budget=BUDGET, strikes=3, window=10.0, recovery=RECOVERY,
+                        clock=clock, sleeper=clock.sleep, log=lambda message: None)
+
+
+def handler(watchdog, clock, cost, delay=0.0):
+    """One hook callback: a typing delay, then cost seconds of work"""
+    if not watchdog.active():
+        return "passed"
+    watchdog.begin()
+    try:
+        watchdog.sleep(delay)
+        clock.now += cost
+        watchdog.mark("transition")
+    finally:
+        watchdog.end()
+    return "processed"
+
+
+def test_typing_delay_does_not_count(watchdog, clock):
+    for _ in range(10):
+        clock.now += 1.0
+        assert handler(watchdog, clock, 0.001, delay=0.2) == "processed"
+    assert watchdog.trips == 0
+
+
+def test_slow_handler_trips_pass_through(watchdog, clock):
+    for _ in range(2):
+        clock.now += 1.0
+        handler(watchdog, clock, 0.2)
+    assert watchdog.active()
+    clock.now += 1.0
+    handler(watchdog, clock, 0.2)
+    assert watchdog.trips == 1
+    assert not watchdog.active()
+    clock.now += 1.0
+    assert handler(watchdog, clock, 0.2) == "passed"
+
+
+def test_strikes_outside_the_window_do_not_trip(watchdog, clock):
+    for _ in range(5):
+        clock.now += 6.0
+        handler(watchdog, clock, 0.2)
+    assert watchdog.trips == 0
+
+
+def test_recovers_after_the_recovery_time(watchdog, clock):
+    for _ in range(3):
+        clock.now += 1.0
+        handler(watchdog, clock, 0.2)
+    clock.now += RECOVERY - 1.0
+    assert handler(watchdog, clock, 0.001) == "passed"
+    clock.now += 1.0
+    assert handler(watchdog, clock, 0.001) == "processed"
+    # Strikes from before the trip are forgotten
+    clock.now += 1.0
+    handler(watchdog, clock, 0.2)
+    assert watchdog.active() and watchdog.trips == 1
+
+
+def test_slowest_stage_is_blamed(clock):
+    messages = []
+    watchdog = HookWatchdog(budget=BUDGET, clock=clock, sleeper=clock.sleep, log=messages.append)
+    watchdog.begin()
+    clock.now += 0.01
+    watchdog.mark("lookup")
+    clock.now += 0.1
+    watchdog.mark("inject")
+    assert watchdog.end() == pytest.approx(0.11)
+    assert "slowest stage inject" in messages[0]
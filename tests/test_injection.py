@@ -0,0 +1,79 @@
+import pytest
+
+from conftest import DEEPSEEK
+from fakes import KeyboardEvent
+
+REAL_BACKSPACE = 14  # Scan code of the key itself
+
+
+@pytest.fixture
+def injection(deepseek):
+    return deepseek.injection
+
+
+@pytest.fixture
+def sent_injector(injection):
+    class SentInjector(injection.Win32Injector):
+        """Win32Injector keeping its SendInput events instead of sending them"""
+
+        def __init__(self):
+            self.sent = []
+
+        def _send(self, events):
+            self.sent.extend(events)
+    return SentInjector
+
+
+@pytest.fixture
+def substituter(deepseek, sent_injector, monkeypatch):
+    monkeypatch.chdir(DEEPSEEK)  # config.csv is read from the working directory
+    substituter = deepseek.text_substituter.TextSubstituter()
+    substituter.watchdog = deepseek.text_substituter.HookWatchdog(sleeper=lambda seconds: None,
+                                                                  log=lambda message: None)
+    substituter.injector = sent_injector()
+    return substituter
+
+
+def press(substituter, name, scan_code=0):
+    substituter.on_key_press(KeyboardEvent(name, "down", 0.0, scan_code))
+    substituter.on_key_press(KeyboardEvent(name, "up", 0.0, scan_code))
+
+
+def test_backspaces_are_tagged_and_text_is_unicode_only(injection, sent_injector):
+    injector = sent_injector()
+    injector.backspace()
+    assert [scan for _, scan, _ in injector.sent] == [injection.INJECTION_SCAN_CODE] * 2
+    injector.sent = []
+    injector.write("ሁa")
+    assert all(vk == 0 and flags & injection.KEYEVENTF_UNICODE for vk, _, flags in injector.sent)
+    assert [scan for _, scan, _ in injector.sent] == [ord("ሁ"), ord("ሁ"), ord("a"), ord("a")]
+
+
+def test_real_and_injected_backspaces_interleave(injection, substituter):
+    press(substituter, "h")
+    press(substituter, "u")
+    assert [scan for _, scan, _ in substituter.injector.sent].count(injection.INJECTION_SCAN_CODE) == 6
+    assert list(substituter.buffer) == ["h", "u"]
+
+    # The user's backspace gets in before ours reach the hook, then a key
+    press(substituter, "backspace", REAL_BACKSPACE)
+    press(substituter, "a")
+    press(substituter, "backspace", injection.INJECTION_SCAN_CODE)
+    press(substituter, "backspace", injection.INJECTION_SCAN_CODE)
+    assert list(substituter.buffer) == ["h", "a"]
+
+
+def test_lost_injected_keys_hold_nothing_up(substituter):
+    press(substituter, "h")
+    # Our backspace never reaches the hook; the user's own one is theirs
+    press(substituter, "backspace", REAL_BACKSPACE)
+    assert list(substituter.buffer) == []
+
+
+def test_fallback_claims_announced_events_by_name(injection):
+    injector = injection.KeyboardInjector()
+    injector.backspace()
+    injector.write("ሀa")
+    assert injector.is_own(KeyboardEvent("backspace", "down", 0.0))
+    assert injector.is_own(KeyboardEvent("a", "down", 0.0))
+    assert not injector.is_own(KeyboardEvent("a", "down", 0.0))
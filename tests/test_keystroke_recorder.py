@@ -0,0 +1,76 @@
+import pytest
+
+from shared.keystroke_recorder import (CONSUME, INJECTED, KEY_UP, KIND_HASHED, KIND_NAMED, PASS, REPLACE,
+                                       KeystrokeRecorder, read_recording, replay_keys)
+
+MS = 1000000
+
+
+def recorder_at(path, **kwargs):
+    """Recorder whose ring is only flushed when the test says so"""
+    recorder = KeystrokeRecorder(str(path), **kwargs)
+    recorder._run = lambda: None
+    recorder.start()
+    return recorder
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "keys.sgkr"
+    recorder = recorder_at(path, private=False)
+    recorder.record("h", CONSUME, 100 * MS)
+    recorder.record("h", PASS, 150 * MS, KEY_UP)
+    recorder.record("u", REPLACE, 300 * MS)
+    recorder.record("backspace", INJECTED, 310 * MS)
+    recorder.record("page up", PASS, 400 * MS)
+    recorder.record("space", PASS, 700 * MS)
+    recorder.flush()
+    recorder.stop()
+
+    header, records = read_recording(str(path))
+    assert header["private"] is False
+    assert [(r["key"], r["event"], r["decision"]) for r in records] == [
+        ("'h'", "down", "consume"), ("'h'", "up", "pass"), ("'u'", "down", "replace"),
+        ("backspace", "down", "injected"), ("page_up", "down", "pass"), ("space", "down", "pass")]
+    times = [r["time"] - records[0]["time"] for r in records]
+    assert times == pytest.approx([0, 0.05, 0.2, 0.21, 0.3, 0.6])
+
+    # Our own keys, key-ups and keys that type nothing are left out
+    keys = replay_keys(records)
+    assert [char for _, char in keys] == ["h", "u", " "]
+    assert [delay for delay, _ in keys] == pytest.approx([0, 0.2, 0.4])
+
+
+def test_writer_a_ring_behind_drops_the_oldest(tmp_path):
+    path = tmp_path / "keys.sgkr"
+    recorder = recorder_at(path, private=False, capacity=4)
+    for i in range(10):
+        recorder.record(chr(ord("a") + i), PASS, i * MS)
+    recorder.flush()
+    assert recorder.dropped == 6
+    recorder.record("z", PASS, 20 * MS)
+    recorder.stop()
+    _, records = read_recording(str(path))
+    assert [r["char"] for r in records] == ["g", "h", "i", "j", "z"]
+    assert recorder.dropped == 6
+
+
+def test_private_recording_keeps_repetition_not_text(tmp_path):
+    path = tmp_path / "keys.sgkr"
+    recorder = recorder_at(path, private=True)
+    for i, key in enumerate(["s", "e", "s", "enter", 0x41]):
+        recorder.record(key, PASS, i * MS)
+    recorder.stop()
+
+    data = path.read_bytes()
+    assert ord("s").to_bytes(4, "little") not in data
+    header, records = read_recording(str(path))
+    assert header["private"] is True
+    kinds = [r["kind"] for r in records]
+    assert kinds == [KIND_HASHED, KIND_HASHED, KIND_HASHED, KIND_NAMED, KIND_HASHED]
+    s, e, s_again, _, vk = [r["value"] for r in records]
+    assert s == s_again and len({s, e, vk}) == 3
+    assert [char for _, char in replay_keys(records)] == [None, None, None, "\n", None]
+    # A new recording hashes with a new key
+    other = recorder_at(tmp_path / "other.sgkr", private=True)
+    assert other.encode("s") != (KIND_HASHED, s)
+    other.stop()
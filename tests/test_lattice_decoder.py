@@ -0,0 +1,87 @@
+import pytest
+
+from conftest import CONFIG
+from lattice_decoder import BOUNDARY, LatticeDecoder, SyllableModel, load_transliterator
+from transliterator import load_layout
+
+CORPUS = ["ሰላም ሰላም ለሁሉም ሰላም ሰላም ሰላም"] * 20
+
+
+@pytest.fixture(scope="module")
+def layout():
+    return load_layout(CONFIG)
+
+
+@pytest.fixture(scope="module")
+def model():
+    return SyllableModel.train(CORPUS)
+
+
+@pytest.fixture
+def decoder(layout, model):
+    return LatticeDecoder(layout, model)
+
+
+def path_score(decoder, parts):
+    """Score decode_word gives one segmentation: edge costs plus bigram log probabilities"""
+    model = decoder.model
+    score = 0.0
+    last = BOUNDARY
+    for out, cost in parts:
+        score -= cost
+        for ch in out:
+            score += model.logprobs[last * model.size + model.id(ch)]
+            last = model.id(ch)
+    return score + model.logprobs[last * model.size + BOUNDARY]
+
+
+def all_paths(decoder, word):
+    if not word:
+        yield []
+        return
+    for length, out, cost in decoder._edges_at(word[:decoder.max_key]):
+        for rest in all_paths(decoder, word[length:]):
+            yield [(out, cost)] + rest
+
+
+@pytest.mark.parametrize("typed", ["selam", "slam", "salam", "hulum", "lehulum"])
+def test_loose_typing_decodes_to_the_corpus_word(decoder, layout, typed):
+    assert decoder.transliterate(typed) in ("ሰላም", "ሁሉም", "ለሁሉም")
+    assert layout.transliterate(typed) != decoder.transliterate(typed)
+
+
+@pytest.mark.parametrize("word", ["selam", "hulum", "slm", "bet", "qWa"])
+def test_viterbi_finds_the_best_path(decoder, word):
+    best = max(path_score(decoder, parts) for parts in all_paths(decoder, word))
+    decoded = decoder.decode_word(word)
+    scores = [path_score(decoder, parts) for parts in all_paths(decoder, word)
+              if "".join(out for out, _ in parts) == decoded]
+    assert max(scores) == pytest.approx(best, abs=1e-4)
+
+
+def test_without_evidence_the_layout_choice_stands(layout):
+    decoder = LatticeDecoder(layout, SyllableModel.train(["ዘመን"]))
+    for word in ("selam", "bet", "hulum"):
+        assert decoder.transliterate(word) == layout.transliterate(word)
+
+
+def test_text_between_words_goes_through_the_layout(decoder, layout):
+    assert decoder.transliterate("selam, 12 hulum.") == \
+        "ሰላም" + layout.transliterate(", 12 ") + "ሁሉም" + layout.transliterate(".")
+
+
+def test_model_file_round_trip(model, tmp_path):
+    path = str(tmp_path / "model.bin")
+    model.save(path)
+    loaded = SyllableModel.load(path)
+    assert loaded.vocab == model.vocab
+    assert list(loaded.logprobs) == list(model.logprobs)
+    assert isinstance(load_transliterator(CONFIG, path), LatticeDecoder)
+    assert not isinstance(load_transliterator(CONFIG), LatticeDecoder)
+
+
+def test_other_files_are_not_models(tmp_path):
+    path = tmp_path / "config.dat"
+    path.write_bytes(b"SGDA" + bytes(64))
+    with pytest.raises(ValueError):
+        SyllableModel.load(str(path))
@@ -0,0 +1,93 @@
+import io
+
+import pytest
+
+from legacy_converter import LegacyEncoding, convert_stream, convert_tree, detect_encoding, load_encodings
+
+# Made-up charts in the encodings/ format: single bytes plus base glyph and
+# vowel mark sequences, and a second family sharing the letters but not
+# the punctuation slots
+FIRST = """0xA1,ሀ
+0xA1 0xB1,ሁ
+0xA1 0xB1 0xB2,ሗ
+0xA2,ለ
+0xA2 0xB1,ሉ
+0xA3,መ
+h,ሐ
+0xBB,።
+"""
+SECOND = """0xA1,ሰ
+0xA2,ረ
+0xA3,ቀ
+h,ሸ
+0xAB,፣
+"""
+
+
+@pytest.fixture
+def tables(tmp_path):
+    folder = tmp_path / "encodings"
+    folder.mkdir()
+    (folder / "first.csv").write_text(FIRST, encoding="utf-8")
+    (folder / "second.csv").write_text(SECOND, encoding="utf-8")
+    return str(folder)
+
+
+@pytest.fixture
+def first(tables):
+    return load_encodings(tables)["first"]
+
+
+def test_tables_load_with_byte_codes(tables):
+    encodings = load_encodings(tables)
+    assert sorted(encodings) == ["first", "second"]
+    assert encodings["first"].table["\xa1\xb1"] == "ሁ"
+    assert encodings["first"].max_key == 3
+
+
+def test_sequences_take_the_longest_match(first):
+    assert first.convert("\xa1\xb1\xb2 \xa1\xb1 \xa1\xa2\xb1h\xbb") == "ሗ ሁ ሀሉሐ።"
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 8))
+def test_chunked_stream_matches_whole_text(first, chunk_size):
+    text = "\xa1\xb1\xb2\xa1\xb1\xa2\xb1\xa1\xa1\xb1\xa3 h\xa1\xb1\xb2\xbb\xa2" * 5
+    dst = io.StringIO()
+    convert_stream(first, io.StringIO(text), dst, chunk_size=chunk_size)
+    assert dst.getvalue() == first.convert(text)
+
+
+def test_carry_never_splits_a_sequence(first):
+    converted, carry = first.convert_settled("\xa3\xa3\xa3\xa1\xb1")
+    # The last max_key bytes could still start a longer sequence
+    assert converted == "መመመ"
+    assert carry == "\xa1\xb1"
+    assert first.convert_settled(carry + "\xb2") == ("ሗ", "")
+
+
+def test_detection_picks_the_family_by_its_own_slots(tables):
+    encodings = load_encodings(tables)
+    assert detect_encoding("\xa1\xa2 \xa3\xbb", encodings).name == "first"
+    assert detect_encoding("\xa1\xa2 \xa3\xab", encodings).name == "second"
+
+
+def test_detection_skips_unicode_and_unknown_text(tables):
+    encodings = load_encodings(tables)
+    assert detect_encoding("ሰላም \xa1\xa2", encodings) is None
+    assert detect_encoding("plain English text", encodings) is None
+
+
+def test_tree_converts_matches_and_skips_the_rest(tables, tmp_path):
+    source = tmp_path / "archive" / "letters"
+    source.mkdir(parents=True)
+    (source / "legacy.txt").write_bytes(b"\xa1\xb1 \xa2\xbb")
+    (source / "english.txt").write_bytes(b"nothing to do here")
+    target = tmp_path / "converted"
+    assert convert_tree(str(tmp_path / "archive"), str(target), load_encodings(tables)) == (1, 1)
+    assert (target / "letters" / "legacy.txt").read_text(encoding="utf-8") == "ሁ ለ።"
+    assert not (target / "letters" / "english.txt").exists()
+
+
+def test_single_byte_table_needs_no_carry():
+    encoding = LegacyEncoding("plain", {"\xa1": "ሀ"})
+    assert encoding.convert_settled("\xa1\xa1") == ("ሀሀ", "")
@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import CONFIG
+from search_index import Romanizer, SearchIndex
+from shared.phrase_trie import read_table
+
+
+@pytest.fixture(scope="module")
+def romanizer():
+    return Romanizer(read_table(CONFIG))
+
+
+@pytest.fixture
+def index(tmp_path, romanizer):
+    index = SearchIndex(str(tmp_path / "index.db"), romanizer)
+    for name, text in (("abebe", "አበበ በሶ በላ"), ("hailu", "ሀይሉ መጣ"), ("other", "ሰላም ለእናንተ")):
+        index.add(name, text)
+    index.commit()
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize("a, b", [("ዐበበ", "አበበ"), ("ኀይሉ", "ሀይሉ")])
+def test_glottal_and_h_variants_fold_together(romanizer, a, b):
+    assert romanizer.normalize(a) == romanizer.normalize(b)
+
+
+def test_variant_spelling_finds_document(index):
+    assert index.search("ዐበበ")[0][0] == "abebe"
+    assert index.search("ኀይሉ")[0][0] == "hailu"
+
+
+@pytest.mark.parametrize("query, name", [
+    ("abebe", "abebe"), ("Abebe", "abebe"),
+    ("hayilu", "hailu"), ("Hayilu", "hailu"), ("hayIlu", "hailu"),
+    ("selam", "other"), ("Selam", "other"), ("s[elam", "other"), ("Salam", "other"),
+])
+def test_latin_query_tolerates_scheme_variants(index, query, name):
+    assert index.search(query)[0][0] == name
+
+
+def test_added_document_is_found_and_replaced(index):
+    index.add("news", "ዘመን ተነገረ")
+    index.commit()
+    assert index.search("zemen")[0][0] == "news"
+    index.add("news", "ሰላም ለሁሉም")
+    index.commit()
+    assert "news" not in [name for name, _ in index.search("zemen")]
+    assert {name for name, _ in index.search("selam")[:2]} == {"news", "other"}
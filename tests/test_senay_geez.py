@@ -0,0 +1,67 @@
+import pytest
+
+from conftest import DEEPSEEK
+from fakes import KeyboardEvent
+from shared.keystroke_recorder import CONSUME, INJECTED
+
+
+class Screen:
+    """Output backend: what the application shows, and the ASCII keys the hook gets back"""
+
+    def __init__(self):
+        self.text = []
+        self.echoes = []
+
+    def inject_key(self, name):
+        if name == "backspace":
+            if self.text:
+                self.text.pop()
+        else:
+            self.text.append(name)
+        self.echoes.append(name)
+
+    def inject_text(self, text, echoed):
+        self.text.extend(text)
+        self.echoes.extend(char for char in text if echoed or ord(char) < 128)
+
+    def suppress(self):
+        pass
+
+
+@pytest.fixture
+def screen(relay, monkeypatch):
+    screen = Screen()
+    monkeypatch.setattr(relay, "target", screen)
+    return screen
+
+
+@pytest.fixture
+def substituter(deepseek, screen, monkeypatch):
+    monkeypatch.chdir(DEEPSEEK)  # config.csv is read from the working directory
+    substituter = deepseek.senay_geez.TextSubstituter()
+    substituter.watchdog = deepseek.senay_geez.HookWatchdog(sleeper=lambda seconds: None,
+                                                            log=lambda message: None)
+    return substituter
+
+
+def press(substituter, name):
+    return substituter.dispatch_key(KeyboardEvent(name, "down", 0.0))
+
+
+@pytest.mark.parametrize("flush", [
+    lambda substituter: substituter.switch_layout(substituter.layout_name),
+    lambda substituter: substituter.flush_pending(),
+], ids=["switch_layout", "flush_pending"])
+def test_held_back_keys_are_typed_once(substituter, screen, flush):
+    # Neither key is in the table: both are held back
+    assert press(substituter, "c") == CONSUME
+    assert press(substituter, "j") == CONSUME
+    assert substituter.pending_chars == ["c", "j"] and screen.text == []
+
+    flush(substituter)
+    assert screen.text == ["c", "j"]
+    # Their echoes are ours, not new keys to hold back
+    echoes, screen.echoes = screen.echoes, []
+    assert [press(substituter, name) for name in echoes] == [INJECTED, INJECTED]
+    assert substituter.pending_chars == [] and list(substituter.buffer) == []
+    assert screen.text == ["c", "j"]
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from conftest import DEEPSEEK
+from fakes import KeyboardEvent
+from shared.layout_profiles import request_layout
+
+
+@pytest.fixture
+def substituter(deepseek, monkeypatch):
+    monkeypatch.chdir(DEEPSEEK)  # config.csv is read from the working directory
+    substituter = deepseek.text_substituter.TextSubstituter()
+    substituter.watchdog = deepseek.text_substituter.HookWatchdog(sleeper=lambda seconds: None,
+                                                                  log=lambda message: None)
+    return substituter
+
+
+def test_keys_never_touch_the_config_files(substituter, monkeypatch):
+    def polled():
+        raise AssertionError("polled from the hook")
+    for name in ("check_config_updates", "check_profile_request", "check_layout_request"):
+        monkeypatch.setattr(substituter, name, polled)
+    for char in "selam" * 10:
+        substituter.on_key_press(KeyboardEvent(char, "down", 0.0))
+        substituter.on_key_press(KeyboardEvent(char, "up", 0.0))
+
+
+def test_watcher_picks_up_tray_requests(substituter, monkeypatch, tmp_path):
+    config = tmp_path / "config.csv"
+    config.write_text("h,ሀ\n", encoding="utf-8")
+    substituter.config_file = str(config)
+    profiles = []
+    monkeypatch.setattr(substituter, "check_profile_request", lambda: profiles.append(True))
+    switched = []
+    monkeypatch.setattr(substituter, "switch_layout", switched.append)
+    request_layout(str(tmp_path), "other")
+
+    watcher = threading.Thread(target=substituter.watch_config, args=(0.01,))
+    watcher.start()
+    try:
+        for _ in range(500):
+            if switched and profiles:
+                break
+            substituter.stopped.wait(0.01)
+    finally:
+        substituter.stopped.set()
+        watcher.join()
+    assert switched == ["other"]
+    assert not (tmp_path / "layout.request").exists()
+
+
+def test_watcher_survives_a_failing_check(substituter, monkeypatch, capsys):
+    calls = []
+
+    def failing():
+        calls.append(True)
+        if len(calls) == 2:
+            substituter.stopped.set()
+        raise OSError("config.csv is locked")
+    monkeypatch.setattr(substituter, "check_config_updates", failing)
+    substituter.watch_config(0.001)
+    assert len(calls) == 2
+    assert "config.csv is locked" in capsys.readouterr().out
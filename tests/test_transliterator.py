@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from conftest import CONFIG
+from incremental import IncrementalDocument
+from shared.phrase_trie import PhraseTrie, build_phrase_trie, read_table
+from transliterator import MAX_CANDIDATES, ROOT, Layout
+
+
+@pytest.fixture(scope="module")
+def table():
+    return read_table(CONFIG)
+
+
+@pytest.fixture(scope="module")
+def layout(table):
+    return Layout(table)
+
+
+def typed_text(table, rng, length):
+    """Latin keys with spaces, broken sequences and the odd output character"""
+    keys = list(table)
+    outputs = list(table.values())
+    parts = []
+    while sum(map(len, parts)) < length:
+        roll = rng.random()
+        parts.append(rng.choice(keys) if roll < 0.8 else " " if roll < 0.9 else
+                     rng.choice("xq.,1") if roll < 0.95 else rng.choice(outputs))
+    return "".join(parts)
+
+
+def test_typing_hu_replaces_the_unit(layout):
+    state, back, text = layout.step(ROOT, "h")
+    assert (back, text) == (False, "ሀ")
+    state, back, text = layout.step(state, "u")
+    assert (back, text) == (True, "ሁ")
+    assert layout.transliterate("hu hu") == "ሁ ሁ"
+
+
+def test_trie_and_dict_tables_agree(table, layout, tmp_path):
+    path = str(tmp_path / "config.dat")
+    build_phrase_trie(table, path)
+    trie = PhraseTrie(path)
+    try:
+        trie_layout = Layout(trie)
+        rng = random.Random(1)
+        for _ in range(200):
+            text = typed_text(table, rng, 40)
+            assert trie_layout.transliterate(text) == layout.transliterate(text)
+        # The trie lists children in label order, the dict in table order;
+        # below the MAX_CANDIDATES cut-off they offer the same continuations
+        for prefix in {key[:-1] for key in table if len(key) > 1}:
+            ours, theirs = ROOT, ROOT
+            for ch in prefix:
+                ours, theirs = trie_layout.step(ours, ch)[0], layout.step(theirs, ch)[0]
+            if len(layout.candidates_at(theirs)) < MAX_CANDIDATES:
+                assert sorted(item[:2] for item in trie_layout.candidates_at(ours)) == \
+                    sorted(item[:2] for item in layout.candidates_at(theirs))
+    finally:
+        trie.close()
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_patched_layout_matches_a_fresh_compile(table, layout, seed):
+    rng = random.Random(seed)
+    edited = dict(table)
+    keys = list(table)
+    changed = set(rng.sample(keys, 10))
+    for key in sorted(changed)[:5]:
+        del edited[key]
+    for key in sorted(changed)[5:]:
+        edited[key] = "ፙ"
+    for _ in range(5):
+        key = "".join(rng.choice("hlmzZQ;") for _ in range(rng.randint(1, 4)))
+        edited[key] = rng.choice(list(table.values()))
+        changed.add(key)
+
+    patched = layout.patched(edited, changed)
+    fresh = Layout(edited)
+    for _ in range(200):
+        text = typed_text(edited, rng, 40)
+        assert patched.transliterate(text) == fresh.transliterate(text)
+    ours, theirs = ROOT, ROOT
+    for ch in typed_text(edited, rng, 400):
+        # States are numbered differently, the offered continuations are not
+        assert [item[:2] for item in patched.candidates_at(ours)] == \
+            [item[:2] for item in fresh.candidates_at(theirs)]
+        ours, theirs = patched.step(ours, ch)[0], fresh.step(theirs, ch)[0]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_edits_match_a_full_run(table, layout, seed):
+    rng = random.Random(seed)
+    document = IncrementalDocument(layout, typed_text(table, rng, 600), chunk_size=16)
+    output = document.output
+    for _ in range(100):
+        source = document.source
+        start = rng.randint(0, len(source))
+        end = rng.randint(start, min(len(source), start + 8))
+        diffs = document.edit(start, end, typed_text(table, rng, rng.randint(0, 6)))
+        for out_start, out_end, replacement in diffs:
+            output = output[:out_start] + replacement + output[out_end:]
+        assert document.output == output == layout.transliterate(document.source)
+
+
+def test_edit_outside_the_document_is_refused(layout):
+    document = IncrementalDocument(layout, "selam")
+    with pytest.raises(ValueError):
+        document.edit(3, 9, "")
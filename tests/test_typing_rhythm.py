@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+
+@pytest.fixture
+def typing_rhythm(deepseek):
+    return deepseek.typing_rhythm
+
+
+def steady_times(rng, count, low, high):
+    when = 0.0
+    for _ in range(count):
+        when += rng.uniform(low, high)
+        yield when
+
+
+def test_slow_steady_typist_pairs_are_not_split(typing_rhythm):
+    rng = random.Random(41)
+    rhythm = typing_rhythm.TypingRhythm()
+    for when in steady_times(rng, 200, 0.17, 0.20):
+        rhythm.record(when)
+    # The wait after the first key of a pair outlasts the gap to the second
+    gaps = [rng.uniform(0.17, 0.20) for _ in range(100)]
+    assert all(gap < rhythm.delay for gap in gaps)
+    assert rhythm.delay <= typing_rhythm.MAX_DELAY
+
+
+def test_fast_typist_waits_little(typing_rhythm):
+    rhythm = typing_rhythm.TypingRhythm()
+    for when in steady_times(random.Random(7), 200, 0.05, 0.07):
+        rhythm.record(when)
+    assert 0.07 < rhythm.delay <= 0.07 + typing_rhythm.BUCKET_MS / 1000.0 + typing_rhythm.MARGIN
+
+
+def test_delay_is_capped(typing_rhythm):
+    rhythm = typing_rhythm.TypingRhythm()
+    for when in steady_times(random.Random(3), 200, 0.35, 0.45):
+        rhythm.record(when)
+    assert rhythm.delay == typing_rhythm.MAX_DELAY
+
+
+def test_default_until_enough_keys(typing_rhythm):
+    rhythm = typing_rhythm.TypingRhythm(default=0.05)
+    for when in steady_times(random.Random(1), typing_rhythm.MIN_SAMPLES - 1, 0.17, 0.20):
+        rhythm.record(when)
+    assert rhythm.delay == 0.05
+
+
+def test_wait_counts_from_the_key_press(typing_rhythm):
+    now = [10.0]
+    rhythm = typing_rhythm.TypingRhythm(default=0.2, clock=lambda: now[0])
+    assert rhythm.wait(10.0) == pytest.approx(0.2)
+    # Handled late, after queueing behind other keys
+    assert rhythm.wait(9.95) == pytest.approx(0.15)
+    assert rhythm.wait(9.5) < 0